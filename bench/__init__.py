@@ -0,0 +1 @@
+"""Benchmark throughput penerjemah subtitle terhadap server chat-completions tiruan (tanpa network / API key)."""
@@ -0,0 +1,372 @@
+# bench/mock_server.py
+"""Server chat-completions OpenAI-compatible tiruan untuk benchmark.
+
+Tiap baris berprefix marker (<<LINE i>> / <<BLOCK b LINE i>>) dikembalikan dengan marker yang sama;
+tanpa marker (mode "line") teks terakhir dikembalikan utuh. System prompt yang pernah dilihat dilaporkan
+sebagai token ter-cache (kelipatan 64 token, seperti prompt caching DeepSeek). Latency, 429 dan output
+rusak bisa diatur:
+
+    python -m bench.mock_server --port 8765 --latency-ms 300 --jitter 0.4 --rate-429 0.05 --rate-5xx 0.01 --malformed 0.02
+
+Juga tiruan Batch API (`/v1/files`, `/v1/batches`): batch diproses di background setelah `--batch-delay`
+detik dengan aturan yang sama (429/503/output rusak per item → masuk error file / output rusak).
+"""
+import argparse
+import email.parser
+import email.policy
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockConfig:
+    """Parameter perilaku server.
+
+    latency = lognormal(median=`latency_ms`, sigma=`jitter`) + `per_line_ms` × jumlah baris output.
+    `rate_429` / `rate_5xx` / `malformed` = peluang per request (0..1). `batch_delay_s` = lama batch
+    "diproses" sebelum selesai.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter: float = 0.3,
+        per_line_ms: float = 5.0,
+        rate_429: float = 0.0,
+        retry_after: float = 1.0,
+        malformed: float = 0.0,
+        seed: int = None,
+        rate_5xx: float = 0.0,
+        batch_delay_s: float = 1.0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.per_line_ms = per_line_ms
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.malformed = malformed
+        self.rate_5xx = rate_5xx
+        self.batch_delay_s = batch_delay_s
+        self.random = random.Random(seed)
+
+class MockServer:
+    """`ThreadingHTTPServer` di background thread; `base_url` siap dipakai `OpenAI(base_url=...)`."""
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.counts = {"requests": 0, "rate_limited": 0, "server_errors": 0, "malformed": 0, "batches": 0, "batch_requests": 0}
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self._ids = itertools.count(1)
+        self._files = {}  # id → (metadata, bytes)
+        self._batches = {}
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset(self) -> None:
+        with self._lock:
+            for k in self.counts:
+                self.counts[k] = 0
+            self._prefixes.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+    def _incr(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def _roll(self, p: float) -> bool:
+        with self._lock:
+            return p > 0 and self.config.random.random() < p
+
+    def _cached_tokens(self, system: str) -> int:
+        with self._lock:
+            seen = system in self._prefixes
+            self._prefixes.add(system)
+        return (len(system) // 4) // 64 * 64 if seen else 0
+
+    def _latency(self, lines: int) -> float:
+        cfg = self.config
+        with self._lock:
+            base = cfg.latency_ms * math.exp(cfg.random.gauss(0, cfg.jitter)) if cfg.jitter else cfg.latency_ms
+        return (base + cfg.per_line_ms * lines) / 1000.0
+
+    def chat(self, body: dict, sleep: bool = True):
+        """1 chat completion → (status code, payload JSON, header tambahan)."""
+        self._incr("requests")
+        if self._roll(self.config.rate_429):
+            self._incr("rate_limited")
+            return 429, {
+                "error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error", "code": "rate_limit"},
+            }, {"retry-after": str(self.config.retry_after)}
+        if self._roll(self.config.rate_5xx):
+            self._incr("server_errors")
+            return 503, {"error": {"message": "Service overloaded (mock)", "type": "server_error"}}, {}
+
+        text = fake_translate(body["messages"][-1]["content"])
+        if self._roll(self.config.malformed):
+            self._incr("malformed")
+            with self._lock:
+                text = corrupt(text, self.config.random)
+        if sleep:
+            time.sleep(self._latency(text.count("\n") + 1))
+
+        system = "".join(m["content"] for m in body["messages"][:-1])
+        usage = {
+            "prompt_tokens": sum(len(m["content"]) for m in body["messages"]) // 4 + 1,
+            "completion_tokens": len(text) // 4 + 1,
+        }
+        cached = self._cached_tokens(system)
+        usage["prompt_tokens_details"] = {"cached_tokens": cached}
+        usage["prompt_cache_hit_tokens"] = cached
+        usage["prompt_cache_miss_tokens"] = usage["prompt_tokens"] - cached
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return 200, {
+            "id": "mock",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        }, {}
+
+    # ── Batch API tiruan
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}_mock{next(self._ids)}"
+
+    def add_file(self, filename: str, data: bytes, purpose: str) -> dict:
+        meta = {
+            "id": self._new_id("file"), "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed",
+        }
+        with self._lock:
+            self._files[meta["id"]] = (meta, data)
+        return meta
+
+    def file_content(self, file_id: str):
+        with self._lock:
+            entry = self._files.get(file_id)
+        return entry[1] if entry else None
+
+    def create_batch(self, params: dict):
+        data = self.file_content(params.get("input_file_id", ""))
+        if data is None:
+            return 404, {"error": {"message": "input file tidak ditemukan (mock)", "type": "invalid_request_error"}}
+        lines = [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+        batch = {
+            "id": self._new_id("batch"), "object": "batch", "endpoint": params.get("endpoint"),
+            "input_file_id": params["input_file_id"], "completion_window": params.get("completion_window", "24h"),
+            "status": "validating", "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0}, "metadata": params.get("metadata"),
+        }
+        with self._lock:
+            self._batches[batch["id"]] = batch
+        self._incr("batches")
+        threading.Thread(target=self._process_batch, args=(batch, lines), daemon=True).start()
+        return 200, dict(batch)
+
+    def _process_batch(self, batch: dict, lines: list) -> None:
+        batch["status"] = "in_progress"
+        time.sleep(self.config.batch_delay_s)
+        out, errors = [], []
+        for n, line in enumerate(lines):
+            self._incr("batch_requests")
+            code, payload, _ = self.chat(line["body"], sleep=False)
+            record = {
+                "id": f"batch_req_{n}", "custom_id": line["custom_id"],
+                "response": {"status_code": code, "request_id": f"req_{n}", "body": payload}, "error": None,
+            }
+            (out if code == 200 else errors).append(json.dumps(record))
+        with self._lock:
+            batch["request_counts"].update(completed=len(out), failed=len(errors))
+        if out:
+            batch["output_file_id"] = self.add_file("output.jsonl", "\n".join(out).encode("utf-8"), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.add_file("errors.jsonl", "\n".join(errors).encode("utf-8"), "batch_output")["id"]
+        batch["completed_at"] = int(time.time())
+        batch["status"] = "completed"
+
+    def get_batch(self, batch_id: str, cancel: bool = False):
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            if batch is not None and cancel and batch["status"] not in ("completed", "failed", "expired"):
+                batch["status"] = "cancelled"
+            return dict(batch) if batch is not None else None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def fake_translate(user: str) -> str:
+    """'Terjemahan' deterministik: marker dipertahankan, isi diberi prefix 'TR'."""
+    body = user.split("\n\n", 1)[-1]
+    out = []
+    for line in body.splitlines():
+        if line.startswith("<<") and ">>" in line:
+            head, content = line.split(">>", 1)
+            out.append(f"{head}>> TR{content}")
+    if out:
+        return "\n".join(out)
+    return "TR " + body.replace("Text:\n", "", 1).strip()
+
+def corrupt(text: str, rnd: random.Random) -> str:
+    """Output rusak ala LLM: marker hilang, satu baris dibuang, atau baris digabung."""
+    lines = text.splitlines()
+    kind = rnd.choice(["strip_markers", "drop_line", "merge_lines"])
+    if kind == "drop_line" and len(lines) > 1:
+        del lines[rnd.randrange(len(lines))]
+    elif kind == "merge_lines" and len(lines) > 1:
+        i = rnd.randrange(len(lines) - 1)
+        lines[i : i + 2] = [lines[i] + " " + lines[i + 1]]
+    else:
+        lines = [line.split(">>", 1)[-1].strip() for line in lines]
+    return "\n".join(lines)
+
+def _make_handler(server: MockServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, code: int, payload: dict, headers: dict = None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _not_found(self):
+            self._send_json(404, {"error": {"message": f"{self.path} tidak ada (mock)", "type": "invalid_request_error"}})
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            m = re.search(r"/files/([^/]+)/content$", path)
+            if m:
+                data = server.file_content(m.group(1))
+                if data is None:
+                    return self._not_found()
+                self.send_response(200)
+                self.send_header("content-type", "application/octet-stream")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            m = re.search(r"/batches/([^/]+)$", path)
+            if m:
+                batch = server.get_batch(m.group(1))
+                return self._send_json(200, batch) if batch is not None else self._not_found()
+            self._send_json(200, server.snapshot())
+
+        def _upload(self, raw: bytes):
+            # multipart/form-data dari `client.files.create(file=..., purpose=...)`
+            head = f"content-type: {self.headers.get('content-type', '')}\r\n\r\n".encode("latin-1")
+            msg = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(head + raw)
+            fields, filename, data = {}, "batch.jsonl", b""
+            for part in msg.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                if name == "file":
+                    filename = part.get_filename() or filename
+                    data = part.get_payload(decode=True) or b""
+                else:
+                    fields[name] = part.get_content().strip()
+            self._send_json(200, server.add_file(filename, data, fields.get("purpose", "batch")))
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("content-length", 0)))
+            path = self.path.split("?", 1)[0]
+            if path.endswith("/files"):
+                return self._upload(raw)
+            if path.endswith("/batches"):
+                code, payload = server.create_batch(json.loads(raw or b"{}"))
+                return self._send_json(code, payload)
+            m = re.search(r"/batches/([^/]+)/cancel$", path)
+            if m:
+                batch = server.get_batch(m.group(1), cancel=True)
+                return self._send_json(200, batch) if batch is not None else self._not_found()
+
+            body = json.loads(raw or b"{}")
+            code, payload, headers = server.chat(body)
+            if code != 200 or not body.get("stream"):
+                self._send_json(code, payload, headers)
+                return
+
+            text, usage = payload["choices"][0]["message"]["content"], payload["usage"]
+            base = {k: payload[k] for k in ("id", "created", "model")}
+
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("connection", "close")
+            self.end_headers()
+            chunks = [
+                {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": {"content": text[i : i + 16]}, "finish_reason": None}]}
+                for i in range(0, len(text), 16)
+            ]
+            if (body.get("stream_options") or {}).get("include_usage"):
+                chunks.append({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            for chunk in chunks:
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench.mock_server", description=__doc__.split("\n")[1])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--latency-ms", type=float, default=200.0, help="Median latency per request.")
+    p.add_argument("--jitter", type=float, default=0.3, help="Sigma lognormal (0 = latency tetap).")
+    p.add_argument("--per-line-ms", type=float, default=5.0, help="Tambahan latency per baris output.")
+    p.add_argument("--rate-429", type=float, default=0.0, help="Peluang 429 per request (0..1).")
+    p.add_argument("--retry-after", type=float, default=1.0, help="Nilai header Retry-After (detik).")
+    p.add_argument("--rate-5xx", type=float, default=0.0, help="Peluang 503 per request (0..1).")
+    p.add_argument("--malformed", type=float, default=0.0, help="Peluang output rusak per request (0..1).")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--batch-delay", type=float, default=1.0, help="Lama batch diproses sebelum selesai (detik).")
+    args = p.parse_args(argv)
+    config = MockConfig(
+        args.latency_ms, args.jitter, args.per_line_ms, args.rate_429, args.retry_after, args.malformed, args.seed, args.rate_5xx,
+        args.batch_delay,
+    )
+    server = MockServer(config, args.host, args.port)
+    print(f"mock chat-completions di {server.base_url} (Ctrl+C untuk berhenti)", flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+# bench/run.py
+"""Benchmark throughput: matriks ukuran file × mode × concurrency × token budget terhadap server tiruan.
+
+Contoh:
+    python -m bench.run --sizes 100 1000 --modes block line pack --concurrency 4 16
+    python -m bench.run --sizes 10000 --modes pack --token-budget 800 1500 3000 --rate-429 0.05 --out hasil.csv
+    python -m bench.run --sizes 1000 --modes block --jitter 1.0 --hedge-pct 0 90 95
+
+Semua angka berasal dari `bench.mock_server` (tanpa network / API key); seed tetap → hasil bisa diulang.
+"""
+import argparse
+import csv
+import itertools
+import json
+import random
+import sys
+import time
+from datetime import timedelta
+from typing import Dict, List
+
+import srt
+
+from subtitle_translator import (
+    CircuitBreaker,
+    Hedger,
+    RunStats,
+    Telemetry,
+    TokenBucket,
+    make_client,
+    translate_subtitles,
+)
+
+from .mock_server import MockConfig, MockServer
+
+WORDS = (
+    "i you we they know think want need time right here there never always maybe "
+    "come go look wait stop please thanks sorry okay what why where who how "
+    "house car night day tomorrow today money friend father mother brother sister"
+).split()
+
+def synthetic_subs(n: int, dup_ratio: float = 0.1, seed: int = 0) -> List[srt.Subtitle]:
+    """`n` blok sintetis (1–2 baris, sebagian dengan tag <i>/{\\an8}); `dup_ratio` blok mengulang teks sebelumnya."""
+    rnd = random.Random(seed)
+    subs, texts = [], []
+    for i in range(n):
+        if texts and rnd.random() < dup_ratio:
+            content = rnd.choice(texts)
+        else:
+            lines = []
+            for _ in range(rnd.choice([1, 1, 2])):
+                line = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 9))).capitalize()
+                tag = rnd.random()
+                if tag < 0.1:
+                    line = f"<i>{line}</i>"
+                elif tag < 0.15:
+                    line = "{\\an8}" + line
+                lines.append(f"{line} #{i}")
+            content = "\n".join(lines)
+            texts.append(content)
+        start = timedelta(seconds=i * 3)
+        subs.append(srt.Subtitle(index=i + 1, start=start, end=start + timedelta(seconds=2), content=content))
+    return subs
+
+def untranslated_lines(src: List[srt.Subtitle], out: List[srt.Subtitle]) -> int:
+    """Baris output yang kosong / masih original (mis. akibat output rusak dari server)."""
+    bad = 0
+    for a, b in zip(src, out):
+        src_lines, out_lines = a.content.split("\n"), b.content.split("\n")
+        for j, line in enumerate(src_lines):
+            got = out_lines[j] if j < len(out_lines) else ""
+            if not got.strip() or got == line:
+                bad += 1
+    return bad
+
+def run_scenario(
+    server: MockServer, subs: List[srt.Subtitle], mode: str, concurrency: int, token_budget: int, args, hedge_pct: float = 0,
+) -> Dict:
+    # client sama seperti produksi (retry SDK mati, pool keep-alive) supaya overhead yang diukur milik translator
+    client = make_client(server.base_url, "bench", max_connections=2 * concurrency)
+    server.reset()
+    stats, telemetry = RunStats(), Telemetry()
+    limiter = TokenBucket(args.rps, capacity=concurrency) if args.rps else None
+    breaker = CircuitBreaker(args.breaker_threshold, args.breaker_cooldown)
+    hedger = Hedger(hedge_pct, args.hedge_max_ratio, min_delay=0.0, max_threads=2 * concurrency) if hedge_pct else None
+    started = time.monotonic()
+    out = translate_subtitles(
+        client, subs, "mock-model", "en", "id", mode,
+        workers=concurrency, limiter=limiter, breaker=breaker, hedger=hedger, dedup=not args.no_dedup, token_budget=token_budget,
+        max_retries=args.max_retries, backoff=args.backoff, repair_rounds=args.repair_rounds, stream=args.stream,
+        stats=stats, telemetry=telemetry,
+    )
+    elapsed = time.monotonic() - started
+    h = hedger.summary() if hedger is not None else {}
+    if hedger is not None:
+        hedger.close()
+    t = telemetry.summary(blocks_done=len(subs))
+    served = server.snapshot()
+    return {
+        "blocks": len(subs),
+        "mode": mode,
+        "concurrency": concurrency,
+        "token_budget": token_budget if mode == "pack" else "",
+        "elapsed_s": round(elapsed, 2),
+        "blocks_per_s": round(len(subs) / elapsed, 1),
+        "requests": served["requests"],
+        "rate_limited": served["rate_limited"],
+        "server_errors": served["server_errors"],
+        "malformed": served["malformed"],
+        "retries": t["retries"],
+        "backoff_s": t["backoff_s"],
+        "breaker_trips": breaker.trips,
+        "hedge_pct": hedge_pct or "",
+        "hedges": h.get("hedges", 0),
+        "hedge_saved_s": h.get("latency_saved_s", 0.0),
+        "retry_overhead": round(t["backoff_s"] / (elapsed * concurrency), 3) if elapsed else 0.0,
+        "latency_p50": t["latency_p50"],
+        "latency_p90": t["latency_p90"],
+        "latency_p99": t["latency_p99"],
+        "tokens": t["prompt_tokens"] + t["completion_tokens"],
+        "failed_blocks": stats.get("blocks_failed"),
+        "repaired_lines": stats.get("repaired_lines"),
+        "bad_lines": untranslated_lines(subs, out),
+    }
+
+COLUMNS = [
+    ("blocks", 6), ("mode", 5), ("concurrency", 4), ("token_budget", 6), ("elapsed_s", 8), ("blocks_per_s", 8),
+    ("requests", 8), ("rate_limited", 5), ("server_errors", 5), ("malformed", 7), ("retries", 7), ("backoff_s", 8), ("breaker_trips", 4), ("hedge_pct", 5),
+    ("hedges", 6), ("hedge_saved_s", 7), ("latency_p50", 7), ("latency_p90", 7), ("latency_p99", 7), ("failed_blocks", 6), ("repaired_lines", 8), ("bad_lines", 6),
+]
+HEADERS = {
+    "concurrency": "conc", "token_budget": "budget", "elapsed_s": "time_s", "blocks_per_s": "blk/s",
+    "rate_limited": "429", "server_errors": "5xx", "breaker_trips": "cb", "malformed": "bad_out", "latency_p50": "p50", "latency_p90": "p90", "latency_p99": "p99",
+    "hedge_pct": "hedge", "hedge_saved_s": "saved_s", "failed_blocks": "failed", "repaired_lines": "repaired", "bad_lines": "bad",
+}
+
+def format_row(row: Dict) -> str:
+    return "  ".join(str(row[k]).rjust(w) for k, w in COLUMNS)
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m bench.run", description="Benchmark throughput penerjemah subtitle (server tiruan).")
+    m = p.add_argument_group("Matriks")
+    m.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Jumlah blok per file sintetis.")
+    m.add_argument("--modes", nargs="+", choices=["block", "line", "pack"], default=["block", "line", "pack"])
+    m.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    m.add_argument("--token-budget", type=int, nargs="+", default=[1500], help="Hanya untuk mode pack.")
+
+    tr = p.add_argument_group("Translator")
+    tr.add_argument("--rps", type=float, default=0.0, help="Max requests / second (0 = tanpa batas).")
+    tr.add_argument("--max-retries", type=int, default=6)
+    tr.add_argument("--backoff", type=float, default=0.25, help="Backoff dasar (detik); kecil supaya bench cepat.")
+    tr.add_argument("--breaker-threshold", type=int, default=5)
+    tr.add_argument("--breaker-cooldown", type=float, default=2.0)
+    tr.add_argument("--repair-rounds", type=int, default=1)
+    tr.add_argument("--hedge-pct", type=float, nargs="+", default=[0], help="Persentil hedging (0 = tanpa), dimensi matriks.")
+    tr.add_argument("--hedge-max-ratio", type=float, default=0.1)
+    tr.add_argument("--stream", action="store_true")
+    tr.add_argument("--no-dedup", action="store_true")
+    tr.add_argument("--dup-ratio", type=float, default=0.1, help="Porsi blok yang mengulang teks sebelumnya.")
+
+    srv = p.add_argument_group("Server tiruan")
+    srv.add_argument("--latency-ms", type=float, default=200.0)
+    srv.add_argument("--jitter", type=float, default=0.3)
+    srv.add_argument("--per-line-ms", type=float, default=5.0)
+    srv.add_argument("--rate-429", type=float, default=0.0)
+    srv.add_argument("--retry-after", type=float, default=1.0)
+    srv.add_argument("--rate-5xx", type=float, default=0.0)
+    srv.add_argument("--malformed", type=float, default=0.0)
+    srv.add_argument("--seed", type=int, default=1234)
+
+    p.add_argument("--out", help="Simpan hasil ke file .json atau .csv.")
+    return p
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    config = MockConfig(
+        args.latency_ms, args.jitter, args.per_line_ms, args.rate_429, args.retry_after, args.malformed, args.seed, args.rate_5xx,
+    )
+    rows = []
+    with MockServer(config) as server:
+        print(f"mock server: {server.base_url} • latency {args.latency_ms:.0f}ms ±{args.jitter} • "
+              f"429 {args.rate_429:.0%} • 5xx {args.rate_5xx:.0%} • malformed {args.malformed:.0%}", flush=True)
+        print("  ".join(HEADERS.get(k, k).rjust(w) for k, w in COLUMNS), flush=True)
+        for size in args.sizes:
+            subs = synthetic_subs(size, args.dup_ratio, seed=args.seed)
+            for mode, conc, hedge_pct in itertools.product(args.modes, args.concurrency, args.hedge_pct):
+                for budget in args.token_budget if mode == "pack" else args.token_budget[:1]:
+                    row = run_scenario(server, subs, mode, conc, budget, args, hedge_pct)
+                    rows.append(row)
+                    print(format_row(row), flush=True)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            if args.out.lower().endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                json.dump({"config": vars(args), "results": rows}, f, indent=2)
+        print(f"hasil disimpan ke {args.out}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,15 @@
+# link_generator/__init__.py
+"""Core Universal Link Generator (tanpa Streamlit): pemendek link ouo.io massal."""
+from .cache import SHORTLINK_DEFAULT_PATH, ShortLinkCache, url_domain
+from .shortener import MAX_WORKERS, OUO_API_URL, OuoShortener, ShortenError, make_session
+
+__all__ = [
+    "MAX_WORKERS",
+    "OUO_API_URL",
+    "OuoShortener",
+    "SHORTLINK_DEFAULT_PATH",
+    "ShortLinkCache",
+    "ShortenError",
+    "make_session",
+    "url_domain",
+]
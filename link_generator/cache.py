@@ -0,0 +1,164 @@
+# link_generator/cache.py
+"""Cache link pendek on-disk (SQLite), dipakai bersama semua sesi, worker & proses Streamlit."""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urlparse
+
+from nuna_common.config import CACHE_DIR
+
+SHORTLINK_DEFAULT_PATH = os.path.join(CACHE_DIR, "shortlinks.sqlite3")
+
+def url_domain(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+class ShortLinkCache:
+    """URL → link pendek per akun (fingerprint API key); LRU eviction berdasarkan ukuran.
+
+    Hasil sukses disimpan tanpa TTL (link ouo.io tidak kedaluwarsa). Kegagalan disimpan terpisah
+    (`short` NULL) dan hanya berlaku `negative_ttl` detik: URL itu tidak dicoba ulang di setiap
+    Generate, tapi juga tidak pernah dianggap hasil valid. Invalidasi per URL atau per domain
+    berlaku untuk semua akun.
+    """
+
+    def __init__(
+        self,
+        path: str = SHORTLINK_DEFAULT_PATH,
+        account: str = "",
+        max_bytes: int = 16 * 1024 * 1024,
+        negative_ttl: float = 300.0,
+    ):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.account = account
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL: banyak proses/worker boleh membaca sambil 1 menulis
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS shortlinks ("
+                " key TEXT PRIMARY KEY, account TEXT, url TEXT, domain TEXT,"
+                " short TEXT, error TEXT, size INTEGER, created REAL, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS shortlinks_last_used ON shortlinks (last_used)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS shortlinks_domain ON shortlinks (domain)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS shortlinks_url ON shortlinks (url)")
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM shortlinks").fetchone()[0]
+
+    @staticmethod
+    def account_for(api_key: str) -> str:
+        """Fingerprint API key (key asli tidak disimpan di disk)."""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(f"{self.account}\x1f{url}".encode("utf-8")).hexdigest()
+
+    def _select(self, urls: Iterable[str], where: str, params: List) -> List[Tuple[str, str, str]]:
+        keys = {self._key(u): u for u in set(urls)}
+        rows = []
+        key_list = list(keys)
+        for start in range(0, len(key_list), 500):
+            chunk = key_list[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows += self._conn.execute(
+                f"SELECT key, short, error FROM shortlinks WHERE key IN ({marks}) AND {where}", chunk + params,
+            ).fetchall()
+        return [(keys[key], short, error) for key, short, error in rows]
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """{url: link pendek} untuk URL yang pernah berhasil diperpendek (akun ini)."""
+        with self._lock, self._conn:
+            rows = self._select(urls, "short IS NOT NULL", [])
+            if rows:
+                self._conn.executemany(
+                    "UPDATE shortlinks SET last_used = ? WHERE key = ?", [(time.time(), self._key(u)) for u, _, _ in rows],
+                )
+        return {url: short for url, short, _ in rows}
+
+    def get_failures(self, urls: Iterable[str]) -> Dict[str, str]:
+        """{url: pesan error} untuk kegagalan yang belum lewat `negative_ttl`."""
+        with self._lock:
+            rows = self._select(urls, "short IS NULL AND created > ?", [time.time() - self.negative_ttl])
+        return {url: error for url, _, error in rows}
+
+    def _put(self, rows: List[Tuple[str, str, str]]) -> None:
+        now = time.time()
+        records = [
+            (self._key(url), self.account, url, url_domain(url), short, error,
+             len(url.encode("utf-8")) + len((short or error or "").encode("utf-8")), now, now)
+            for url, short, error in rows
+        ]
+        with self._lock, self._conn:
+            # baris yang diganti (INSERT OR REPLACE) tidak boleh dihitung dua kali
+            replaced = 0
+            keys = [r[0] for r in records]
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM shortlinks WHERE key IN ({','.join('?' * len(chunk))})", chunk,
+                ).fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO shortlinks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            self._size += sum(r[6] for r in records) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def put_many(self, pairs: Dict[str, str]) -> None:
+        if pairs:
+            self._put([(url, short, None) for url, short in pairs.items()])
+
+    def put_failures(self, errors: Dict[str, str]) -> None:
+        if errors:
+            self._put([(url, None, error) for url, error in errors.items()])
+
+    def _evict(self) -> None:
+        # kegagalan kedaluwarsa dibuang dulu, lalu entri paling lama tidak dipakai sampai ±90% batas
+        self._conn.execute(
+            "DELETE FROM shortlinks WHERE short IS NULL AND created <= ?", (time.time() - self.negative_ttl,),
+        )
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM shortlinks").fetchone()[0]
+        while self._size > self.max_bytes * 0.9:
+            self._conn.execute(
+                "DELETE FROM shortlinks WHERE key IN (SELECT key FROM shortlinks ORDER BY last_used LIMIT 500)"
+            )
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM shortlinks").fetchone()[0]
+
+    def _delete(self, where: str, params: List) -> int:
+        with self._lock, self._conn:
+            deleted = self._conn.execute(f"DELETE FROM shortlinks WHERE {where}", params).rowcount
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM shortlinks").fetchone()[0]
+        return deleted
+
+    def invalidate(self, urls: Iterable[str]) -> int:
+        """Hapus URL tertentu (semua akun); kembalikan jumlah entri yang dihapus."""
+        urls = list(set(urls))
+        return sum(
+            self._delete(f"url IN ({','.join('?' * len(urls[i:i + 500]))})", urls[i:i + 500])
+            for i in range(0, len(urls), 500)
+        )
+
+    def invalidate_domain(self, domain: str) -> int:
+        """Hapus semua URL di `domain` termasuk subdomainnya (semua akun)."""
+        domain = domain.strip().lower().lstrip(".")
+        return self._delete("domain = ? OR domain LIKE ?", [domain, f"%.{domain}"]) if domain else 0
+
+    def clear(self) -> None:
+        """Kosongkan cache akun ini saja (cache lain di app tidak tersentuh)."""
+        self._delete("account = ?", [self.account])
+
+    def info(self) -> Tuple[int, int, int]:
+        """(link tersimpan, kegagalan aktif, ukuran byte seluruh file) untuk akun ini."""
+        with self._lock:
+            ok = self._conn.execute(
+                "SELECT COUNT(*) FROM shortlinks WHERE account = ? AND short IS NOT NULL", (self.account,),
+            ).fetchone()[0]
+            failed = self._conn.execute(
+                "SELECT COUNT(*) FROM shortlinks WHERE account = ? AND short IS NULL AND created > ?",
+                (self.account, time.time() - self.negative_ttl),
+            ).fetchone()[0]
+            return ok, failed, self._size
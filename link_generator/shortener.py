@@ -0,0 +1,140 @@
+# link_generator/shortener.py
+"""Pemendek link ouo.io massal: URL unik dikumpulkan dulu, lalu diperpendek paralel.
+
+Semua request lewat 1 `requests.Session` ber-pool (koneksi keep-alive dipakai ulang), jumlah
+request bersamaan dibatasi `workers`, dan laju total dibatasi token bucket bersama. 429 / 5xx /
+error jaringan di-retry dengan Retry-After atau exponential backoff + jitter.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nuna_common.ratelimit import TokenBucket
+
+OUO_API_URL = "https://ouo.io/api/{key}"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_WORKERS = 32  # batas `workers` per pemanggilan `shorten_many`; pool koneksi session sebesar ini
+
+class ShortenError(Exception):
+    """URL gagal diperpendek (link original tetap dipakai)."""
+
+def make_session(pool_size: int = 16) -> requests.Session:
+    """Session dengan pool koneksi sebesar `pool_size` (≥ jumlah worker); retry ditangani `OuoShortener`."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class OuoShortener:
+    """Pemendek ouo.io untuk 1 API key, aman dibagi antar sesi (`st.cache_resource`).
+
+    `workers` = request bersamaan default tiap `shorten_many`, `rate` = request/detik total untuk semua
+    pemanggil (0 = tanpa batas; tetap selama umur objek). `cache` (mis. `ShortLinkCache`) menyimpan
+    hasil sukses & kegagalan terbaru; None = tanpa cache.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        workers: int = 8,
+        rate: float = 4.0,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        cache=None,
+        session: requests.Session = None,
+    ):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache
+        self.session = session or make_session(max(MAX_WORKERS, workers))
+        self.limiter = TokenBucket(rate, capacity=workers)
+        self.workers = workers
+
+    def shorten(self, url: str) -> str:
+        """1 URL → link ouo.io (tanpa cache); `ShortenError` bila tetap gagal setelah retry."""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            retry_after = None
+            try:
+                resp = self.session.get(
+                    OUO_API_URL.format(key=self.api_key), params={"s": url}, timeout=self.timeout,
+                )
+            except requests.exceptions.RequestException as e:
+                error = f"koneksi gagal: {e}"
+            else:
+                short = resp.text.strip()
+                if resp.status_code == 200 and short.startswith("http"):
+                    return short
+                if resp.status_code == 200:
+                    raise ShortenError(f"respons bukan URL: {short[:80]!r}")
+                if resp.status_code not in RETRY_STATUS:
+                    raise ShortenError(f"HTTP {resp.status_code}")
+                error = f"HTTP {resp.status_code}"
+                try:
+                    retry_after = float(resp.headers.get("Retry-After", ""))
+                except ValueError:
+                    pass
+            if attempt > self.max_retries:
+                raise ShortenError(error)
+            delay = retry_after if retry_after is not None else self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            time.sleep(min(delay, 60.0))
+
+    def shorten_many(
+        self, urls: Iterable[str], on_progress: Callable[[int, int], None] = None, workers: int = None,
+    ) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Perpendek semua URL unik → ({url: short}, {url: pesan error}).
+
+        URL duplikat digabung; yang sudah ada di cache (sukses, atau gagal belum lama ini) tidak
+        dikirim. `workers` = request bersamaan untuk pemanggilan ini saja (default `self.workers`,
+        maks. `MAX_WORKERS`); laju total tetap dibatasi limiter bersama. `on_progress(done, total)`
+        dipanggil dari thread pemanggil (aman untuk update widget Streamlit).
+        """
+        unique: List[str] = list(dict.fromkeys(u for u in urls if u))
+        short = self.cache.get_many(unique) if self.cache is not None else {}
+        errors: Dict[str, str] = {}
+        if self.cache is not None:
+            pending = [u for u in unique if u not in short]
+            errors = {
+                url: f"{err} (gagal baru-baru ini, belum dicoba ulang)"
+                for url, err in self.cache.get_failures(pending).items()
+            }
+        todo = [u for u in unique if u not in short and u not in errors]
+        done, total = len(short) + len(errors), len(unique)
+        if on_progress is not None:
+            on_progress(done, total)
+        if not todo:
+            return short, errors
+        fresh: Dict[str, str] = {}
+        failed: Dict[str, str] = {}
+        workers = min(max(1, int(workers or self.workers)), MAX_WORKERS, len(todo))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ouo") as pool:
+            futures = {pool.submit(self.shorten, url): url for url in todo}
+            for fut in as_completed(futures):
+                url = futures[fut]
+                try:
+                    fresh[url] = fut.result()
+                except ShortenError as e:
+                    failed[url] = str(e)
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, total)
+        if self.cache is not None:
+            self.cache.put_many(fresh)
+            self.cache.put_failures(failed)
+        short.update(fresh)
+        errors.update(failed)
+        return short, errors
+
+    def clear_cache(self) -> None:
+        if self.cache is not None:
+            self.cache.clear()
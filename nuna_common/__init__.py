@@ -0,0 +1,6 @@
+# nuna_common/__init__.py
+"""Utilitas kecil tanpa dependensi yang dipakai bersama beberapa tool (subtitle translator, link generator)."""
+from .config import CACHE_DIR
+from .ratelimit import TokenBucket
+
+__all__ = ["CACHE_DIR", "TokenBucket"]
@@ -0,0 +1,4 @@
+# nuna_common/config.py
+"""Lokasi data on-disk bersama semua tool (cache, translation memory, journal)."""
+
+CACHE_DIR = ".nuna_cache"
@@ -0,0 +1,28 @@
+# nuna_common/ratelimit.py
+"""Rate limiter bersama (thread-safe), tanpa dependensi di luar stdlib."""
+import threading
+import time
+
+class TokenBucket:
+    """Rate limiter thread-safe: isi `rate` token/detik, simpan maks `capacity` token (burst)."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait_s = (n - self._tokens) / self.rate
+            time.sleep(wait_s)
@@ -1,10 +1,10 @@
 import streamlit as st
-import requests
-import time
 import json
 import base64
 from datetime import datetime
 
+from link_generator import MAX_WORKERS, SHORTLINK_DEFAULT_PATH, OuoShortener, ShortLinkCache
+
 # ===== Helper fallback untuk toggle =====
 def ui_toggle(label, value=False, key=None, help=None, disabled=False):
     """Pakai st.toggle jika tersedia; fallback ke st.checkbox jika tidak."""
@@ -17,31 +17,56 @@ def ui_toggle(label, value=False, key=None, help=None, disabled=False):
 # FUNGSI-FUNGSI HELPER
 # =============================================================================
 
-def shorten_with_ouo(url, api_key):
-    """(RAW) Memperpendek URL menggunakan ouo.io API (tanpa cache)."""
+@st.cache_resource(show_spinner=False)
+def get_shortener(api_key, rate):
+    """1 pemendek per API key untuk seluruh proses: pool koneksi, rate limiter & cache dibagi semua sesi.
+
+    Laju hanya dari secrets (`OUO_RATE`), bukan widget per sesi: limiter dibagi semua sesi, jadi 1 sesi
+    tidak boleh mengubah laju sesi lain. Cache-nya SQLite on-disk (bertahan saat app restart, dibagi
+    juga antar proses/worker).
+    """
+    cache = ShortLinkCache(SHORTLINK_DEFAULT_PATH, account=ShortLinkCache.account_for(api_key))
+    return OuoShortener(api_key, rate=rate, cache=cache)
+
+def collect_urls_to_shorten(data, episode_range, resolutions, servers, shorten_servers, include_streaming=False):
+    """Semua URL (unik, urutan tampil) yang akan diperpendek oleh renderer dengan pengaturan yang sama."""
+    urls = {}
+    for ep_num in episode_range:
+        if ep_num not in data:
+            continue
+        if include_streaming and "Streaming" in shorten_servers and data[ep_num].get('stream_link'):
+            urls[data[ep_num]['stream_link']] = None
+        download_links = data[ep_num].get('download_links', {})
+        for res in resolutions:
+            for server in servers:
+                if server in shorten_servers and server in download_links.get(res, {}):
+                    urls[download_links[res][server]] = None
+    return list(urls)
+
+def shorten_links(urls, api_key, rate, workers):
+    """Tahap bulk sebelum render: semua URL diperpendek paralel → {url: link ouo.io}. Gagal = link original."""
+    if not urls:
+        return {}
     if not api_key:
         st.warning("API Key ouo.io tidak ditemukan. Link tidak diperpendek.", icon="🔑")
-        return url
-    try:
-        api_url = f'https://ouo.io/api/{api_key}?s={url}'
-        response = requests.get(api_url, timeout=10)
-        if response.status_code == 200:
-            time.sleep(0.5)  # throttle ringan agar aman
-            return response.text.strip()
-        else:
-            st.warning(f"Gagal memperpendek {url}. Status: {response.status_code}")
-            return url
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error koneksi saat menghubungi ouo.io: {e}")
-        return url
-
-@st.cache_data(show_spinner=False, ttl=3600)
-def ouo_cached(api_key, url):
-    """Wrapper cached: 1× panggil per (api_key, url) selama TTL."""
-    return shorten_with_ouo(url, api_key)
-
-def generate_output_resolusi_per_baris(data, episode_range, resolutions, servers, use_uppercase=True, shorten_servers=[], api_key=""):
+        return {}
+    shortener = get_shortener(api_key, rate)
+    bar = st.progress(0.0, text="Memperpendek link...")
+    short, errors = shortener.shorten_many(
+        urls, on_progress=lambda done, total: bar.progress(done / total, text=f"Memperpendek link {done}/{total}"),
+        workers=workers,
+    )
+    bar.empty()
+    if errors:
+        st.warning(
+            f"{len(errors)} dari {len(urls)} link gagal diperpendek (link original dipakai):\n"
+            + "\n".join(f"- {url}: {err}" for url, err in list(errors.items())[:5])
+        )
+    return short
+
+def generate_output_resolusi_per_baris(data, episode_range, resolutions, servers, use_uppercase=True, shorten_servers=[], short_urls=None):
     """Menghasilkan output HTML format Resolusi per Baris (versi baru)."""
+    short_urls = short_urls or {}
     all_html_lines = []
     with st.spinner('Memproses link...'):
         for ep_num in episode_range:
@@ -65,7 +90,7 @@ def generate_output_resolusi_per_baris(data, episode_range, resolutions, servers
                     if server in download_links[res]:
                         url = download_links[res][server]
                         if server in shorten_servers:
-                            url = ouo_cached(api_key, url)  # <<< CACHE
+                            url = short_urls.get(url, url)
                         display_server = server.upper() if use_uppercase else server
                         link_html = f'<a href="{url}" rel="nofollow" data-wpel-link="external">{display_server}</a>'
                         line_parts.append(link_html)
@@ -73,8 +98,9 @@ def generate_output_resolusi_per_baris(data, episode_range, resolutions, servers
                     all_html_lines.append("<li>" + " ".join(line_parts) + "</li>")
     return "<ul>\n" + "\n".join(all_html_lines) + "\n</ul>"
 
-def generate_output_ringkas(data, episode_range, resolutions, servers, grouping_style, use_uppercase=True, include_streaming=False, shorten_servers=[], api_key=""):
+def generate_output_ringkas(data, episode_range, resolutions, servers, grouping_style, use_uppercase=True, include_streaming=False, shorten_servers=[], short_urls=None):
     """Menghasilkan output HTML format ringkas."""
+    short_urls = short_urls or {}
     txt_lines = []
     with st.spinner('Memproses link...'):
         for ep_num in episode_range:
@@ -85,7 +111,7 @@ def generate_output_ringkas(data, episode_range, resolutions, servers, grouping_
             if include_streaming and data[ep_num].get('stream_link'):
                 stream_url = data[ep_num]['stream_link']
                 if "Streaming" in shorten_servers:
-                    stream_url = ouo_cached(api_key, stream_url)  # <<< CACHE
+                    stream_url = short_urls.get(stream_url, stream_url)
                 link_parts.append(f'<a href="{stream_url}">Streaming</a>')
 
             download_links = data[ep_num].get('download_links', {})
@@ -95,7 +121,7 @@ def generate_output_ringkas(data, episode_range, resolutions, servers, grouping_
                         if res in download_links and server in download_links[res]:
                             url = download_links[res][server]
                             if server in shorten_servers:
-                                url = ouo_cached(api_key, url)  # <<< CACHE
+                                url = short_urls.get(url, url)
                             display_server = server.upper() if use_uppercase else server
                             link_parts.append(f'<a href="{url}" rel="nofollow" data-wpel-link="external">{display_server} {res}</a>')
             else:  # "Resolusi"
@@ -104,7 +130,7 @@ def generate_output_ringkas(data, episode_range, resolutions, servers, grouping_
                         if res in download_links and server in download_links[res]:
                             url = download_links[res][server]
                             if server in shorten_servers:
-                                url = ouo_cached(api_key, url)  # <<< CACHE
+                                url = short_urls.get(url, url)
                             display_server = server.upper() if use_uppercase else server
                             link_parts.append(f'<a href="{url}" rel="nofollow" data-wpel-link="external">{display_server} {res}</a>')
 
@@ -112,12 +138,13 @@ def generate_output_ringkas(data, episode_range, resolutions, servers, grouping_
                 txt_lines.append(f'<li><strong>EPISODE {ep_num}</strong> {" ".join(link_parts)}</li>')
     return "\n".join(txt_lines)
 
-def generate_output_drakor(data, episode_range, resolutions, servers, use_uppercase=True, is_centered=False, shorten_servers=[], api_key=""):
+def generate_output_drakor(data, episode_range, resolutions, servers, use_uppercase=True, is_centered=False, shorten_servers=[], short_urls=None):
     """Menghasilkan output HTML format Drakor."""
+    short_urls = short_urls or {}
     html_lines = []
     style_attr = ' style="text-align: center;"' if is_centered else ''
     
-    with st.spinner('Memproses dan memperpendek link...'):
+    with st.spinner('Memproses link...'):
         for ep_num in episode_range:
             if ep_num not in data: 
                 continue
@@ -134,7 +161,7 @@ def generate_output_drakor(data, episode_range, resolutions, servers, use_upperc
                     if server in download_links[res]:
                         url = download_links[res][server]
                         if server in shorten_servers:
-                            url = ouo_cached(api_key, url)  # <<< CACHE
+                            url = short_urls.get(url, url)
                         display_server = server.upper() if use_uppercase else server
                         link_parts.append(f'<a href="{url}">{display_server}</a>')
                 if link_parts:
@@ -171,9 +198,34 @@ st.title("Universal Link Generator")
 # --- Pengaturan Sidebar ---
 st.sidebar.header("Pengaturan Global")
 ouo_api_key = st.sidebar.text_input("API Key ouo.io", value="8pHuHRq5", type="password", help="Masukkan API Key Anda dari ouo.io.")
-if st.sidebar.button("Bersihkan Cache Pemendek"):
-    st.cache_data.clear()
-    st.sidebar.success("Cache pemendek dibersihkan.")
+ouo_workers = st.sidebar.number_input(
+    "Koneksi paralel ouo.io", 1, MAX_WORKERS, 8, 1, help="Jumlah request pemendek yang berjalan bersamaan (sesi ini saja).",
+)
+ouo_rate = float(st.secrets.get("OUO_RATE", 4.0))
+st.sidebar.caption(
+    f"Laju bersama semua sesi (secrets OUO_RATE): {f'{ouo_rate:g} request/detik' if ouo_rate else 'tanpa batas'}."
+)
+if ouo_api_key:
+    with st.sidebar.expander("Cache pemendek"):
+        shortlink_cache = get_shortener(ouo_api_key, ouo_rate).cache
+        cached_ok, cached_failed, cache_bytes = shortlink_cache.info()
+        st.caption(
+            f"{cached_ok} link tersimpan • {cached_failed} gagal (dicoba lagi setelah "
+            f"{shortlink_cache.negative_ttl / 60:.0f} menit) • {cache_bytes / 1024:.0f} KB"
+        )
+        invalidate_text = st.text_area(
+            "Hapus URL / domain dari cache", height=80,
+            help="1 per baris: URL lengkap (https://...) atau domain (mis. terabox.com, termasuk subdomain).",
+        )
+        if st.button("Hapus entri"):
+            lines = [line.strip() for line in invalidate_text.splitlines() if line.strip()]
+            urls = [line for line in lines if "://" in line]
+            removed = shortlink_cache.invalidate(urls) if urls else 0
+            removed += sum(shortlink_cache.invalidate_domain(line) for line in lines if "://" not in line)
+            st.success(f"{removed} entri dihapus dari cache.")
+        if st.button("Bersihkan Cache Pemendek"):
+            get_shortener(ouo_api_key, ouo_rate).clear_cache()
+            st.success("Cache pemendek (API key ini) dibersihkan.")
 
 st.sidebar.divider()
 st.sidebar.header("Simpan & Muat Sesi")
@@ -426,24 +478,32 @@ with col2:
             active_resolutions = st.session_state.get('resolutions', [])
             input_mode = st.session_state.get('input_mode')
             episode_range = [1] if input_mode == "Single Link" else range(st.session_state.start_ep, st.session_state.end_ep + 1)
-            
+
+            # kumpulkan & perpendek semua link sekaligus (dedup, paralel), renderer hanya memakai hasilnya
+            short_urls = shorten_links(
+                collect_urls_to_shorten(
+                    st.session_state.main_data, episode_range, active_resolutions, st.session_state.server_order,
+                    servers_to_shorten, include_streaming=output_format == "Format Ringkas" and include_streaming,
+                ),
+                ouo_api_key, ouo_rate, ouo_workers,
+            )
             if output_format == "Format Ringkas":
                 st.session_state.final_html = generate_output_ringkas(
                     st.session_state.main_data, episode_range, active_resolutions,
                     st.session_state.server_order, grouping_style, use_uppercase_ringkas,
-                    include_streaming, servers_to_shorten, ouo_api_key
+                    include_streaming, servers_to_shorten, short_urls
                 )
             elif output_format == "Format Drakor":
                 st.session_state.final_html = generate_output_drakor(
                     st.session_state.main_data, episode_range, active_resolutions,
                     st.session_state.server_order, use_uppercase_drakor,
-                    is_centered, servers_to_shorten, ouo_api_key
+                    is_centered, servers_to_shorten, short_urls
                 )
             else:  # Format Resolusi per Baris
                 st.session_state.final_html = generate_output_resolusi_per_baris(
                     st.session_state.main_data, episode_range, active_resolutions,
                     st.session_state.server_order, use_uppercase_res_per_baris,
-                    servers_to_shorten, ouo_api_key
+                    servers_to_shorten, short_urls
                 )
 
         if st.session_state.final_html:
@@ -1,15 +1,38 @@
 # pages/2_Subtitle_Translator.py
+import hashlib
 import io
-import time
 import math
-import re
+import os
+import uuid
 from datetime import timedelta
-from typing import List, Tuple
 
 import streamlit as st
 import srt
 import pandas as pd
 
+from subtitle_translator import (
+    TM_DEFAULT_PATH,
+    Job,
+    JobJournal,
+    EndpointPool,
+    JobManager,
+    PassthroughFilter,
+    PooledClient,
+    Pricing,
+    RateGovernor,
+    Segmenter,
+    TokenBucket,
+    TranslationMemory,
+    estimate_run,
+    http2_available,
+    iter_subtitles,
+    journal_for,
+    journal_keys,
+    make_client,
+    parse_endpoints,
+    parse_glossary,
+)
+
 # Try import OpenAI client
 try:
     from openai import OpenAI
@@ -23,103 +46,72 @@ st.set_page_config(page_title="Subtitle Translator", layout="wide")
 st.title("🎬 Subtitle Translator (DeepSeek / OpenAI-compatible)")
 
 # ───────────────────────────────────────────────────────────────────────────────
-# Helpers: mask/unmask HTML & ASS tags, rate limit detection
-HTML_TAG_RE = re.compile(r"<[^>]+>")
-ASS_TAG_RE = re.compile(r"\{\\[^}]*\}")
-
-def mask_tags(text: str) -> Tuple[str, List[str], List[str]]:
-    html_tags, ass_tags = [], []
-
-    def _mh(m):
-        html_tags.append(m.group(0))
-        return f"[[HTML_TAG_{len(html_tags)-1}]]"
-
-    def _ma(m):
-        ass_tags.append(m.group(0))
-        return f"[[ASS_TAG_{len(ass_tags)-1}]]"
-
-    text = HTML_TAG_RE.sub(_mh, text)
-    text = ASS_TAG_RE.sub(_ma, text)
-    return text, html_tags, ass_tags
-
-def unmask_tags(text: str, html_tags: List[str], ass_tags: List[str]) -> str:
-    for i, t in enumerate(html_tags):
-        text = text.replace(f"[[HTML_TAG_{i}]]", t)
-    for i, t in enumerate(ass_tags):
-        text = text.replace(f"[[ASS_TAG_{i}]]", t)
-    return text
-
-def is_rate_limit(err: Exception) -> bool:
-    s = str(err).lower()
-    return "rate limit" in s or "429" in s
+# Resource bersama (core penerjemah ada di package `subtitle_translator`, juga dipakai CLI)
+@st.cache_resource(show_spinner=False)
+def get_translation_memory(path: str, max_mb: int) -> TranslationMemory:
+    """1 instance per (path, ukuran) untuk seluruh proses; dipakai bersama semua sesi."""
+    return TranslationMemory(path, max_bytes=int(max_mb) * 1024 * 1024)
+
+@st.cache_resource(show_spinner=False)
+def get_rate_governor(base_url: str, key_fingerprint: str, rpm: float, tpm: float) -> RateGovernor:
+    """1 governor per (base URL, API key): semua sesi & job yang memakai key sama berbagi kuota RPM/TPM.
+
+    Kuota hanya dari secrets (`DEEPSEEK_RPM` / `DEEPSEEK_TPM`), bukan widget per sesi: governor dibagi
+    semua sesi, jadi 1 sesi tidak boleh menurunkan / menaikkan kuota job sesi lain.
+    """
+    return RateGovernor(rpm, tpm)
+
+@st.cache_resource(show_spinner=False)
+def get_client(base_url: str, api_key: str, connect_timeout: float, read_timeout: float) -> OpenAI:
+    """1 client per (base URL, API key, timeout): koneksi keep-alive dipakai ulang oleh semua run & worker."""
+    return make_client(base_url, api_key, connect_timeout, read_timeout)
+
+@st.cache_resource(show_spinner=False)
+def get_endpoint_pool(config: str, connect_timeout: float, read_timeout: float) -> EndpointPool:
+    """1 pool per konfigurasi: latency & kesehatan endpoint terukur bersama oleh semua sesi."""
+    return EndpointPool(
+        parse_endpoints(config, st.secrets),
+        client_factory=lambda url, key: make_client(url, key, connect_timeout, read_timeout),
+    )
 
-# ───────────────────────────────────────────────────────────────────────────────
-# OpenAI-compatible call
-def chat_translate(client, model: str, system: str, user: str) -> str:
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        temperature=0.0,
+# Kerja per rerun (parse, estimasi, cek journal) di-cache per isi file + setting: slider, pindah
+# halaman tabel & refresh fragment tidak mengulang pekerjaan sinkron ini.
+@st.cache_data(show_spinner=False, max_entries=16)
+def parse_upload(digest: str, _data: bytes) -> list:
+    """Parse .srt sekali per isi file (`digest` = sha256 bytes upload)."""
+    return list(srt.sort_and_reindex(iter_subtitles(io.BytesIO(_data))))
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_estimate(
+    digest: str, mode: str, src: str, tgt: str, dedup: bool, token_budget: int,
+    glossary_items: tuple, pricing_values: tuple, prefilter_rules: tuple, segmenter_config: tuple, _subs: list,
+) -> dict:
+    """`estimate_run` untuk 1 file × 1 bahasa; key = digest file + semua setting yang memengaruhi estimasi."""
+    return estimate_run(
+        _subs, mode, src, tgt, dedup, token_budget, dict(glossary_items), Pricing(*pricing_values),
+        PassthroughFilter(prefilter_rules) if prefilter_rules else None,
+        Segmenter(*segmenter_config) if segmenter_config else None,
     )
-    return resp.choices[0].message.content.strip()
-
-def translate_block(
-    client,
-    model: str,
-    lines: List[str],
-    src: str,
-    tgt: str,
-    max_retries=6,
-    backoff=2.0,
-) -> List[str]:
-    """1 request per subtitle block; jaga jumlah & urutan baris."""
-    masked_lines, html_store, ass_store = [], [], []
-    for line in lines:
-        m, h, a = mask_tags(line)
-        masked_lines.append(m)
-        html_store.append(h)
-        ass_store.append(a)
-
-    parts = [f"<<LINE {i}>> {masked_lines[i]}" for i in range(len(masked_lines))]
-    prompt = "\n".join(parts)
-
-    system = (
-        "You are a professional subtitle translator.\n"
-        "Translate exactly from the source language to the target language.\n"
-        "Keep ALL placeholders like [[HTML_TAG_#]] and [[ASS_TAG_#]] unchanged.\n"
-        "DO NOT reorder or merge lines. Return the same number of lines, each starting with '<<LINE i>> ' prefix unchanged.\n"
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_journal_hits(
+    path: str, stamp: tuple, digest: str, src: str, tgts: tuple, model: str, mode: str,
+    glossary_items: tuple, prefilter_rules: tuple, segmenter_config: tuple, _subs: list,
+) -> int:
+    """Jumlah blok×bahasa yang sudah ada di journal; `stamp` (mtime, ukuran) membuat cache basi saat journal bertambah."""
+    entries = JobJournal(path).load()
+    prefilter = PassthroughFilter(prefilter_rules) if prefilter_rules else None
+    segmenter = Segmenter(*segmenter_config) if segmenter_config else None
+    return sum(
+        1 for tgt in tgts
+        for key in journal_keys(_subs, src, tgt, model, mode, dict(glossary_items), prefilter, segmenter)
+        if key in entries
     )
-    user = f"Source language: {src}\nTarget language: {tgt}\n\n{prompt}"
 
-    attempt = 0
-    while True:
-        try:
-            out = chat_translate(client, model, system, user)
-            # parse back
-            out_lines = [""] * len(lines)
-            for raw in out.splitlines():
-                raw = raw.strip()
-                if not raw.startswith("<<LINE"):
-                    continue
-                try:
-                    head, content = raw.split(">>", 1)
-                    idx = int(head.replace("<<LINE", "").strip())
-                    out_lines[idx] = content.lstrip()
-                except Exception:
-                    continue
-            # unmask
-            final = []
-            for i, content in enumerate(out_lines):
-                final.append(unmask_tags(content, html_store[i], ass_store[i]))
-            return final
-        except Exception as e:
-            attempt += 1
-            if attempt > max_retries or not is_rate_limit(e):
-                raise
-            time.sleep(backoff * (2 ** (attempt - 1)))
+@st.cache_resource(show_spinner=False)
+def get_job_manager() -> JobManager:
+    """Antrian job background untuk seluruh proses: tetap jalan walau rerun, pindah page, atau tab ditutup."""
+    return JobManager(max_jobs=2)
 
 # ───────────────────────────────────────────────────────────────────────────────
 # Sidebar: API Settings (pakai secrets bila tersedia)
@@ -149,54 +141,319 @@ base_url = st.sidebar.text_input(
 model = st.sidebar.text_input("Model", value="deepseek-chat")
 
 effective_api_key = secret_key if (use_secrets and secret_key) else api_key_input
+connect_timeout = st.sidebar.number_input("Connect timeout (seconds)", 1.0, 60.0, 10.0, 1.0)
+read_timeout = st.sidebar.number_input(
+    "Read timeout (seconds)", 10.0, 900.0, 120.0, 10.0,
+    help="Batas menunggu response non-stream (stream memakai stall timeout di bawah)."
+)
+st.sidebar.caption(
+    "Koneksi HTTP dipakai ulang antar request & run (keep-alive)"
+    + (" • HTTP/2 aktif." if http2_available() else " • HTTP/2 nonaktif (paket `h2` tidak terpasang).")
+)
+
+secret_pool = st.secrets.get("ENDPOINT_POOL", "")
+use_pool = st.sidebar.checkbox(
+    "Use endpoint pool", value=bool(secret_pool),
+    help="Bagi request ke beberapa key / provider / server lokal; menggantikan API Key & Base URL di atas."
+)
+endpoint_pool = None
+pin_model = False
+if use_pool:
+    pool_config = st.sidebar.text_area(
+        "Endpoints (nama | base_url | api_key | model | rpm)",
+        value=secret_pool,
+        help="1 endpoint per baris. api_key boleh `$NAMA_SECRET`; model & rpm opsional. "
+             "Request diarahkan ke endpoint sehat dengan latency & sisa kuota terbaik.",
+    )
+    pin_model = st.sidebar.checkbox(
+        "Pin job ke model di atas", value=True,
+        help="Semua request job hanya ke endpoint dengan model yang sama (terjemahan konsisten). "
+             "Matikan untuk memakai semua endpoint, masing-masing dengan modelnya sendiri."
+    )
+    try:
+        endpoint_pool = get_endpoint_pool(pool_config, connect_timeout, read_timeout)
+        with st.sidebar.expander(f"Endpoint status ({len(endpoint_pool.endpoints)})"):
+            st.dataframe(pd.DataFrame(endpoint_pool.status()), hide_index=True)
+    except ValueError as e:
+        st.sidebar.error(f"Konfigurasi pool tidak valid: {e}")
 
 # Translate Settings
 st.sidebar.header("Translate Settings")
 src_lang = st.sidebar.text_input("Source language", value="en")
-tgt_lang = st.sidebar.text_input("Target language", value="id")
-delay = st.sidebar.slider("Delay per block (seconds)", 0.0, 2.0, 0.2, 0.1)
-checkpoint_every = st.sidebar.number_input("Checkpoint every N blocks", 1, 9999, 25, 1)
-max_retries = st.sidebar.number_input("Max retries (rate limit)", 0, 20, 6, 1)
+tgt_lang = st.sidebar.text_input(
+    "Target language(s)", value="id",
+    help="Beberapa bahasa dipisah koma (mis. `id, ms, en`): 1 job per file, file di-parse & di-mask sekali, "
+         "semua bahasa berbagi worker yang sama."
+)
+tgt_langs = list(dict.fromkeys(t.strip() for t in tgt_lang.split(",") if t.strip())) or ["id"]
+glossary_text = st.sidebar.text_area(
+    "Glossary (sumber = terjemahan)", value=st.secrets.get("GLOSSARY", ""),
+    help="1 istilah per baris. Masuk ke system prompt yang sama untuk semua request (ramah prompt caching). "
+         "Translation memory & journal ikut membedakan glosarium: glosarium baru = baris diterjemahkan ulang.",
+)
+try:
+    glossary = parse_glossary(glossary_text)
+except ValueError as e:
+    st.sidebar.error(f"Glossary tidak valid: {e}")
+    glossary = {}
+with st.sidebar.expander("Harga token (USD / 1M token)"):
+    default_pricing = Pricing()
+    pricing = Pricing(
+        st.number_input("Input (cache miss)", 0.0, 100.0, default_pricing.input, 0.01, format="%.3f"),
+        st.number_input("Input (cache hit)", 0.0, 100.0, default_pricing.cached_input, 0.001, format="%.3f"),
+        st.number_input("Output", 0.0, 100.0, default_pricing.output, 0.01, format="%.3f"),
+    )
+workers = st.sidebar.number_input(
+    "Concurrent workers", 1, 32, 4, 1,
+    help="Jumlah request yang berjalan bersamaan."
+)
+rate_limit = st.sidebar.number_input(
+    "Max requests / second", 0.0, 50.0, 5.0, 0.5,
+    help="Token bucket yang dibagi semua worker (menggantikan delay per blok). 0 = tanpa batas."
+)
+shared_rpm = float(st.secrets.get("DEEPSEEK_RPM", 0))
+shared_tpm = float(st.secrets.get("DEEPSEEK_TPM", 0))
+st.sidebar.caption(
+    f"Kuota bersama semua sesi (secrets DEEPSEEK_RPM / DEEPSEEK_TPM): "
+    f"{f'{shared_rpm:.0f} RPM' if shared_rpm else 'RPM tanpa batas'} • "
+    f"{f'{shared_tpm:.0f} TPM' if shared_tpm else 'TPM tanpa batas'}, dibagi adil antar job aktif."
+)
+max_retries = st.sidebar.number_input(
+    "Max retries (429 / 5xx / network)", 0, 20, 6, 1,
+    help="Retry-After dari server diikuti; tanpa header pakai exponential backoff + jitter."
+)
 backoff = st.sidebar.number_input("Backoff base (seconds)", 0.5, 30.0, 2.0, 0.5)
+breaker_threshold = st.sidebar.number_input(
+    "Circuit breaker: error berturut-turut", 1, 50, 5, 1,
+    help="Setelah sekian error transient berturut-turut, SEMUA worker dijeda bersama."
+)
+breaker_cooldown = st.sidebar.number_input("Circuit breaker cooldown (seconds)", 1.0, 300.0, 10.0, 1.0)
+hedge_requests = st.sidebar.checkbox(
+    "Hedge slow requests", value=False,
+    help="Request yang lebih lambat dari persentil latency terbaru dikirim sekali lagi (ke endpoint lain bila pakai pool); "
+         "hasil yang datang duluan dipakai."
+)
+hedge_pct = st.sidebar.slider("Hedge setelah persentil latency", 50, 99, 95, 1, disabled=not hedge_requests)
+hedge_max_ratio = st.sidebar.number_input(
+    "Maks. duplikat (% request)", 1, 100, 10, 1,
+    help="Batas biaya: request duplikat tetap ditagih walau hasilnya dibuang.",
+    disabled=not hedge_requests,
+)
 
 st.sidebar.header("Mode")
-mode = st.sidebar.radio("Granularity", ["block", "line"], index=0, help="block = 1 request per subtitle block; line = per baris")
+mode = st.sidebar.radio(
+    "Granularity", ["block", "line", "pack"], index=0,
+    help="block = 1 request per subtitle block; line = per baris; pack = banyak blok berurutan per request"
+)
+dedup = st.sidebar.checkbox(
+    "Deduplicate identical lines", value=True,
+    help="Teks identik (setelah tag di-mask) hanya diterjemahkan sekali lalu dibagikan ke semua kemunculannya."
+)
+PREFILTER_LABELS = {
+    "tags_only": "Tag saja",
+    "music": "Musik (♪)",
+    "numeric": "Angka / timestamp",
+    "speaker": "Nama speaker saja",
+    "target_language": "Sudah dalam bahasa target",
+}
+prefilter_rules = st.sidebar.multiselect(
+    "Lewati tanpa request", list(PREFILTER_LABELS), default=list(PREFILTER_LABELS), format_func=PREFILTER_LABELS.get,
+    help="Blok yang SEMUA barisnya cocok diteruskan apa adanya, tanpa dikirim ke model. "
+    "Bahasa target beraksara Latin tidak dideteksi oleh rule 'sudah dalam bahasa target'.",
+)
+prefilter = PassthroughFilter(prefilter_rules) if prefilter_rules else None
+segment_sentences = st.sidebar.checkbox(
+    "Gabungkan kalimat terpotong", value=False,
+    help="Blok berurutan yang melanjutkan kalimat yang sama (tanpa tanda akhir kalimat, jeda pendek) diterjemahkan "
+    "sebagai 1 kalimat, lalu hasilnya dibagi lagi ke blok aslinya. Timestamp tidak berubah.",
+)
+segment_gap = st.sidebar.number_input(
+    "Jeda maks. antar blok (detik)", 0.0, 10.0, 1.0, 0.1, disabled=not segment_sentences,
+)
+segment_by = st.sidebar.radio(
+    "Bagi hasil menurut", ["length", "duration"], horizontal=True, disabled=not segment_sentences,
+    format_func={"length": "Panjang teks", "duration": "Durasi"}.get,
+)
+segmenter = Segmenter(segment_gap, by=segment_by) if segment_sentences else None
+repair_lines = st.sidebar.checkbox(
+    "Re-request invalid lines", value=True,
+    help="Baris yang hilang, tergabung, atau placeholder tag-nya rusak dikirim ulang (baris itu saja), bukan diam-diam dikosongkan."
+)
+stream_responses = st.sidebar.checkbox(
+    "Stream responses", value=False,
+    help="Pakai streamed chat completions: baris yang selesai langsung tampil, stream macet di-retry lebih awal."
+)
+stall_timeout = st.sidebar.number_input(
+    "Stall timeout (seconds)", 2.0, 300.0, 20.0, 1.0,
+    help="Stream dianggap macet bila tidak ada token baru selama ini.",
+    disabled=not stream_responses,
+)
+token_budget = st.sidebar.number_input(
+    "Token budget per request (pack)", 200, 16000, 1500, 100,
+    help="Perkiraan token maksimal teks sumber dalam satu request mode pack.",
+    disabled=(mode != "pack"),
+)
+
+st.sidebar.header("Translation Memory")
+use_tm = st.sidebar.checkbox(
+    "Use translation memory", value=True,
+    help="Baris yang pernah diterjemahkan (bahasa, model & teks sama) diambil dari cache on-disk tanpa request."
+)
+tm_path = st.sidebar.text_input("TM file", value=TM_DEFAULT_PATH, disabled=not use_tm)
+tm_max_mb = st.sidebar.number_input("TM max size (MB)", 1, 4096, 64, 1, disabled=not use_tm)
+if use_tm:
+    try:
+        tm = get_translation_memory(tm_path, tm_max_mb)
+        tm_count, tm_bytes = tm.info()
+        st.sidebar.caption(f"{tm_count} entri • {tm_bytes / 1024 / 1024:.1f} MB")
+        if st.sidebar.button("Clear translation memory"):
+            tm.clear()
+            st.sidebar.success("Translation memory dibersihkan.")
+    except Exception as e:
+        st.sidebar.warning(f"Translation memory tidak bisa dibuka: {e}")
+        tm = None
+else:
+    tm = None
+
+st.sidebar.header("Tampilan")
+ui_updates = st.sidebar.slider(
+    "Update progress per detik", 0.2, 4.0, 1.0, 0.2,
+    help="Panel job di-refresh sekian kali per detik, berapa pun kecepatan bloknya. "
+    "Lebih rendah = loop terjemahan & browser lebih ringan untuk file besar.",
+)
+page_size = st.sidebar.selectbox(
+    "Baris per halaman tabel", [50, 100, 250, 500, 1000], index=1,
+    help="Tabel preview hanya mengirim 1 halaman ke browser.",
+)
 
 st.sidebar.header("Upload / Resume")
-uploaded = st.file_uploader("Upload .srt", type=["srt"])
-resume_existing = st.sidebar.checkbox("Resume from previous output", value=False)
+uploaded_files = st.file_uploader("Upload .srt", type=["srt"], accept_multiple_files=True)
+use_journal = st.sidebar.checkbox(
+    "Resume from on-disk journal", value=True,
+    help="Setiap blok yang selesai dicatat ke journal (per nama + isi file); run berikutnya untuk file yang sama "
+         "melanjutkan dari blok yang belum ada."
+)
+# resume dari file output hanya untuk 1 file sumber × 1 bahasa target (banyak file: pakai journal)
+resume_supported = len(uploaded_files or []) <= 1 and len(tgt_langs) == 1
+resume_existing = st.sidebar.checkbox(
+    "Resume from previous output", value=False, disabled=not resume_supported,
+    help=None if resume_supported else "Hanya untuk 1 file sumber & 1 bahasa target; banyak file dilanjutkan lewat journal.",
+) and resume_supported
 resume_file = st.sidebar.file_uploader(
     "Upload previous output (optional)",
     type=["srt"],
+    disabled=not resume_supported,
     help="Jika diberikan dan jumlah blok cocok, blok yang sudah diterjemahkan akan dipakai ulang."
 )
 
 # ───────────────────────────────────────────────────────────────────────────────
 # Parsing + optional pre-translate preview
-if uploaded is not None:
-    raw = uploaded.read().decode("utf-8", errors="ignore")
-    src_subs = list(srt.parse(raw))
-    total = len(src_subs)
-    st.info(f"Parsed **{total}** subtitle blocks.")
+jobs = get_job_manager()
+# job hanya terlihat oleh sesi browser yang membuatnya
+job_owner = st.session_state.setdefault("job_owner", uuid.uuid4().hex)
+
+def _paged_dataframe(n_rows: int, rows, key: str, **df_kw):
+    """Tabel besar per halaman: hanya `rows(start, stop)` halaman aktif yang dibangun & dikirim ke browser."""
+    pages = max(1, math.ceil(n_rows / page_size))
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages  # jumlah halaman berkurang (ukuran halaman / file berubah)
+    page = st.number_input(f"Halaman (1–{pages})", 1, pages, 1, 1, key=key) if pages > 1 else 1
+    start = (page - 1) * page_size
+    stop = min(start + page_size, n_rows)
+    st.dataframe(pd.DataFrame(rows(start, stop)), use_container_width=True, hide_index=True, **df_kw)
+    st.caption(f"Baris {start + 1}–{stop} dari {n_rows}" if n_rows else "Tabel kosong")
+
+if uploaded_files:
+    # parse bertahap dari buffer upload (tanpa decode seluruh file ke satu string), sekali per isi file
+    sources, digests = {}, {}
+    for uploaded in uploaded_files:
+        data = uploaded.getvalue()
+        digests[uploaded.name] = hashlib.sha256(data).hexdigest()
+        sources[uploaded.name] = parse_upload(digests[uploaded.name], data)
+    total = sum(len(subs) for subs in sources.values())
+    if len(sources) == 1:
+        st.info(f"Parsed **{total}** subtitle blocks.")
+    else:
+        st.info(f"Parsed **{len(sources)}** file • **{total}** subtitle blocks.")
+    estimates = [
+        cached_estimate(
+            digests[name], mode, src_lang, tgt, dedup, int(token_budget), tuple(sorted(glossary.items())), tuple(pricing),
+            tuple(prefilter_rules), segmenter.config() if segmenter is not None else (), subs,
+        )
+        for name, subs in sources.items() for tgt in tgt_langs
+    ]
+    est = {k: sum(e[k] for e in estimates) for k in estimates[0] if k != "system_tokens"}
+    if est.get("filtered_blocks"):
+        rules = ", ".join(
+            f"{PREFILTER_LABELS.get(name, name).lower()} {est[f'filtered_{name}']}"
+            for name, _ in prefilter.rules if est.get(f"filtered_{name}")
+        )
+        st.caption(
+            f"Pre-filter: {est['filtered_blocks']} blok diteruskan tanpa request ({rules}) • "
+            f"{est['requests_skipped']} request dihemat (sudah dikurangi dari estimasi di bawah)."
+        )
+    if est.get("segments"):
+        st.caption(
+            f"Segmentasi: {est['segment_blocks']} blok digabung jadi {est['segments']} kalimat • "
+            f"{est['segment_requests_saved']} request dihemat."
+        )
+    st.caption(
+        f"Estimasi: {est['requests']} request • ~{est['prompt_tokens']:,} token input "
+        f"(~{est['cached_prompt_tokens']:,} bisa dari prompt cache) • ~{est['completion_tokens']:,} token output • "
+        f"≈ ${est['cost_usd']:.4f} (tanpa cache ${est['cost_usd_no_cache']:.4f}). "
+        "Belum termasuk hit translation memory / journal, retry & perbaikan baris."
+    )
 
     if st.checkbox("Tampilkan tabel original (pra-terjemah)", value=False):
-        pre_rows = []
-        for i, s in enumerate(src_subs, start=1):
-            pre_rows.append({
-                "No.": i,
-                "From": str(s.start),
-                "To": str(s.end),
-                "Original Text": s.content.replace("\n", " "),
-                "Translated Text": ""
-            })
-        st.dataframe(pd.DataFrame(pre_rows), use_container_width=True, hide_index=True)
-
-    # Resume parsing
+        preview_name = next(iter(sources)) if len(sources) == 1 else st.selectbox("File", list(sources))
+        preview_subs = sources[preview_name]
+        _paged_dataframe(
+            len(preview_subs),
+            lambda start, stop: [
+                {
+                    "No.": i + 1,
+                    "From": str(preview_subs[i].start),
+                    "To": str(preview_subs[i].end),
+                    "Original Text": preview_subs[i].content.replace("\n", " "),
+                    "Translated Text": "",
+                }
+                for i in range(start, stop)
+            ],
+            key=f"pre_page_{preview_name}",
+        )
+
+    # Journal (resume berbasis hash konten)
+    journals = {}
+    if use_journal:
+        for name, subs in sources.items():
+            journal = journals[name] = journal_for(name, digest=digests[name])
+            journal_hits = 0
+            if os.path.exists(journal.path):
+                stat = os.stat(journal.path)
+                journal_hits = cached_journal_hits(
+                    journal.path, (stat.st_mtime_ns, stat.st_size), digests[name], src_lang, tuple(tgt_langs), model, mode,
+                    tuple(sorted(glossary.items())), tuple(prefilter_rules), segmenter.config() if segmenter is not None else (), subs,
+                )
+            if journal_hits:
+                c1, c2 = st.columns([4, 1])
+                c1.caption(
+                    f"Journal {name}: {journal_hits}/{len(subs) * len(tgt_langs)} blok×bahasa sudah diterjemahkan dengan setting ini."
+                )
+                if c2.button("Hapus journal file ini", key=f"del_journal_{name}"):
+                    journal.delete()
+                    st.rerun()
+
+    # Resume parsing (hanya untuk upload 1 file & 1 bahasa target)
     existing_subs = None
-    if resume_existing and resume_file is not None:
+    if not resume_supported and resume_file is not None:
+        st.warning(
+            "Resume dari file output hanya untuk 1 file sumber & 1 bahasa target—resume diabaikan "
+            f"({len(sources)} file, {len(tgt_langs)} bahasa); journal tetap dipakai."
+        )
+    elif resume_existing and resume_file is not None:
         try:
-            prev = resume_file.read().decode("utf-8", errors="ignore")
-            existing_subs = list(srt.parse(prev))
+            resume_data = resume_file.getvalue()
+            existing_subs = parse_upload(hashlib.sha256(resume_data).hexdigest(), resume_data)
             if len(existing_subs) != total:
                 st.warning("Resume file block count berbeda—resume diabaikan.")
                 existing_subs = None
@@ -204,110 +461,200 @@ if uploaded is not None:
             st.warning(f"Gagal parse resume file: {e}")
             existing_subs = None
 
-    # Translate button
-    if st.button("🚀 Translate now", type="primary"):
-        if not effective_api_key:
-            st.error("API Key tidak tersedia. Isi di sidebar atau gunakan Secrets.")
-            st.stop()
-
-        try:
-            client = OpenAI(api_key=effective_api_key, base_url=base_url)
-        except Exception as e:
-            st.error(f"Gagal inisialisasi client: {e}")
-            st.stop()
-
-        progress = st.progress(0)
-        status = st.empty()
-        translated_blocks = []
-        start_time = time.time()
+    # Translate button: tiap file jadi 1 job background
+    if st.button("🚀 Translate now", type="primary", help="Job berjalan di background; halaman boleh dipakai / ditinggal."):
+        if use_pool:
+            if endpoint_pool is None:
+                st.error("Endpoint pool belum valid. Periksa konfigurasi di sidebar.")
+                st.stop()
+            client = PooledClient(endpoint_pool, pin_model=model if pin_model else None)
+            governor_key = ("pool", hashlib.sha256(pool_config.encode("utf-8")).hexdigest()[:16])
+        else:
+            if not effective_api_key:
+                st.error("API Key tidak tersedia. Isi di sidebar atau gunakan Secrets.")
+                st.stop()
 
-        for idx, sub in enumerate(src_subs, start=1):
-            # resume reuse
-            if existing_subs:
-                ex = existing_subs[idx - 1]
-                if ex.content.strip() and ex.content.strip() != sub.content.strip():
-                    translated_blocks.append(ex)
-                    pct = int(idx / total * 100)
-                    elapsed = time.time() - start_time
-                    status.text(f"[resume] {idx}/{total} • elapsed {timedelta(seconds=int(elapsed))}")
-                    progress.progress(pct)
-                    continue
-
-            lines = sub.content.split("\n")
-            # translate
             try:
-                if mode == "line":
-                    out_lines = []
-                    for line in lines:
-                        m, h, a = mask_tags(line)
-                        system = (
-                            "You are a professional subtitle translator. "
-                            "Translate user-provided text exactly from the source language to the target language. "
-                            "Do NOT add or remove lines. Do NOT merge or split content. "
-                            "The text may contain placeholders like [[HTML_TAG_0]] or [[ASS_TAG_0]]. "
-                            "Leave placeholders exactly unchanged. Return ONLY the translated text."
-                        )
-                        user = f"Source language: {src_lang}\nTarget language: {tgt_lang}\n\nText:\n{m}"
-                        attempts = 0
-                        while True:
-                            try:
-                                res = chat_translate(client, model, system, user)
-                                out_lines.append(unmask_tags(res, h, a))
-                                break
-                            except Exception as e:
-                                attempts += 1
-                                if attempts > max_retries or not is_rate_limit(e):
-                                    raise
-                                time.sleep(backoff * (2 ** (attempts - 1)))
-                else:
-                    out_lines = translate_block(
-                        client, model, lines, src_lang, tgt_lang,
-                        max_retries=max_retries, backoff=backoff
-                    )
+                client = get_client(base_url, effective_api_key, connect_timeout, read_timeout)
             except Exception as e:
-                st.warning(f"[{idx}] error: {e} — blok dipertahankan (original).")
-                out_lines = lines
-
-            translated_blocks.append(
-                srt.Subtitle(index=sub.index, start=sub.start, end=sub.end, content="\n".join(out_lines))
+                st.error(f"Gagal inisialisasi client: {e}")
+                st.stop()
+            governor_key = (base_url, hashlib.sha256(effective_api_key.encode("utf-8")).hexdigest()[:16])
+
+        governor = get_rate_governor(*governor_key, shared_rpm, shared_tpm)
+        for name, subs in sources.items():
+            # resume dari file output sebelumnya (journal ditangani engine)
+            reuse = {}
+            if existing_subs:
+                for i, (sub, ex) in enumerate(zip(subs, existing_subs)):
+                    if ex.content.strip() and ex.content.strip() != sub.content.strip():
+                        reuse[i] = ex
+            job = jobs.submit(
+                name, client, subs, owner=job_owner,
+                breaker_kw={"threshold": breaker_threshold, "cooldown": breaker_cooldown}, governor=governor,
+                hedge_kw={"pct": hedge_pct, "max_ratio": hedge_max_ratio / 100, "max_threads": 2 * int(workers)}
+                if hedge_requests else None,
+                model=model, src=src_lang, tgts=tgt_langs, mode=mode, glossary=glossary,
+                workers=int(workers), limiter=TokenBucket(rate_limit, capacity=workers),
+                tm=tm, journal=journals.get(name), reuse=reuse, dedup=dedup, token_budget=int(token_budget),
+                prefilter=prefilter, segmenter=segmenter,
+                max_retries=max_retries, backoff=backoff, repair_rounds=1 if repair_lines else 0,
+                stream=stream_responses, stall_timeout=stall_timeout,
             )
+            st.session_state["selected_job"] = job.id
+        st.toast(f"{len(sources)} job masuk antrian.")
+else:
+    st.info("Upload file .srt untuk mulai menerjemahkan.")
 
-            # progress + checkpoint
-            pct = int(idx / total * 100)
-            elapsed = time.time() - start_time
-            eta = (elapsed / idx) * (total - idx) if idx else 0
-            status.text(f"{idx}/{total} • {pct}% • ETA {timedelta(seconds=int(eta))}")
-            progress.progress(pct)
-
-            if checkpoint_every and (idx % checkpoint_every == 0 or idx == total):
-                partial = srt.compose(translated_blocks + src_subs[idx:])
-                st.session_state["last_partial"] = partial
+# ───────────────────────────────────────────────────────────────────────────────
+# Jobs: status semua job + detail job terpilih (polling tanpa memblok script)
+def _render_telemetry(job: Job):
+    t = job.telemetry.summary(blocks_done=job.translated_now, pricing=pricing)
+    errors = ", ".join(f"{k} ×{v}" for k, v in t["errors"].items()) or "-"
+    st.markdown(
+        f"**Latency** p50 {t['latency_p50']:.2f}s • p90 {t['latency_p90']:.2f}s • p99 {t['latency_p99']:.2f}s  \n"
+        f"**Throughput** {t.get('blocks_per_s', 0):.2f} blok/s • {t['tokens_per_s']:.0f} token/s  \n"
+        f"**Request** {t['requests']} ({t['ok']} ok) • retry {t['retries']} • backoff {t['backoff_s']:.1f}s  \n"
+        f"**Token** input {t['prompt_tokens']:,} (cache hit {t['cached_prompt_tokens']:,} • {t['cache_hit_rate']:.0%}, "
+        f"miss {t['uncached_prompt_tokens']:,}) • output {t['completion_tokens']:,} • ≈ ${t['cost_usd']:.4f}  \n"
+        f"**Error** {errors}"
+    )
+    if job.hedger is not None:
+        h = job.hedger.summary()
+        delay = job.hedger.delay()
+        st.markdown(
+            f"**Hedging** {h['hedges']} duplikat ({h['hedge_rate']:.0%}) • menang {h['hedge_wins']} • "
+            f"hemat {h['latency_saved_s']:.0f}s • {h['hedge_skipped']} dilewati (batas) • "
+            f"ambang {f'{delay:.1f}s' if delay is not None else 'menunggu sampel'}"
+        )
 
-            time.sleep(delay)
+def _render_stats(job: Job):
+    stats = job.stats
+    if job.run_kw.get("tm") is not None and stats.get("tm_lookups"):
+        hit_rate = stats.get("tm_hits") / stats.get("tm_lookups")
+        st.info(
+            f"Translation memory: {stats.get('tm_hits')}/{stats.get('tm_lookups')} baris hit ({hit_rate:.0%}) • "
+            f"{stats.get('requests_saved')} request dihemat."
+        )
+    if stats.get("filtered_blocks"):
+        rules = ", ".join(
+            f"{PREFILTER_LABELS.get(name, name).lower()} {stats.get(f'filtered_{name}')}"
+            for name in PREFILTER_LABELS if stats.get(f"filtered_{name}")
+        )
+        st.info(f"Pre-filter: {stats.get('filtered_blocks')} blok diteruskan tanpa request ({rules}).")
+    if stats.get("segments"):
+        st.info(f"Segmentasi: {stats.get('segment_blocks')} blok digabung jadi {stats.get('segments')} kalimat.")
+    if stats.get("invalid_lines"):
+        st.info(
+            f"Validasi: {stats.get('invalid_lines')} baris rusak/hilang • {stats.get('repaired_lines')} diperbaiki "
+            f"lewat {stats.get('repair_requests')} request ulang • {stats.get('repair_failed')} tetap gagal."
+        )
+    if job.hedger is not None and job.hedger.hedges:
+        h = job.hedger.summary()
+        st.info(
+            f"Hedging: {h['hedges']} request duplikat ({h['hedge_rate']:.0%}) • {h['hedge_wins']} lebih cepat dari aslinya • "
+            f"latency dihemat {h['latency_saved_s']:.0f}s."
+        )
+    if job.breaker.trips:
+        st.info(f"Circuit breaker terbuka {job.breaker.trips}× (total jeda {job.breaker.open_s:.0f}s) karena provider kewalahan.")
+    if stats.get("dedup_dupes"):
+        st.info(
+            f"Dedup: {stats.get('dedup_dupes')} duplikat digabung ({stats.get('dedup_unique')} teks unik) • "
+            f"{stats.get('dedup_saved')} request dihemat."
+        )
 
-        final_text = srt.compose(translated_blocks)
+all_jobs = jobs.list(job_owner)
+if all_jobs:
+    st.subheader("🗂️ Jobs")
+    ids = [j.id for j in all_jobs]
+    if st.session_state.get("selected_job") not in ids:
+        st.session_state["selected_job"] = ids[-1]
+    selected = jobs.get(st.selectbox(
+        "Detail job",
+        ids,
+        key="selected_job",
+        format_func=lambda job_id: f"{job_id} • {jobs.get(job_id, job_owner).name}",
+    ), job_owner)
+
+    # refresh panel dibatasi `ui_updates`/detik; engine hanya memperbarui counter job (tanpa render per blok)
+    @st.fragment(run_every=1.0 / ui_updates if any(j.active for j in all_jobs) else None)
+    def _job_monitor(job_id: str, was_active: bool):
+        current = jobs.list(job_owner)
+        st.dataframe(
+            pd.DataFrame([j.snapshot() for j in current]),
+            use_container_width=True, hide_index=True,
+            column_config={"Progress": st.column_config.ProgressColumn(min_value=0.0, max_value=1.0, format="percent")},
+        )
+        job = jobs.get(job_id, job_owner)
+        if job is None:
+            return
+        st.progress(job.done / job.total if job.total else 1.0)
+        if job.status == "queued":
+            st.text("Menunggu giliran…")
+        elif job.status == "running":
+            eta = job.eta()
+            paused = " • ⏸ provider kewalahan, semua worker dijeda" if job.breaker.is_open else ""
+            if eta is None:
+                st.text(f"[resume] {job.done}/{job.total}{paused}")
+            else:
+                st.text(f"{job.done}/{job.total} • {job.done / job.total:.0%} • ETA {timedelta(seconds=int(eta))}{paused}")
+            gov = job.governor_status()
+            if gov and (gov["rpm"] or gov["tpm"]):
+                queue = f"antrian #{gov['queue_position']}" if gov["queue_position"] else "sedang dilayani"
+                st.caption(
+                    f"Kuota bersama: {queue} • jatah {gov['share']:.0%} (adil {gov['fair_share']:.0%}) • "
+                    f"{gov['active_jobs']} job aktif • {gov['requests_last_min']}/{gov['rpm']:.0f} RPM • "
+                    f"{gov['tokens_last_min']}/{gov['tpm']:.0f} TPM"
+                )
+        if job.live:
+            st.code("\n".join(job.live), language=None)
+        for w in job.warnings[-5:]:
+            st.warning(w)
+        with st.expander("📈 Telemetry", expanded=False):
+            _render_telemetry(job)
+            if isinstance(job.client, PooledClient):
+                st.dataframe(pd.DataFrame(job.client.pool.status()), hide_index=True)
+        # job berubah dari aktif → selesai: rerun penuh supaya hasil & download tampil
+        if was_active and not job.active:
+            st.rerun()
+
+    _job_monitor(selected.id, selected.active)
+
+    c1, c2, c3, c4 = st.columns(4)
+    if selected.active and c1.button("⏹ Cancel"):
+        jobs.cancel(selected.id, job_owner)
+        st.rerun()
+    if selected.status in ("cancelled", "failed") and c1.button("▶️ Resume"):
+        jobs.resume(selected.id, job_owner)
+        st.rerun()
+    if not selected.active and c2.button("🗑 Hapus job"):
+        jobs.remove(selected.id, job_owner)
+        st.rerun()
+    if c3.button("🧹 Hapus job selesai"):
+        jobs.clear_finished(job_owner)
+        st.rerun()
+    c4.button("🔄 Refresh")
+
+    stem = selected.name.rsplit(".", 1)[0]
+    multi = len(selected.targets) > 1
+    if selected.status == "failed":
+        st.error(f"Job gagal: {selected.error}")
+    if selected.status == "done":
+        st.success("Selesai diterjemahkan!")
+        if selected.failed or selected.stats.get("repair_failed"):
+            st.warning(
+                f"{len(selected.failed)} blok gagal (original dipertahankan) • "
+                f"{selected.stats.get('repair_failed')} baris tetap rusak setelah perbaikan (teks sumber / hasil rusak dipakai)."
+            )
+        _render_stats(selected)
 
         # ── Side-by-side table preview & CSV download
-        def _fmt_td(td):
-            # td adalah datetime.timedelta
-            total_ms = int(td.total_seconds() * 1000)
-            h = total_ms // 3600000
-            m = (total_ms % 3600000) // 60000
-            s_ = (total_ms % 60000) // 1000
-            ms_ = total_ms % 1000
-            return f"{h:02d}:{m:02d}:{s_:02d},{ms_:03d}"
-
-        rows = []
-        for i, (src, dst) in enumerate(zip(src_subs, translated_blocks), start=1):
-            rows.append({
-                "No.": i,
-                "From": _fmt_td(src.start),
-                "To": _fmt_td(src.end),
-                "Original Text": src.content.replace("\n", " "),
-                "Translated Text": dst.content.replace("\n", " "),
-            })
-
-        st.success("Selesai diterjemahkan!")
+        preview_tgt = (
+            st.radio("Bahasa", selected.targets, horizontal=True, key=f"preview_tgt_{selected.id}")
+            if multi else selected.targets[0]
+        )
+        # baris tabel, CSV & .srt di-cache di job (dibangun sekali), rerun cukup mengambil 1 halaman
+        pairs = selected.pairs(preview_tgt)
         with st.expander("📋 Preview Tabel (Original vs Translated)", expanded=True):
             cfg = {
                 "No.": st.column_config.NumberColumn(width="small"),
@@ -317,29 +664,62 @@ if uploaded is not None:
                 "Translated Text": st.column_config.TextColumn(width="medium"),
             }
             height = st.slider("Tinggi tampilan (px)", 300, 1200, 420, 20)
-            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True, column_config=cfg, height=height)
+            _paged_dataframe(
+                len(pairs), lambda start, stop: pairs[start:stop], key=f"pairs_page_{selected.id}_{preview_tgt}",
+                column_config=cfg, height=height,
+            )
 
             st.download_button(
                 "⬇️ Download CSV",
-                data=pd.DataFrame(rows).to_csv(index=False).encode("utf-8"),
-                file_name="subtitle_pair.csv",
+                data=selected.pairs_csv(preview_tgt),
+                file_name=f"{stem}.{preview_tgt}.pair.csv" if multi else f"{stem}.pair.csv",
                 mime="text/csv"
             )
 
-        # ── Final SRT download + checkpoint
-        st.download_button(
-            "⬇️ Download translated .srt",
-            data=final_text.encode("utf-8"),
-            file_name="translated.id.srt",
-            mime="text/plain"
-        )
-        if "last_partial" in st.session_state:
-            with st.expander("Download last checkpoint (partial)"):
+        # ── Final SRT download (1 per bahasa + zip semua bahasa)
+        cols = st.columns(len(selected.targets) + (1 if multi else 0))
+        for col, tgt in zip(cols, selected.targets):
+            col.download_button(
+                f"⬇️ Download .{tgt}.srt" if multi else "⬇️ Download translated .srt",
+                data=selected.output(tgt),
+                file_name=f"{stem}.{tgt}.srt",
+                mime="text/plain"
+            )
+        if multi:
+            cols[-1].download_button(
+                "⬇️ Download semua (.zip)",
+                data=selected.output_zip(stem),
+                file_name=f"{stem}.zip",
+                mime="application/zip"
+            )
+        with st.expander("📈 Export telemetry"):
+            c1, c2 = st.columns(2)
+            c1.download_button(
+                "⬇️ Telemetry CSV",
+                data=selected.telemetry.to_csv().encode("utf-8"),
+                file_name=f"{stem}.telemetry.csv",
+                mime="text/csv"
+            )
+            c2.download_button(
+                "⬇️ Telemetry JSON",
+                data=selected.telemetry.to_json(blocks_done=selected.translated_now).encode("utf-8"),
+                file_name=f"{stem}.telemetry.json",
+                mime="application/json"
+            )
+    elif selected.done:
+        # checkpoint: blok selesai + sisanya original (diambil saat rerun terakhir / tombol Refresh)
+        with st.expander("Download last checkpoint (partial)"):
+            for tgt in selected.targets:
                 st.download_button(
-                    "⬇️ Download partial .srt",
-                    data=st.session_state["last_partial"].encode("utf-8"),
-                    file_name="partial.id.srt",
+                    f"⬇️ Download partial .{tgt}.srt" if multi else "⬇️ Download partial .srt",
+                    data=selected.output(tgt),
+                    file_name=f"{stem}.partial.{tgt}.srt",
                     mime="text/plain"
                 )
-else:
-    st.info("Upload file .srt untuk mulai menerjemahkan.")
+            if multi:
+                st.download_button(
+                    "⬇️ Download partial semua (.zip)",
+                    data=selected.output_zip(stem, partial=True),
+                    file_name=f"{stem}.partial.zip",
+                    mime="application/zip"
+                )
@@ -0,0 +1,87 @@
+# subtitle_translator/__init__.py
+"""Core penerjemah subtitle (tanpa Streamlit): dipakai oleh page Subtitle Translator dan CLI batch."""
+from .batch import ReplayClient, translate_batch
+from .clients import http2_available, make_client, make_http_client
+from .core import (
+    RunStats,
+    StreamStalled,
+    TokenBucket,
+    call_with_retry,
+    chat_translate,
+    estimate_tokens,
+    is_rate_limit,
+    mask_tags,
+    parse_glossary,
+    settings_key,
+    system_prompt,
+    translate_block,
+    translate_line,
+    translate_pack,
+    unmask_tags,
+    validate_line,
+)
+from .engine import estimate_run, journal_keys, mask_subtitles, translate_multi, translate_subtitles
+from .errors import CircuitBreaker, ErrorInfo, TranslationCancelled, classify_error
+from .filters import PassthroughFilter
+from .governor import GovernorLease, RateGovernor
+from .hedge import Hedger
+from .jobs import Job, JobManager
+from .pool import Endpoint, EndpointPool, PooledClient, parse_endpoints
+from .segment import Segmenter
+from .srtio import SrtWriter, iter_subtitles
+from .storage import JOURNAL_DIR, TM_DEFAULT_PATH, JobJournal, TranslationMemory, file_digest, journal_for
+from .telemetry import Pricing, Telemetry
+
+__all__ = [
+    "Endpoint",
+    "EndpointPool",
+    "CircuitBreaker",
+    "ErrorInfo",
+    "JOURNAL_DIR",
+    "TM_DEFAULT_PATH",
+    "GovernorLease",
+    "Hedger",
+    "Job",
+    "JobJournal",
+    "JobManager",
+    "PassthroughFilter",
+    "PooledClient",
+    "Pricing",
+    "RateGovernor",
+    "ReplayClient",
+    "RunStats",
+    "Segmenter",
+    "SrtWriter",
+    "StreamStalled",
+    "Telemetry",
+    "TokenBucket",
+    "TranslationCancelled",
+    "TranslationMemory",
+    "call_with_retry",
+    "chat_translate",
+    "classify_error",
+    "estimate_run",
+    "estimate_tokens",
+    "file_digest",
+    "http2_available",
+    "is_rate_limit",
+    "iter_subtitles",
+    "journal_for",
+    "journal_keys",
+    "make_client",
+    "make_http_client",
+    "mask_subtitles",
+    "mask_tags",
+    "parse_endpoints",
+    "parse_glossary",
+    "settings_key",
+    "system_prompt",
+    "translate_batch",
+    "translate_block",
+    "translate_line",
+    "translate_multi",
+    "translate_pack",
+    "translate_subtitles",
+    "unmask_tags",
+    "validate_line",
+]
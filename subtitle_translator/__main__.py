@@ -0,0 +1,4 @@
+# python -m subtitle_translator ...
+from .cli import main
+
+raise SystemExit(main())
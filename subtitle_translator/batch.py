@@ -0,0 +1,223 @@
+# subtitle_translator/batch.py
+"""Mode batch offline (Batch API OpenAI-compatible: `/v1/files` + `/v1/batches`) untuk backlog besar.
+
+Tidak ada pipeline kedua: engine biasa dijalankan dengan `ReplayClient` yang menjawab dari hasil
+batch. Request yang belum punya hasil dicatat lalu dikirim sebagai batch berikutnya — putaran 1 =
+semua request pertama, putaran 2 = perbaikan baris rusak (repair), dst. Karena prompt disusun oleh
+kode yang sama, hasil batch di-parse, divalidasi, masuk TM & journal persis seperti request live.
+Throughput tidak lagi dibatasi RPM/TPM per request.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Tuple, Union
+
+import srt
+
+from .engine import mask_subtitles, translate_subtitles
+from .errors import TranslationCancelled
+from .pool import ChatShim
+from .telemetry import Telemetry
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+class BatchPending(Exception):
+    """Request belum punya hasil batch; dikumpulkan untuk putaran berikutnya (tidak di-retry)."""
+
+def request_key(body: Dict) -> str:
+    """`custom_id` batch = hash isi request (model + messages), sama untuk prompt yang sama."""
+    data = json.dumps({"model": body["model"], "messages": body["messages"]}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+class ReplayClient:
+    """Pengganti `OpenAI` client untuk engine: `chat.completions.create` dijawab dari `responses`.
+
+    Request tanpa hasil dicatat di `misses` ({custom_id: body}) lalu `BatchPending` dilempar →
+    unit tsb gagal di putaran ini (blok original), dan request-nya masuk batch berikutnya.
+    Request identik ke-n dalam satu run (mis. repair 1 baris = prompt yang sama dengan request
+    pertamanya) mendapat `custom_id` sendiri, jadi dikirim ulang — bukan diberi jawaban rusak yang sama.
+    """
+
+    def __init__(self, responses: Dict[str, object], errors: Dict[str, str] = None):
+        self.responses = responses
+        self.errors = errors or {}
+        self.misses: Dict[str, Dict] = {}
+        self.chat = ChatShim(self)
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _create(self, model: str, messages: List[Dict], temperature: float = 0.0, **kw):
+        body = {"model": model, "messages": messages, "temperature": temperature}
+        key = request_key(body)
+        with self._lock:
+            n = self._seen.get(key, 0)
+            self._seen[key] = n + 1
+        key = f"{key}-{n}" if n else key
+        resp = self.responses.get(key)
+        if resp is None:
+            with self._lock:
+                self.misses[key] = body
+            if key in self.errors:
+                raise BatchPending(f"item batch gagal ({self.errors[key]})")
+            raise BatchPending(f"belum ada hasil batch {key}")
+        return resp
+
+class _ReadOnly:
+    """TM / journal untuk putaran kering: dibaca seperti biasa, tidak ditulis (ditulis di putaran akhir)."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def put_many(self, *args, **kw):
+        pass
+
+    def append(self, *args, **kw):
+        pass
+
+def build_batch_file(requests: Dict[str, Dict]) -> bytes:
+    """JSONL Batch API: 1 baris per request {custom_id, method, url, body}."""
+    lines = [
+        json.dumps({"custom_id": key, "method": "POST", "url": BATCH_ENDPOINT, "body": body}, ensure_ascii=False)
+        for key, body in requests.items()
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+def submit_batch(client, requests: Dict[str, Dict], completion_window: str = "24h", metadata: Dict = None):
+    """Upload file JSONL lalu buat batch; kembalikan objek `Batch`."""
+    upload = client.files.create(file=("subtitle-batch.jsonl", build_batch_file(requests)), purpose="batch")
+    kw = {"metadata": metadata} if metadata else {}
+    return client.batches.create(
+        input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window=completion_window, **kw,
+    )
+
+def wait_batch(
+    client,
+    batch_id: str,
+    poll_interval: float = 30.0,
+    timeout: float = None,
+    on_status: Callable = None,
+    cancel_event: threading.Event = None,
+):
+    """Polling sampai batch selesai (completed/failed/expired/cancelled); `cancel_event` membatalkan batch."""
+    started = time.monotonic()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if on_status is not None:
+            on_status(batch)
+        if batch.status in TERMINAL:
+            return batch
+        if cancel_event is not None and cancel_event.is_set():
+            client.batches.cancel(batch_id)
+            raise TranslationCancelled(f"batch {batch_id} dibatalkan")
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"batch {batch_id} belum selesai setelah {timeout:.0f}s (status {batch.status})")
+        if cancel_event is not None:
+            cancel_event.wait(poll_interval)
+        else:
+            time.sleep(poll_interval)
+
+def read_batch_results(client, batch) -> Tuple[Dict[str, object], Dict[str, str]]:
+    """Output batch → ({custom_id: ChatCompletion}, {custom_id: pesan error})."""
+    from openai.types.chat import ChatCompletion
+
+    ok, errors = {}, {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            resp = rec.get("response") or {}
+            if resp.get("status_code") == 200 and not rec.get("error"):
+                ok[rec["custom_id"]] = ChatCompletion.model_validate(resp["body"])
+            else:
+                err = rec.get("error") or (resp.get("body") or {}).get("error") or {}
+                errors[rec["custom_id"]] = f"HTTP {resp.get('status_code')}: {err.get('message', err)}"
+    return ok, errors
+
+def translate_batch(
+    client,
+    files: Dict[str, List[srt.Subtitle]],
+    model: str,
+    src: str,
+    tgts: Union[List[str], Dict[str, List[str]]],
+    mode: str = "block",
+    max_rounds: int = None,
+    poll_interval: float = 30.0,
+    timeout: float = None,
+    completion_window: str = "24h",
+    tm=None,
+    journals: Dict = None,
+    stats=None,
+    telemetry: Telemetry = None,
+    on_status: Callable = None,
+    on_result: Callable = None,
+    on_error: Callable = None,
+    cancel_event: threading.Event = None,
+    **kw,
+) -> Dict[str, Dict[str, List[srt.Subtitle]]]:
+    """Terjemahkan beberapa file ({nama: subs}) ke `tgts` lewat Batch API; hasil {nama: {tgt: subtitle}}.
+
+    `tgts`: daftar bahasa untuk semua file, atau {nama: [bahasa]} per file. Semua blok pending dari
+    semua file × bahasa masuk 1 batch per putaran. Putaran diulang selama masih ada request tanpa
+    hasil (repair, item batch yang error), maks. `max_rounds` batch (default `repair_rounds` + 2).
+    Putaran akhir memutar ulang semua hasil dengan TM, journal, `stats`, `telemetry` & callback asli:
+    - on_status(round, batch) — tiap polling
+    - on_result(nama, tgt, index, subtitle) / on_error(nama, tgt, block_indices, exc)
+    Blok yang request-nya tetap tanpa hasil dipertahankan (original). `kw` diteruskan ke
+    `translate_subtitles` (dedup, token_budget, glossary, prefilter, segmenter, workers, ...).
+    """
+    journals = journals or {}
+    targets = tgts if isinstance(tgts, dict) else {name: list(tgts) for name in files}
+    masked = {name: mask_subtitles(subs) for name, subs in files.items()}
+    rounds = max_rounds if max_rounds is not None else kw.get("repair_rounds", 1) + 2
+    kw = dict(kw, mode=mode, max_retries=0, stream=False, cancel_event=cancel_event)
+    responses: Dict[str, object] = {}
+    errors: Dict[str, str] = {}
+
+    def _run(replay: ReplayClient, final: bool) -> Dict[str, Dict[str, List[srt.Subtitle]]]:
+        out = {}
+        for name, subs in files.items():
+            journal = journals.get(name)
+            for tgt in targets.get(name, []):
+                run_kw = dict(kw, masked=masked[name])
+                if final:
+                    run_kw.update(
+                        tm=tm, journal=journal, stats=stats, telemetry=telemetry,
+                        on_result=(lambda i, sub, n=name, t=tgt: on_result(n, t, i, sub)) if on_result else None,
+                        on_error=(lambda blocks, exc, n=name, t=tgt: on_error(n, t, blocks, exc)) if on_error else None,
+                    )
+                else:
+                    # putaran kering: TM & journal hanya dibaca, hasil dibuang
+                    run_kw.update(
+                        tm=_ReadOnly(tm) if tm is not None else None,
+                        journal=_ReadOnly(journal) if journal is not None else None,
+                    )
+                out.setdefault(name, {})[tgt] = translate_subtitles(replay, subs, model, src, tgt, **run_kw)
+        return out
+
+    for n in range(1, rounds + 1):
+        replay = ReplayClient(responses)
+        _run(replay, final=False)
+        if not replay.misses:
+            break
+        batch = submit_batch(client, replay.misses, completion_window, {"round": str(n)})
+        batch = wait_batch(
+            client, batch.id, poll_interval, timeout, (lambda b: on_status(n, b)) if on_status is not None else None,
+            cancel_event,
+        )
+        if batch.status == "failed" and not batch.output_file_id:
+            detail = "; ".join(e.message or "" for e in (batch.errors.data if batch.errors and batch.errors.data else []))
+            raise RuntimeError(f"batch {batch.id} gagal: {detail or 'tanpa detail'}")
+        ok, failed = read_batch_results(client, batch)
+        responses.update(ok)
+        errors.update(failed)
+
+    # putaran akhir: semua hasil diputar ulang sekali lagi, kali ini dengan efek samping (TM, journal, callback)
+    return _run(ReplayClient(responses, errors), final=True)
@@ -0,0 +1,455 @@
+# subtitle_translator/cli.py
+"""CLI headless untuk menerjemahkan banyak file .srt (cron / server tanpa browser).
+
+Contoh:
+    python -m subtitle_translator "season1/*.srt" --tgt id --concurrency 12 -o out/
+    python -m subtitle_translator "season1/*.srt" --tgt id,ms,en -o out/   # 1 run, 3 bahasa
+    python -m subtitle_translator backlog/ -r --batch --base-url https://api.openai.com/v1 --model gpt-4o-mini
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+from typing import Dict, List
+
+import srt
+
+from .batch import translate_batch
+from .clients import make_client
+from .core import CircuitBreaker, RunStats, TokenBucket, parse_glossary
+from .engine import estimate_run, translate_multi
+from .filters import RULES, PassthroughFilter
+from .srtio import SrtWriter, iter_subtitles
+from .storage import JOURNAL_DIR, TM_DEFAULT_PATH, TranslationMemory, file_digest, journal_for
+from .governor import RateGovernor
+from .hedge import Hedger
+from .pool import EndpointPool, PooledClient, parse_endpoints
+from .segment import Segmenter
+from .telemetry import Pricing, Telemetry
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="python -m subtitle_translator",
+        description="Terjemahkan file .srt secara batch lewat API OpenAI-compatible (DeepSeek, dsb).",
+    )
+    p.add_argument("inputs", nargs="+", help="File .srt, folder, atau glob (mis. 'season1/*.srt').")
+    p.add_argument("-o", "--output-dir", help="Folder output (default: di samping file sumber).")
+    p.add_argument("-r", "--recursive", action="store_true", help="Cari .srt di subfolder juga.")
+    p.add_argument("--overwrite", action="store_true", help="Terjemahkan ulang walau output sudah ada.")
+    p.add_argument("--estimate", action="store_true", help="Hanya tampilkan perkiraan request, token & biaya (tanpa API key).")
+
+    api = p.add_argument_group("API")
+    api.add_argument("--api-key", help="Default: env DEEPSEEK_API_KEY (boleh lewat .env).")
+    api.add_argument("--base-url", default=None, help="Default: env DEEPSEEK_BASE_URL atau https://api.deepseek.com")
+    api.add_argument("--model", default="deepseek-chat")
+    api.add_argument(
+        "--endpoints",
+        help="File pool endpoint (1 per baris: nama | base_url | api_key | model | rpm; api_key boleh $ENV). "
+             "Menggantikan --api-key/--base-url.",
+    )
+    api.add_argument("--no-pin-model", action="store_true", help="Pool: izinkan endpoint dengan model lain.")
+    api.add_argument("--connect-timeout", type=float, default=10.0, help="Timeout membuka koneksi (detik).")
+    api.add_argument("--read-timeout", type=float, default=120.0, help="Timeout menunggu response (detik).")
+
+    tr = p.add_argument_group("Translate")
+    tr.add_argument("--src", default="en", help="Source language")
+    tr.add_argument("--tgt", default="id", help="Target language; beberapa bahasa dipisah koma (mis. id,ms,en).")
+    tr.add_argument("--mode", choices=["block", "line", "pack"], default="block")
+    tr.add_argument("--token-budget", type=int, default=1500, help="Token budget per request (mode pack).")
+    tr.add_argument("--no-dedup", action="store_true", help="Matikan dedup teks identik.")
+    tr.add_argument("--no-prefilter", action="store_true", help="Kirim semua blok ke model (termasuk ♪, angka, tag saja, ...).")
+    tr.add_argument(
+        "--prefilter-rules", default=",".join(RULES),
+        help=f"Rule pre-filter yang aktif, dipisah koma (default: semua = {','.join(RULES)}).",
+    )
+    tr.add_argument(
+        "--segment", action="store_true",
+        help="Gabungkan blok yang melanjutkan kalimat yang sama jadi 1 request; hasil dibagi lagi ke blok aslinya.",
+    )
+    tr.add_argument("--segment-gap", type=float, default=1.0, help="Jeda maks. antar blok yang digabung (detik).")
+    tr.add_argument(
+        "--segment-by", choices=["length", "duration"], default="length",
+        help="Dasar pembagian hasil ke blok asli: panjang teks sumber atau durasi blok.",
+    )
+    tr.add_argument("--glossary", help="File glosarium (1 per baris: sumber = terjemahan), masuk ke system prompt.")
+    tr.add_argument("--max-retries", type=int, default=6)
+    tr.add_argument("--backoff", type=float, default=2.0, help="Backoff dasar bila server tidak mengirim Retry-After.")
+    tr.add_argument("--repair-rounds", type=int, default=1, help="Kirim ulang baris hilang/rusak sebanyak ini (0 = tidak).")
+    tr.add_argument("--breaker-threshold", type=int, default=5, help="Error transient berturut-turut sebelum semua worker dijeda.")
+    tr.add_argument("--breaker-cooldown", type=float, default=10.0, help="Lama jeda circuit breaker (detik).")
+    tr.add_argument(
+        "--hedge-pct", type=float, default=0,
+        help="Kirim duplikat request yang lebih lambat dari persentil latency ini (mis. 95). 0 = tanpa hedging.",
+    )
+    tr.add_argument("--hedge-max-ratio", type=float, default=0.1, help="Maks. duplikat per request (batas biaya hedging).")
+
+    run = p.add_argument_group("Concurrency")
+    run.add_argument("--concurrency", type=int, default=8, help="Batas request bersamaan untuk SEMUA file.")
+    run.add_argument("--file-workers", type=int, default=4, help="Jumlah file yang diproses bersamaan.")
+    run.add_argument("--rps", type=float, default=5.0, help="Max requests / second (global). 0 = tanpa batas.")
+    run.add_argument("--rpm", type=float, default=0, help="Kuota requests / menit, dibagi adil antar file. 0 = tanpa batas.")
+    run.add_argument("--tpm", type=float, default=0, help="Kuota tokens / menit, dibagi adil antar file. 0 = tanpa batas.")
+
+    batch = p.add_argument_group("Batch offline (Batch API, /v1/files + /v1/batches)")
+    batch.add_argument(
+        "--batch", action="store_true",
+        help="Kirim semua blok pending sebagai batch JSONL, tunggu selesai, lalu tulis output (tanpa batas RPM/TPM).",
+    )
+    batch.add_argument("--batch-poll", type=float, default=30.0, help="Interval polling status batch (detik).")
+    batch.add_argument("--batch-timeout", type=float, default=None, help="Batas tunggu per batch (detik); default tanpa batas.")
+    batch.add_argument("--batch-discount", type=float, default=0.5, help="Faktor harga batch terhadap harga normal.")
+
+    cost = p.add_argument_group("Biaya (USD / 1 juta token)")
+    default_pricing = Pricing()
+    cost.add_argument("--price-input", type=float, default=default_pricing.input, help="Input, cache miss.")
+    cost.add_argument("--price-cached", type=float, default=default_pricing.cached_input, help="Input, cache hit.")
+    cost.add_argument("--price-output", type=float, default=default_pricing.output)
+
+    cache = p.add_argument_group("Cache / resume")
+    cache.add_argument("--tm", default=TM_DEFAULT_PATH, help="File translation memory (SQLite).")
+    cache.add_argument("--tm-max-mb", type=int, default=64)
+    cache.add_argument("--no-tm", action="store_true")
+    cache.add_argument("--journal-dir", default=JOURNAL_DIR)
+    cache.add_argument("--no-journal", action="store_true")
+
+    out = p.add_argument_group("Telemetry")
+    out.add_argument("--metrics", help="Tulis telemetry per request ke file .json atau .csv.")
+    return p
+
+def collect_inputs(inputs: List[str], recursive: bool = False, tgts: List[str] = ()) -> List[str]:
+    """Expand file/folder/glob jadi daftar .srt unik (urut); output terjemahan (*.<tgt>.srt) dilewati."""
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*.srt") if recursive else os.path.join(item, "*.srt")
+            found.extend(glob.glob(pattern, recursive=recursive))
+        elif glob.has_magic(item):
+            found.extend(glob.glob(item, recursive=recursive))
+        elif os.path.isfile(item):
+            found.append(item)
+    suffixes = tuple(f".{tgt}.srt".lower() for tgt in tgts)
+    paths = sorted({os.path.normpath(f) for f in found if f.lower().endswith(".srt")})
+    return [f for f in paths if not (suffixes and f.lower().endswith(suffixes))]
+
+def output_path(path: str, tgt: str, output_dir: str = None) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir or os.path.dirname(path), f"{stem}.{tgt}.srt")
+
+def translate_file(
+    path: str, dests: Dict[str, str], client, args, executor, limiter, tm, telemetry=None, breaker=None, governor=None,
+    hedger=None, glossary=None, prefilter=None, segmenter=None,
+) -> dict:
+    """Terjemahkan 1 file ke tiap bahasa di `dests` ({tgt: path output}); file di-parse & di-mask sekali.
+
+    Tiap blok ditulis sekali ke `<dest>.part` lalu di-rename saat semua bahasa selesai.
+    """
+    started = time.time()
+    stats = RunStats()
+    with open(path, "rb") as f:
+        subs = list(srt.sort_and_reindex(iter_subtitles(f)))
+
+    def _on_error(tgt, blocks, exc):
+        label = f"{blocks[0] + 1}" if len(blocks) == 1 else f"{blocks[0] + 1}-{blocks[-1] + 1}"
+        print(f"  ! {os.path.basename(path)} {tgt} [{label}] {exc} — blok dipertahankan (original)", file=sys.stderr, flush=True)
+
+    for dest in dests.values():
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+    # tiap file = 1 lease di governor → kuota RPM/TPM dibagi adil antar file yang berjalan
+    lease = governor.register(path) if governor is not None else None
+    try:
+        with ExitStack() as files:
+            writers = {tgt: SrtWriter(files.enter_context(open(dest + ".part", "wb"))) for tgt, dest in dests.items()}
+            translate_multi(
+                client, subs, args.model, args.src, list(dests), mode=args.mode,
+                executor=executor, limiter=limiter, breaker=breaker, governor=lease, hedger=hedger, tm=tm,
+                journal=None if args.no_journal else journal_for(path, args.journal_dir, file_digest(path)),
+                dedup=not args.no_dedup, token_budget=args.token_budget, glossary=glossary,
+                prefilter=prefilter, segmenter=segmenter,
+                max_retries=args.max_retries, backoff=args.backoff, repair_rounds=args.repair_rounds,
+                stats=stats, telemetry=telemetry, on_result=lambda tgt, i, sub: writers[tgt].add(i, sub), on_error=_on_error,
+            )
+    finally:
+        if lease is not None:
+            lease.close()
+    for dest in dests.values():
+        os.replace(dest + ".part", dest)
+    return {
+        "file": path,
+        "blocks": len(subs) * len(dests),
+        "failed": stats.get("blocks_failed"),
+        "reused": stats.get("reused"),
+        "filtered": stats.get("filtered_blocks"),
+        "segments": stats.get("segments"),
+        "segment_blocks": stats.get("segment_blocks"),
+        "saved": stats.get("requests_saved") + stats.get("dedup_saved"),
+        "invalid": stats.get("invalid_lines"),
+        "repaired": stats.get("repaired_lines"),
+        "repair_failed": stats.get("repair_failed"),
+        "elapsed": time.time() - started,
+    }
+
+def run_batch(todo, args, client, tm, glossary, prefilter, segmenter, pricing) -> int:
+    """`--batch`: semua file × bahasa jadi 1 batch per putaran; output ditulis setelah batch terakhir selesai."""
+    started = time.time()
+    files, targets = {}, {}
+    for path, dests in todo:
+        with open(path, "rb") as f:
+            files[path] = list(srt.sort_and_reindex(iter_subtitles(f)))
+        targets[path] = list(dests)
+    stats, telemetry = RunStats(), Telemetry()
+    last = {}
+
+    def _on_status(round_no, batch):
+        counts = batch.request_counts
+        state = (round_no, batch.status, counts.completed if counts else 0)
+        if state != last.get("state"):
+            last["state"] = state
+            done = f" • {counts.completed}/{counts.total} selesai, {counts.failed} gagal" if counts else ""
+            print(f"batch {round_no} {batch.id}: {batch.status}{done}", flush=True)
+
+    def _on_error(path, tgt, blocks, exc):
+        label = f"{blocks[0] + 1}" if len(blocks) == 1 else f"{blocks[0] + 1}-{blocks[-1] + 1}"
+        print(f"  ! {os.path.basename(path)} {tgt} [{label}] {exc} — blok dipertahankan (original)", file=sys.stderr, flush=True)
+
+    out = translate_batch(
+        client, files, args.model, args.src, targets, mode=args.mode,
+        poll_interval=args.batch_poll, timeout=args.batch_timeout, tm=tm,
+        journals={} if args.no_journal else {path: journal_for(path, args.journal_dir, file_digest(path)) for path in files},
+        dedup=not args.no_dedup, token_budget=args.token_budget, glossary=glossary,
+        prefilter=prefilter, segmenter=segmenter, repair_rounds=args.repair_rounds, workers=args.concurrency,
+        stats=stats, telemetry=telemetry, on_status=_on_status, on_error=_on_error,
+    )
+    for path, dests in todo:
+        for tgt, dest in dests.items():
+            os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+            with open(dest + ".part", "w", encoding="utf-8") as f:
+                f.write(srt.compose(out[path][tgt], reindex=False))
+            os.replace(dest + ".part", dest)
+
+    blocks = sum(len(files[path]) * len(dests) for path, dests in todo)
+    discounted = Pricing(*(price * args.batch_discount for price in pricing))
+    t = telemetry.summary(pricing=discounted)
+    print("\n── Ringkasan (batch) ──")
+    print(
+        f"File selesai : {len(todo)} • {blocks} blok • gagal {stats.get('blocks_failed')} "
+        f"(+ {stats.get('repair_failed')} baris gagal diperbaiki) • dari journal {stats.get('reused')}"
+    )
+    print(f"Pre-filter   : {stats.get('filtered_blocks')} blok diteruskan tanpa request")
+    print(
+        f"Validasi     : {stats.get('invalid_lines')} baris rusak • {stats.get('repaired_lines')} diperbaiki "
+        f"• {stats.get('repair_failed')} tetap gagal (teks sumber / hasil rusak dipakai)"
+    )
+    print(f"Waktu        : {timedelta(seconds=int(time.time() - started))}")
+    print(
+        f"Token        : {t['requests']} request • input {t['prompt_tokens']} (cache hit {t['cached_prompt_tokens']}) "
+        f"• output {t['completion_tokens']} • ≈ ${t['cost_usd']:.4f} (harga batch ×{args.batch_discount:g})"
+    )
+    return 0
+
+def make_prefilter(args):
+    if args.no_prefilter:
+        return None
+    names = [n.strip() for n in args.prefilter_rules.split(",") if n.strip()]
+    unknown = [n for n in names if n not in RULES]
+    if unknown:
+        raise ValueError(f"rule tidak dikenal: {', '.join(unknown)} (pilihan: {', '.join(RULES)})")
+    return PassthroughFilter(names)
+
+def print_estimate(todo, args, glossary, pricing, prefilter=None, segmenter=None) -> int:
+    """`--estimate`: perkiraan per file + total, tanpa request ke API (termasuk dry-run pre-filter)."""
+    total = {}
+    for path, dests in todo:
+        with open(path, "rb") as f:
+            subs = list(srt.sort_and_reindex(iter_subtitles(f)))
+        est = {}
+        for tgt in dests:
+            for k, v in estimate_run(
+                subs, args.mode, args.src, tgt, not args.no_dedup, args.token_budget, glossary, pricing, prefilter, segmenter,
+            ).items():
+                est[k] = est.get(k, 0) + v
+        for k, v in est.items():
+            total[k] = total.get(k, 0) + v
+        print(
+            f"{path}: {len(subs)} blok × {len(dests)} bahasa • {est['requests']} request • ~{est['prompt_tokens']} token input "
+            f"• ~{est['completion_tokens']} output • ≈ ${est['cost_usd']:.4f}"
+            + (f" • {est['filtered_blocks']} blok dilewati filter" if est.get("filtered_blocks") else ""),
+            flush=True,
+        )
+    print(
+        f"Total        : {total['requests']} request • ~{total['prompt_tokens']} token input "
+        f"(~{total['cached_prompt_tokens']} bisa dari prompt cache) • ~{total['completion_tokens']} output\n"
+        f"Biaya        : ≈ ${total['cost_usd']:.4f} (tanpa prompt cache ${total['cost_usd_no_cache']:.4f}; "
+        "belum termasuk hit TM/journal, retry & perbaikan baris)"
+    )
+    if prefilter is not None:
+        rules = ", ".join(f"{name} {total.get(f'filtered_{name}', 0)}" for name, _ in prefilter.rules)
+        print(
+            f"Pre-filter   : {total.get('filtered_blocks', 0)} blok diteruskan tanpa request ({rules}) • "
+            f"{total.get('requests_skipped', 0)} request dihemat"
+        )
+    if segmenter is not None:
+        print(
+            f"Segmentasi   : {total.get('segment_blocks', 0)} blok digabung jadi {total.get('segments', 0)} kalimat • "
+            f"{total.get('segment_requests_saved', 0)} request dihemat"
+        )
+    return 0
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    glossary = {}
+    if args.glossary:
+        try:
+            with open(args.glossary, encoding="utf-8") as f:
+                glossary = parse_glossary(f.read())
+        except (OSError, ValueError) as e:
+            print(f"Glossary tidak valid: {e}", file=sys.stderr)
+            return 2
+    pricing = Pricing(args.price_input, args.price_cached, args.price_output)
+    try:
+        prefilter = make_prefilter(args)
+    except ValueError as e:
+        print(f"Pre-filter tidak valid: {e}", file=sys.stderr)
+        return 2
+    segmenter = Segmenter(args.segment_gap, by=args.segment_by) if args.segment else None
+
+    tgts = list(dict.fromkeys(t.strip() for t in args.tgt.split(",") if t.strip()))
+    paths = collect_inputs(args.inputs, args.recursive, tgts)
+    todo = []
+    for path in paths:
+        dests = {}
+        for tgt in tgts:
+            dest = output_path(path, tgt, args.output_dir)
+            if os.path.exists(dest) and not args.overwrite:
+                print(f"skip {path} → {tgt} (output sudah ada: {dest})", flush=True)
+                continue
+            dests[tgt] = dest
+        if dests:
+            todo.append((path, dests))
+    if not todo:
+        print("Tidak ada file .srt untuk diterjemahkan.", file=sys.stderr)
+        return 0 if paths else 1
+
+    if args.estimate:
+        return print_estimate(todo, args, glossary, pricing, prefilter, segmenter)
+
+    api_key = args.api_key or os.getenv("DEEPSEEK_API_KEY", "")
+    base_url = args.base_url or os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+    pool = None
+    if args.endpoints:
+        try:
+            with open(args.endpoints, encoding="utf-8") as f:
+                pool = EndpointPool(
+                    parse_endpoints(f.read()),
+                    client_factory=lambda url, key: make_client(url, key, args.connect_timeout, args.read_timeout),
+                )
+        except (OSError, ValueError) as e:
+            print(f"Pool endpoint tidak valid: {e}", file=sys.stderr)
+            return 2
+    elif not api_key:
+        print("API key tidak tersedia: isi --api-key atau env DEEPSEEK_API_KEY.", file=sys.stderr)
+        return 2
+
+    if args.batch:
+        if pool is not None:
+            print("--batch butuh 1 endpoint (--base-url / --api-key), bukan --endpoints.", file=sys.stderr)
+            return 2
+        tm = None if args.no_tm else TranslationMemory(args.tm, max_bytes=args.tm_max_mb * 1024 * 1024)
+        client = make_client(base_url, api_key, args.connect_timeout, args.read_timeout)
+        return run_batch(todo, args, client, tm, glossary, prefilter, segmenter, pricing)
+    if pool is not None:
+        client = PooledClient(pool, pin_model=None if args.no_pin_model else args.model)
+    else:
+        # 1 client (pool koneksi keep-alive) untuk semua file & worker
+        client = make_client(base_url, api_key, args.connect_timeout, args.read_timeout)
+    limiter = TokenBucket(args.rps, capacity=args.concurrency)
+    breaker = CircuitBreaker(args.breaker_threshold, args.breaker_cooldown)
+    governor = RateGovernor(args.rpm, args.tpm) if (args.rpm or args.tpm) else None
+    hedger = Hedger(args.hedge_pct, args.hedge_max_ratio, max_threads=2 * args.concurrency) if args.hedge_pct else None
+    tm = None if args.no_tm else TranslationMemory(args.tm, max_bytes=args.tm_max_mb * 1024 * 1024)
+
+    telemetry = Telemetry()
+    started = time.time()
+    rows, failures = [], []
+    # request executor = batas concurrency global; file executor hanya mengatur urutan file
+    with ThreadPoolExecutor(max_workers=args.concurrency) as request_pool, \
+            ThreadPoolExecutor(max_workers=args.file_workers) as file_pool:
+        futures = {
+            file_pool.submit(
+                translate_file, path, dests, client, args, request_pool, limiter, tm, telemetry, breaker, governor, hedger,
+                glossary, prefilter, segmenter,
+            ): path
+            for path, dests in todo
+        }
+        for n, fut in enumerate(futures, start=1):
+            path = futures[fut]
+            try:
+                row = fut.result()
+            except Exception as e:
+                failures.append((path, e))
+                print(f"[{n}/{len(todo)}] GAGAL {path}: {e}", file=sys.stderr, flush=True)
+                continue
+            rows.append(row)
+            print(
+                f"[{n}/{len(todo)}] {path}: {row['blocks']} blok • {row['failed']} gagal • "
+                f"{row['repair_failed']} baris gagal diperbaiki • "
+                f"{timedelta(seconds=int(row['elapsed']))}",
+                flush=True,
+            )
+
+    # ringkasan akhir
+    blocks = sum(r["blocks"] for r in rows)
+    print("\n── Ringkasan ──")
+    print(f"File selesai : {len(rows)}/{len(todo)} (dilewati {len(paths) - len(todo)})")
+    print(
+        f"Blok         : {blocks} • gagal {sum(r['failed'] for r in rows)} "
+        f"(+ {sum(r['repair_failed'] for r in rows)} baris gagal diperbaiki) • dari journal {sum(r['reused'] for r in rows)}"
+    )
+    print(f"Request hemat: {sum(r['saved'] for r in rows)} (translation memory + dedup)")
+    print(f"Pre-filter   : {sum(r['filtered'] for r in rows)} blok diteruskan tanpa request (♪, angka, tag saja, ...)")
+    if segmenter is not None:
+        print(f"Segmentasi   : {sum(r['segment_blocks'] for r in rows)} blok digabung jadi {sum(r['segments'] for r in rows)} kalimat")
+    print(
+        f"Validasi     : {sum(r['invalid'] for r in rows)} baris rusak • {sum(r['repaired'] for r in rows)} diperbaiki "
+        f"• {sum(r['repair_failed'] for r in rows)} tetap gagal (teks sumber / hasil rusak dipakai)"
+    )
+    print(f"Waktu        : {timedelta(seconds=int(time.time() - started))}")
+    translated = sum(r["blocks"] - r["reused"] - r["filtered"] for r in rows)
+    t = telemetry.summary(blocks_done=translated, pricing=pricing)
+    print(
+        f"Latency      : p50 {t['latency_p50']:.2f}s • p90 {t['latency_p90']:.2f}s • p99 {t['latency_p99']:.2f}s "
+        f"• {t['requests']} request • retry {t['retries']} • backoff {t['backoff_s']:.1f}s"
+    )
+    print(f"Throughput   : {t['blocks_per_s']:.2f} blok/s • {t['tokens_per_s']:.0f} token/s")
+    print(
+        f"Token        : input {t['prompt_tokens']} (cache hit {t['cached_prompt_tokens']} • {t['cache_hit_rate']:.0%}) "
+        f"• output {t['completion_tokens']} • ≈ ${t['cost_usd']:.4f}"
+    )
+    if breaker.trips:
+        print(f"Breaker      : terbuka {breaker.trips}× • total jeda {breaker.open_s:.0f}s")
+    if hedger is not None:
+        hedger.close()
+        h = hedger.summary()
+        print(
+            f"Hedging      : {h['hedges']} duplikat ({h['hedge_rate']:.0%}) • menang {h['hedge_wins']} • "
+            f"hemat {h['latency_saved_s']:.0f}s • {h['hedge_skipped']} dilewati (batas)"
+        )
+    if pool is not None:
+        for row in pool.status():
+            latency = f"{row['Latency (s)']:.2f}s" if row["Latency (s)"] is not None else "-"
+            print(f"Endpoint     : {row['Endpoint']} ({row['Status']}) • {row['Requests']} request • "
+                  f"{row['Errors']} error • latency {latency}")
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8", newline="") as f:
+            f.write(telemetry.to_csv() if args.metrics.lower().endswith(".csv") else telemetry.to_json(translated))
+    for path, e in failures:
+        print(f"GAGAL {path}: {e}", file=sys.stderr)
+    return 1 if failures else 0
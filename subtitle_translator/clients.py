@@ -0,0 +1,43 @@
+# subtitle_translator/clients.py
+"""Client OpenAI dengan transport HTTP yang dipakai ulang: keep-alive pool, HTTP/2 bila tersedia, timeout eksplisit.
+
+Satu client per (base URL, API key) cukup untuk semua run & worker — koneksi (TLS handshake) yang
+sudah terbuka dipakai ulang. Di page dipegang `st.cache_resource`, di CLI dibuat sekali per proses.
+"""
+import importlib.util
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+def make_http_client(
+    connect_timeout: float = 10.0,
+    read_timeout: float = 120.0,
+    max_connections: int = 64,
+    keepalive_expiry: float = 30.0,
+    http2: bool = True,
+):
+    """httpx client ber-pool untuk `OpenAI(http_client=...)`; HTTP/2 hanya bila paket `h2` terpasang."""
+    import openai
+
+    try:
+        import httpx
+    except ImportError:  # SDK openai 3.x memakai fork `httpx2` (API sama)
+        import httpx2 as httpx
+    return openai.DefaultHttpxClient(
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        http2=http2 and http2_available(),
+    )
+
+def make_client(base_url: str, api_key: str, connect_timeout: float = 10.0, read_timeout: float = 120.0, **http_kw):
+    """`OpenAI` client tanpa retry bawaan SDK (retry ditangani core) di atas `make_http_client`."""
+    from openai import OpenAI
+
+    http_client = make_http_client(connect_timeout, read_timeout, **http_kw)
+    return OpenAI(
+        api_key=api_key, base_url=base_url, max_retries=0, timeout=http_client.timeout, http_client=http_client,
+    )
@@ -0,0 +1,537 @@
+# subtitle_translator/core.py
+"""Inti penerjemah subtitle: mask tag, retry, rate limit, dan request per mode (block/line/pack).
+
+Tidak bergantung pada Streamlit, jadi bisa dipakai dari page maupun CLI.
+"""
+import functools
+import hashlib
+import re
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from nuna_common.ratelimit import TokenBucket  # noqa: F401  (re-export: dipakai engine, CLI, page)
+
+from .errors import CircuitBreaker, StreamStalled, classify_error, is_timeout, retry_delay
+from .storage import TranslationMemory
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Helpers: mask/unmask HTML & ASS tags, rate limit detection
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+ASS_TAG_RE = re.compile(r"\{\\[^}]*\}")
+
+def mask_tags(text: str) -> Tuple[str, List[str], List[str]]:
+    html_tags, ass_tags = [], []
+
+    def _mh(m):
+        html_tags.append(m.group(0))
+        return f"[[HTML_TAG_{len(html_tags)-1}]]"
+
+    def _ma(m):
+        ass_tags.append(m.group(0))
+        return f"[[ASS_TAG_{len(ass_tags)-1}]]"
+
+    text = HTML_TAG_RE.sub(_mh, text)
+    text = ASS_TAG_RE.sub(_ma, text)
+    return text, html_tags, ass_tags
+
+def unmask_tags(text: str, html_tags: List[str], ass_tags: List[str]) -> str:
+    for i, t in enumerate(html_tags):
+        text = text.replace(f"[[HTML_TAG_{i}]]", t)
+    for i, t in enumerate(ass_tags):
+        text = text.replace(f"[[ASS_TAG_{i}]]", t)
+    return text
+
+def is_rate_limit(err: Exception) -> bool:
+    return classify_error(err).kind == "rate_limit"
+
+def call_with_retry(fn, max_retries=6, backoff=2.0, telemetry=None, breaker: CircuitBreaker = None, max_wait=120.0):
+    """Panggil `fn()`; error transient (429, 5xx, timeout, network, stream macet) diulang.
+
+    Lama tunggu mengikuti Retry-After dari server bila ada, selain itu exponential backoff dengan
+    jitter (lihat `retry_delay`). `breaker` (opsional, dibagi antar worker) menjeda semua request
+    saat provider kewalahan. Error lain (400/401/404, dst.) langsung dilempar.
+    """
+    attempt = 0
+    if telemetry is not None:
+        telemetry.begin()
+    while True:
+        if breaker is not None:
+            breaker.wait()
+        try:
+            result = fn()
+        except Exception as e:
+            info = classify_error(e)
+            if breaker is not None:
+                breaker.record_failure(info)
+            attempt += 1
+            if attempt > max_retries or not info.retryable:
+                raise
+            sleep_s = retry_delay(info, attempt, backoff, max_wait)
+            if telemetry is not None:
+                telemetry.note_retry(sleep_s)
+            time.sleep(sleep_s)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+def estimate_tokens(text: str) -> int:
+    """Estimasi kasar jumlah token (±4 karakter per token), cukup untuk packing."""
+    return len(text) // 4 + 1
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Statistik run + lookup translation memory
+class RunStats:
+    """Counter thread-safe untuk satu run (TM hit, request dihemat, dst)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def get(self, name: str) -> int:
+        return self.counts.get(name, 0)
+
+def tm_lookup(tm, stats, src: str, tgt: str, model: str, texts: List[str], settings: str = "") -> Dict[int, str]:
+    """Cari `texts` (sudah di-mask) di translation memory; hasil {index: terjemahan ter-mask}."""
+    if tm is None:
+        return {}
+    found = tm.get_many(src, tgt, model, texts, settings)
+    hits = {i: found[t] for i, t in enumerate(texts) if t in found}
+    if stats is not None:
+        stats.incr("tm_lookups", len(texts))
+        stats.incr("tm_hits", len(hits))
+    return hits
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Prompt: semua yang sama untuk seluruh job ada di system prompt (identik byte-per-byte antar request,
+# urut dari yang paling stabil) → bisa kena prompt caching provider; user message hanya berisi teks.
+PROMPT_HEAD = (
+    "You are a professional subtitle translator.\n"
+    "Keep ALL placeholders like [[HTML_TAG_#]] and [[ASS_TAG_#]] unchanged.\n"
+)
+PROMPT_RULES = {
+    "block": (
+        "DO NOT reorder or merge lines. Return the same number of lines, each starting with its '<<LINE i>> ' prefix unchanged.\n"
+    ),
+    "line": (
+        "The user message is a single subtitle line. Do NOT add or remove lines. Do NOT merge or split content.\n"
+        "Return ONLY the translated text.\n"
+    ),
+    "pack": (
+        "Each line belongs to a separate subtitle block; translate every line, using neighbouring blocks only as context.\n"
+        "DO NOT reorder, merge or split lines. Return the same number of lines, each starting with its '<<BLOCK b LINE i>> ' prefix unchanged.\n"
+    ),
+}
+
+def parse_glossary(text: str) -> Dict[str, str]:
+    """Glosarium dari teks, 1 istilah per baris: `sumber = terjemahan` (baris kosong / `#` diabaikan)."""
+    glossary = {}
+    for n, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        term, sep, translation = line.partition("=")
+        if not sep or not term.strip() or not translation.strip():
+            raise ValueError(f"baris {n}: format `sumber = terjemahan`")
+        glossary[term.strip()] = translation.strip()
+    return glossary
+
+def glossary_key(glossary: Optional[Dict[str, str]]) -> Tuple[Tuple[str, str], ...]:
+    """Bentuk glosarium yang hashable & urutannya tetap (supaya system prompt selalu identik)."""
+    return tuple(sorted(glossary.items())) if glossary else ()
+
+@functools.lru_cache(maxsize=64)
+def system_prompt(mode: str, src: str, tgt: str, glossary: Tuple[Tuple[str, str], ...] = ()) -> str:
+    """System prompt invariant per (mode, bahasa, glosarium); `glossary` dari `glossary_key`."""
+    prompt = PROMPT_HEAD + PROMPT_RULES[mode] + f"Translate exactly from source language '{src}' to target language '{tgt}'.\n"
+    if glossary:
+        prompt += "Always use these glossary translations:\n" + "".join(f"- {a} => {b}\n" for a, b in glossary)
+    return prompt
+
+def settings_key(glossary: Optional[Dict[str, str]] = None, segmenter=None) -> str:
+    """Fingerprint setting yang mengubah hasil terjemahan (teks prompt, glosarium, aturan segmentasi).
+
+    Ikut masuk key translation memory & journal, jadi hasil dari setting lama tidak dipakai ulang.
+    """
+    return _settings_key(glossary_key(glossary), segmenter.config() if segmenter is not None else ())
+
+@functools.lru_cache(maxsize=64)
+def _settings_key(glossary: Tuple[Tuple[str, str], ...], segmenter: tuple) -> str:
+    data = repr((PROMPT_HEAD, sorted(PROMPT_RULES.items()), glossary, segmenter))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+def block_prompt(lines: List[str], keys) -> str:
+    return "\n".join(f"<<LINE {i}>> {lines[i]}" for i in keys)
+
+def pack_prompt(blocks: List[List[str]], keys) -> str:
+    return "\n".join(f"<<BLOCK {b} LINE {i}>> {blocks[b][i]}" for b, i in keys)
+
+# ───────────────────────────────────────────────────────────────────────────────
+# OpenAI-compatible call
+def chat_translate(
+    client,
+    model: str,
+    system: str,
+    user: str,
+    limiter: TokenBucket = None,
+    stream: bool = False,
+    on_line=None,
+    stall_timeout: float = None,
+    telemetry=None,
+    governor=None,
+) -> str:
+    """Kirim 1 chat completion. Dengan `stream`, tiap baris yang selesai langsung diteruskan ke `on_line`.
+
+    `limiter` = batas request/detik milik run ini; `governor` = `GovernorLease` kuota RPM/TPM bersama.
+    """
+    if limiter is not None:
+        limiter.acquire()
+    # estimasi token (prompt + output ±sepanjang teks user) untuk TPM; dikoreksi dengan usage asli
+    estimated = estimate_tokens(system) + 2 * estimate_tokens(user)
+    if governor is not None:
+        governor.acquire(estimated)
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": user},
+    ]
+    started = time.monotonic()
+    if not stream:
+        try:
+            resp = client.chat.completions.create(model=model, messages=messages, temperature=0.0)
+        except Exception as e:
+            if telemetry is not None:
+                telemetry.record(time.monotonic() - started, error=e)
+            raise
+        usage = getattr(resp, "usage", None)
+        if telemetry is not None:
+            telemetry.record(time.monotonic() - started, usage=usage)
+        if governor is not None and usage is not None:
+            governor.settle((usage.prompt_tokens or 0) + (usage.completion_tokens or 0) - estimated)
+        return resp.choices[0].message.content.strip()
+
+    # streaming: read timeout = jeda maksimal antar chunk, jadi stream macet cepat terdeteksi
+    extra = {"timeout": stall_timeout} if stall_timeout else {}
+    if telemetry is not None or governor is not None:
+        extra["stream_options"] = {"include_usage": True}
+    pieces, buf, usage, ttft = [], "", None, None
+    try:
+        resp = client.chat.completions.create(model=model, messages=messages, temperature=0.0, stream=True, **extra)
+        for chunk in resp:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta and ttft is None:
+                ttft = time.monotonic() - started
+            pieces.append(delta)
+            if on_line is not None and delta:
+                buf += delta
+                *complete, buf = buf.split("\n")
+                for line in complete:
+                    if line.strip():
+                        on_line(line.strip())
+    except Exception as e:
+        stalled = StreamStalled(f"stream stalled > {stall_timeout}s") if stall_timeout and is_timeout(e) else None
+        if telemetry is not None:
+            telemetry.record(time.monotonic() - started, error=stalled or e, ttft_s=ttft, stream=True)
+        if stalled is not None:
+            raise stalled from e
+        raise
+    if telemetry is not None:
+        telemetry.record(time.monotonic() - started, usage=usage, ttft_s=ttft, stream=True)
+    if governor is not None and usage is not None:
+        governor.settle((usage.prompt_tokens or 0) + (usage.completion_tokens or 0) - estimated)
+    if on_line is not None and buf.strip():
+        on_line(buf.strip())
+    return "".join(pieces).strip()
+
+def _complete(client, model: str, system: str, user: str, max_retries, backoff, chat_kw: Dict) -> str:
+    """`chat_translate` + `call_with_retry`; `breaker` & `hedger` di `chat_kw` hanya untuk lapisan retry.
+
+    Dengan `hedger`, tiap attempt boleh diduplikasi bila lambat (lihat `Hedger`); duplikat tidak
+    meneruskan baris stream ke `on_line` supaya live preview tidak dobel.
+    """
+    kw = dict(chat_kw)
+    breaker = kw.pop("breaker", None)
+    hedger = kw.pop("hedger", None)
+    telemetry = kw.get("telemetry")
+
+    def _attempt(hedge: bool = False) -> str:
+        return chat_translate(client, model, system, user, **(dict(kw, on_line=None) if hedge else kw))
+
+    fn = _attempt if hedger is None else (lambda: hedger.run(_attempt, telemetry))
+    return call_with_retry(fn, max_retries, backoff, telemetry, breaker)
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Validasi hasil: baris hilang/kosong, baris tergabung, placeholder rusak → request ulang baris itu saja
+PLACEHOLDER_RE = re.compile(r"\[\[(?:HTML|ASS)_TAG_\d+\]\]")
+STRAY_MARKER_RE = re.compile(r"<<(?:BLOCK\s+\d+\s+)?LINE\s+\d+>>")
+
+def validate_line(masked: str, out: str) -> Optional[str]:
+    """Alasan baris hasil tidak valid ("missing" / "split" / "merged" / "placeholder"), atau None bila valid."""
+    if not out or not out.strip():
+        return "missing"
+    if "\n" in out.strip():
+        return "split"
+    if STRAY_MARKER_RE.search(out):
+        return "merged"  # baris berikutnya ikut tergabung (marker-nya terbawa)
+    if sorted(PLACEHOLDER_RE.findall(masked)) != sorted(PLACEHOLDER_RE.findall(out)):
+        return "placeholder"
+    return None
+
+def translate_validated(send, source: Dict, stats: RunStats = None, repair_rounds: int = 1) -> Tuple[Dict, set]:
+    """Panggil `send(keys) -> {key: hasil}`, validasi tiap baris, lalu kirim ulang HANYA baris yang gagal.
+
+    Setelah `repair_rounds` putaran, baris yang masih kosong kembali ke teks sumber (ter-mask) dan
+    baris lain yang masih rusak dipakai apa adanya. Request perbaikan yang error (retry habis, breaker
+    terbuka, ...) menghentikan perbaikan tanpa membuang baris valid putaran pertama (`repair_errors`).
+    Kembalikan (hasil, key yang valid) — hanya yang valid boleh masuk translation memory.
+    """
+    keys = list(source)
+    results = send(keys)
+    bad = [k for k in keys if validate_line(source[k], results.get(k, ""))]
+    if bad and stats is not None:
+        stats.incr("invalid_lines", len(bad))
+    for _ in range(repair_rounds):
+        if not bad:
+            break
+        if stats is not None:
+            stats.incr("repair_requests")
+        try:
+            fixed = send(bad)
+        except Exception:
+            if stats is not None:
+                stats.incr("repair_errors")
+            break
+        for k in bad:
+            if fixed.get(k, "").strip() and (validate_line(source[k], fixed[k]) is None or not results.get(k, "").strip()):
+                results[k] = fixed[k]
+        still = [k for k in bad if validate_line(source[k], results.get(k, ""))]
+        if stats is not None:
+            stats.incr("repaired_lines", len(bad) - len(still))
+        bad = still
+    if bad and stats is not None:
+        stats.incr("repair_failed", len(bad))
+    for k in bad:
+        out = results.get(k, "").strip()
+        results[k] = " ".join(part.strip() for part in out.splitlines() if part.strip()) if out else source[k]
+    return results, set(keys) - set(bad)
+
+def mask_block(lines: List[str]) -> Tuple[List[str], List[Tuple[List[str], List[str]]]]:
+    """Mask tiap baris; kembalikan (baris ter-mask, [(html_tags, ass_tags), ...])."""
+    masked, stores = [], []
+    for line in lines:
+        m, h, a = mask_tags(line)
+        masked.append(m)
+        stores.append((h, a))
+    return masked, stores
+
+def translate_masked_block(
+    client,
+    model: str,
+    masked_lines: List[str],
+    src: str,
+    tgt: str,
+    max_retries=6,
+    backoff=2.0,
+    tm: TranslationMemory = None,
+    stats: RunStats = None,
+    repair_rounds: int = 1,
+    glossary: Dict[str, str] = None,
+    **chat_kw,
+) -> List[str]:
+    """Inti mode "block": baris sudah di-mask, hasil juga masih ter-mask."""
+    # translation memory: hanya baris yang belum ada yang dikirim
+    out_lines = [""] * len(masked_lines)
+    cached = tm_lookup(tm, stats, src, tgt, model, masked_lines, settings_key(glossary))
+    for i, content in cached.items():
+        out_lines[i] = content
+    todo = [i for i in range(len(masked_lines)) if i not in cached]
+
+    if not todo:
+        if stats is not None:
+            stats.incr("requests_saved")
+        return out_lines
+
+    system = system_prompt("block", src, tgt, glossary_key(glossary))
+
+    def _send(keys: List[int]) -> Dict[int, str]:
+        out = _complete(client, model, system, block_prompt(masked_lines, keys), max_retries, backoff, chat_kw)
+        # parse back
+        got = {}
+        for raw in out.splitlines():
+            raw = raw.strip()
+            if not raw.startswith("<<LINE"):
+                continue
+            try:
+                head, content = raw.split(">>", 1)
+                idx = int(head.replace("<<LINE", "").strip())
+            except ValueError:
+                continue
+            if idx in keys:
+                got[idx] = content.lstrip()
+        return got
+
+    results, valid = translate_validated(_send, {i: masked_lines[i] for i in todo}, stats, repair_rounds)
+    for i, content in results.items():
+        out_lines[i] = content
+    if tm is not None:
+        tm.put_many(src, tgt, model, {masked_lines[i]: out_lines[i] for i in todo if i in valid}, settings_key(glossary))
+    return out_lines
+
+def translate_block(client, model: str, lines: List[str], src: str, tgt: str, **kw) -> List[str]:
+    """1 request per subtitle block; jaga jumlah & urutan baris."""
+    masked_lines, stores = mask_block(lines)
+    out_lines = translate_masked_block(client, model, masked_lines, src, tgt, **kw)
+    return [unmask_tags(content, *stores[i]) for i, content in enumerate(out_lines)]
+
+def translate_masked_line(
+    client,
+    model: str,
+    masked: str,
+    src: str,
+    tgt: str,
+    max_retries=6,
+    backoff=2.0,
+    tm: TranslationMemory = None,
+    stats: RunStats = None,
+    repair_rounds: int = 1,
+    glossary: Dict[str, str] = None,
+    **chat_kw,
+) -> str:
+    """Inti mode "line": 1 baris ter-mask per request."""
+    cached = tm_lookup(tm, stats, src, tgt, model, [masked], settings_key(glossary))
+    if cached:
+        if stats is not None:
+            stats.incr("requests_saved")
+        return cached[0]
+
+    system = system_prompt("line", src, tgt, glossary_key(glossary))
+    results, valid = translate_validated(
+        lambda keys: {0: _complete(client, model, system, masked, max_retries, backoff, chat_kw)},
+        {0: masked}, stats, repair_rounds,
+    )
+    res = results[0]
+    if tm is not None and valid:
+        tm.put_many(src, tgt, model, {masked: res}, settings_key(glossary))
+    return res
+
+def translate_line(client, model: str, line: str, src: str, tgt: str, **kw) -> str:
+    """1 request per baris (mode "line")."""
+    m, h, a = mask_tags(line)
+    return unmask_tags(translate_masked_line(client, model, m, src, tgt, **kw), h, a)
+
+PACK_MARKER_RE = re.compile(r"^<<BLOCK\s+(\d+)\s+LINE\s+(\d+)>>\s?(.*)$")
+
+def translate_masked_pack(
+    client,
+    model: str,
+    masked_blocks: List[List[str]],
+    src: str,
+    tgt: str,
+    max_retries=6,
+    backoff=2.0,
+    tm: TranslationMemory = None,
+    stats: RunStats = None,
+    repair_rounds: int = 1,
+    glossary: Dict[str, str] = None,
+    **chat_kw,
+) -> List[List[str]]:
+    """Inti mode "pack": beberapa blok ter-mask dalam 1 request; marker <<BLOCK b LINE i>>."""
+    # translation memory: baris yang sudah ada tidak ikut dikirim
+    flat = [(b, i) for b, lines in enumerate(masked_blocks) for i in range(len(lines))]
+    cached = tm_lookup(tm, stats, src, tgt, model, [masked_blocks[b][i] for b, i in flat], settings_key(glossary))
+    out_blocks = [[""] * len(lines) for lines in masked_blocks]
+    todo = []
+    for n, (b, i) in enumerate(flat):
+        if n in cached:
+            out_blocks[b][i] = cached[n]
+        else:
+            todo.append((b, i))
+
+    if not todo:
+        if stats is not None:
+            stats.incr("requests_saved")
+        return out_blocks
+
+    system = system_prompt("pack", src, tgt, glossary_key(glossary))
+
+    def _send(keys: List[Tuple[int, int]]) -> Dict[Tuple[int, int], str]:
+        out = _complete(client, model, system, pack_prompt(masked_blocks, keys), max_retries, backoff, chat_kw)
+        # parse back
+        wanted, got = set(keys), {}
+        for raw in out.splitlines():
+            m = PACK_MARKER_RE.match(raw.strip())
+            if not m:
+                continue
+            key = (int(m.group(1)), int(m.group(2)))
+            if key in wanted:
+                got[key] = m.group(3)
+        return got
+
+    results, valid = translate_validated(_send, {(b, i): masked_blocks[b][i] for b, i in todo}, stats, repair_rounds)
+    for (b, i), content in results.items():
+        out_blocks[b][i] = content
+    if tm is not None:
+        tm.put_many(
+            src, tgt, model, {masked_blocks[b][i]: out_blocks[b][i] for b, i in todo if (b, i) in valid}, settings_key(glossary),
+        )
+    return out_blocks
+
+def translate_pack(client, model: str, blocks: List[List[str]], src: str, tgt: str, **kw) -> List[List[str]]:
+    """Beberapa subtitle block dalam 1 request (mode "pack")."""
+    masked = [mask_block(lines) for lines in blocks]
+    out_blocks = translate_masked_pack(client, model, [m for m, _ in masked], src, tgt, **kw)
+    return [
+        [unmask_tags(content, *stores[i]) for i, content in enumerate(out_lines)]
+        for out_lines, (_, stores) in zip(out_blocks, masked)
+    ]
+
+# ───────────────────────────────────────────────────────────────────────────────
+# Penjadwalan: dedup + packing → unit kerja untuk worker
+def build_jobs(masked: Dict[int, List[str]], pending: List[int], mode: str, dedup: bool = True):
+    """Susun pekerjaan dari blok `pending`: [(payload, [(blok, baris|None), ...]), ...].
+
+    payload = tuple baris ter-mask (mode "line": 1 baris). Dengan `dedup`, payload identik
+    digabung jadi 1 pekerjaan yang hasilnya dibagikan ke semua kemunculannya.
+    """
+    jobs, seen = [], {}
+    for i in pending:
+        if mode == "line":
+            items = [((m,), (i, j)) for j, m in enumerate(masked[i])]
+        else:
+            items = [(tuple(masked[i]), (i, None))]
+        for payload, occurrence in items:
+            if dedup and payload in seen:
+                jobs[seen[payload]][1].append(occurrence)
+                continue
+            seen[payload] = len(jobs)
+            jobs.append((payload, [occurrence]))
+    return jobs
+
+def pack_blocks(blocks: List[List[str]], budget: int) -> List[List[int]]:
+    """Kelompokkan blok berurutan selama estimasi token prompt masih di bawah `budget`."""
+    groups, current, used = [], [], 0
+    for i, lines in enumerate(blocks):
+        cost = estimate_tokens("\n".join(lines)) + 6 * len(lines)  # + marker per baris
+        if current and used + cost > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+def translate_units(client, model: str, payloads: List[Tuple[str, ...]], mode: str, src: str, tgt: str, **kw) -> List[List[str]]:
+    """Terjemahkan satu unit kerja (payload ter-mask); dipanggil dari worker thread."""
+    if mode == "pack":
+        return translate_masked_pack(client, model, [list(p) for p in payloads], src, tgt, **kw)
+    if mode == "line":
+        return [[translate_masked_line(client, model, p[0], src, tgt, **kw)] for p in payloads]
+    return [translate_masked_block(client, model, list(p), src, tgt, **kw) for p in payloads]
@@ -0,0 +1,412 @@
+# subtitle_translator/engine.py
+"""Engine concurrent: resume (journal/reuse) → dedup → packing → thread pool → fan-out sesuai urutan blok."""
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List
+
+import srt
+
+from .core import (
+    CircuitBreaker,
+    RunStats,
+    TokenBucket,
+    block_prompt,
+    build_jobs,
+    estimate_tokens,
+    glossary_key,
+    mask_block,
+    pack_blocks,
+    pack_prompt,
+    settings_key,
+    system_prompt,
+    translate_units,
+    unmask_tags,
+)
+from .errors import TranslationCancelled
+from .filters import PassthroughFilter
+from .governor import GovernorLease
+from .hedge import Hedger
+from .segment import Segmenter
+from .storage import JobJournal, TranslationMemory
+from .telemetry import Pricing, Telemetry
+
+def plan_units(masked: Dict[int, List[str]], pending: List[int], mode: str, dedup: bool, token_budget: int):
+    """Payload unik (dedup) + pengelompokan jadi unit kerja (1 unit = 1 request tanpa retry/repair)."""
+    jobs = build_jobs(masked, pending, mode, dedup=dedup)
+    if mode == "pack":
+        units = pack_blocks([list(payload) for payload, _ in jobs], int(token_budget))
+    else:
+        units = [[k] for k in range(len(jobs))]
+    return jobs, units
+
+def mask_subtitles(subs: List[srt.Subtitle]) -> Dict[int, tuple]:
+    """Mask semua blok sekali: {index: (baris ter-mask, tag per baris)}."""
+    return {i: mask_block(sub.content.split("\n")) for i, sub in enumerate(subs)}
+
+def journal_keys(
+    subs: List[srt.Subtitle],
+    src: str,
+    tgt: str,
+    model: str,
+    mode: str,
+    glossary: Dict[str, str] = None,
+    prefilter: PassthroughFilter = None,
+    segmenter: Segmenter = None,
+    masked: Dict[int, tuple] = None,
+) -> List[str]:
+    """Key journal tiap blok (hash konten + setting).
+
+    Blok yang digabung `segmenter` jadi 1 kalimat di-key dengan seluruh isi unitnya + posisinya di unit:
+    potongan terjemahan bergantung pada kalimatnya, jadi blok identik di kalimat lain tidak berbagi key.
+    """
+    settings = settings_key(glossary, segmenter)
+    keys = [JobJournal.key(s.content, src, tgt, model, mode, settings) for s in subs]
+    if segmenter is None:
+        return keys
+    masked = masked if masked is not None else mask_subtitles(subs)
+    pending = list(range(len(subs)))
+    if prefilter is not None:
+        pending, _ = prefilter.split({i: masked[i][0] for i in pending}, pending, src, tgt)
+    for group in segmenter.groups(subs, masked, pending):
+        if len(group) > 1:
+            unit = "\x1e".join(subs[b].content for b in group)
+            for pos, b in enumerate(group):
+                keys[b] = JobJournal.key(f"{unit}\x1e{pos}", src, tgt, model, mode, settings)
+    return keys
+
+def estimate_run(
+    subs: List[srt.Subtitle],
+    mode: str,
+    src: str,
+    tgt: str,
+    dedup: bool = True,
+    token_budget: int = 1500,
+    glossary: Dict[str, str] = None,
+    pricing: Pricing = None,
+    prefilter: PassthroughFilter = None,
+    segmenter: Segmenter = None,
+) -> Dict:
+    """Perkiraan request, token & biaya sebelum run (tanpa TM / journal, retry, repair).
+
+    Prompt disusun sama persis dengan request asli. `cached_prompt_tokens` = system prompt semua
+    request kecuali yang pertama (bila provider men-cache prefix); biaya dihitung dengan & tanpa cache.
+    Dengan `prefilter` (dry-run filter): `filtered_blocks`, `filtered_<rule>` per rule & `requests_skipped`
+    (request yang tidak jadi dikirim dibanding tanpa filter). Dengan `segmenter`: `segments` (unit
+    gabungan), `segment_blocks` (blok di dalamnya) & `segment_requests_saved`.
+    """
+    pricing = pricing or Pricing()
+    full = mask_subtitles(subs)
+    masked = base = {i: m for i, (m, _) in full.items()}
+    pending, skipped, merged = list(range(len(subs))), {}, {}
+    if prefilter is not None:
+        pending, skipped = prefilter.split(base, pending, src, tgt)
+    _, unsegmented = plan_units(base, pending, mode, dedup, token_budget)
+    if segmenter is not None:
+        full, pending, merged = segmenter.apply(subs, full, pending)
+        masked = {i: m for i, (m, _) in full.items()}
+    jobs, units = plan_units(masked, pending, mode, dedup, token_budget)
+    system_tokens = estimate_tokens(system_prompt(mode, src, tgt, glossary_key(glossary)))
+    requests = prompt = completion = 0
+    for unit in units:
+        payloads = [list(jobs[k][0]) for k in unit]
+        if mode == "pack":
+            users = [pack_prompt(payloads, [(b, i) for b, lines in enumerate(payloads) for i in range(len(lines))])]
+        elif mode == "line":
+            users = [p[0] for p in payloads]
+        else:
+            users = [block_prompt(p, range(len(p))) for p in payloads]
+        for user in users:
+            requests += 1
+            prompt += system_tokens + estimate_tokens(user)
+            completion += estimate_tokens(user)  # output ± sepanjang input (marker ikut dikembalikan)
+    cached = max(0, requests - 1) * system_tokens
+    extra = {}
+    if prefilter is not None:
+        _, all_units = plan_units(base, list(range(len(subs))), mode, dedup, token_budget)
+        extra = {"filtered_blocks": len(skipped), "requests_skipped": len(all_units) - len(unsegmented)}
+        for name, _ in prefilter.rules:
+            extra[f"filtered_{name}"] = sum(1 for n in skipped.values() if n == name)
+    if segmenter is not None:
+        extra["segments"] = len(merged)
+        extra["segment_blocks"] = sum(len(g) for g in merged.values())
+        extra["segment_requests_saved"] = len(unsegmented) - len(units)
+    return {
+        **extra,
+        "requests": requests,
+        "prompt_tokens": prompt,
+        "system_tokens": system_tokens,
+        "cached_prompt_tokens": cached,
+        "completion_tokens": completion,
+        "cost_usd": round(pricing.cost(prompt, cached, completion), 4),
+        "cost_usd_no_cache": round(pricing.cost(prompt, 0, completion), 4),
+    }
+
+def translate_subtitles(
+    client,
+    subs: List[srt.Subtitle],
+    model: str,
+    src: str,
+    tgt: str,
+    mode: str = "block",
+    workers: int = 4,
+    executor: ThreadPoolExecutor = None,
+    limiter: TokenBucket = None,
+    breaker: CircuitBreaker = None,
+    governor: GovernorLease = None,
+    hedger: Hedger = None,
+    tm: TranslationMemory = None,
+    journal: JobJournal = None,
+    reuse: Dict[int, srt.Subtitle] = None,
+    dedup: bool = True,
+    token_budget: int = 1500,
+    max_retries: int = 6,
+    backoff: float = 2.0,
+    repair_rounds: int = 1,
+    glossary: Dict[str, str] = None,
+    stream: bool = False,
+    stall_timeout: float = None,
+    stats: RunStats = None,
+    telemetry: Telemetry = None,
+    on_progress: Callable = None,
+    on_result: Callable = None,
+    on_error: Callable = None,
+    on_line: Callable = None,
+    poll_interval: float = 0.25,
+    cancel_event: threading.Event = None,
+    masked: Dict[int, tuple] = None,
+    prefilter: PassthroughFilter = None,
+    segmenter: Segmenter = None,
+) -> List[srt.Subtitle]:
+    """Terjemahkan seluruh `subs`; hasil selalu dalam urutan `srt.Subtitle` aslinya.
+
+    Semua callback dipanggil dari thread pemanggil (aman untuk UI Streamlit):
+    - on_progress(done, total, translated_now, results)
+    - on_result(index, subtitle) — tiap blok selesai (termasuk hasil resume), mis. untuk `SrtWriter`
+    - on_error(block_indices, exc) — blok tersebut dipertahankan (original)
+    - on_line(text) — baris hasil stream yang baru selesai (hanya bila `stream`)
+
+    `executor` opsional: pool bersama (mis. batas concurrency global di CLI); jika kosong
+    dibuat pool sendiri berisi `workers` thread. `breaker` dibagi semua worker (default: 1 per
+    pemanggilan) supaya semua request berhenti bersama saat provider kewalahan. `governor` = jatah
+    run ini di `RateGovernor` bersama (RPM/TPM lintas sesi/file). `hedger` (opsional) mengirim
+    duplikat request yang lebih lambat dari persentil latency terbaru. Baris hasil yang
+    hilang / placeholder-nya rusak dikirim ulang sendiri-sendiri hingga `repair_rounds` kali. `glossary`
+    ({istilah: terjemahan}) masuk ke system prompt. `telemetry` opsional mencatat tiap request
+    (latency, token, retry) — lihat `Telemetry.summary()`. `masked` = hasil `mask_subtitles(subs)`
+    yang sudah ada (dipakai bersama antar bahasa target di `translate_multi`). `prefilter` meneruskan
+    blok non-teks (♪, angka, tag saja, nama speaker, ...) apa adanya tanpa request; dihitung di
+    `stats` sebagai `filtered_blocks` & `filtered_<rule>`. `segmenter` menggabungkan blok yang
+    melanjutkan kalimat yang sama jadi 1 unit; hasilnya dibagi lagi ke blok aslinya (timestamp tetap).
+    """
+    stats = stats if stats is not None else RunStats()
+    total = len(subs)
+    results: Dict[int, srt.Subtitle] = {}
+
+    # resume: journal (hash konten + setting) lalu hasil sebelumnya dari pemanggil
+    journal_entries, keys = {}, []
+    if journal is not None:
+        journal_entries = journal.load()
+        if masked is None and segmenter is not None:
+            masked = mask_subtitles(subs)
+        keys = journal_keys(subs, src, tgt, model, mode, glossary, prefilter, segmenter, masked)
+    pending = []
+    for i, sub in enumerate(subs):
+        if journal is not None and keys[i] in journal_entries:
+            results[i] = srt.Subtitle(index=sub.index, start=sub.start, end=sub.end, content=journal_entries[keys[i]])
+        elif reuse and i in reuse:
+            results[i] = reuse[i]
+        else:
+            pending.append(i)
+    done = len(results)
+    stats.incr("reused", done)
+    if on_result is not None:
+        for i in sorted(results):
+            on_result(i, results[i])
+    if done and on_progress is not None:
+        on_progress(done, total, 0, results)
+
+    # dedup + packing: payload unik ter-mask → unit kerja
+    if masked is None:
+        masked = {i: mask_block(subs[i].content.split("\n")) for i in pending}
+    else:
+        masked = {i: masked[i] for i in pending}
+
+    # pre-filter: blok yang tidak perlu diterjemahkan diteruskan apa adanya (tidak masuk TM / journal)
+    if prefilter is not None:
+        pending, skipped = prefilter.split({i: m for i, (m, _) in masked.items()}, pending, src, tgt)
+        for i, name in sorted(skipped.items()):
+            results[i] = subs[i]
+            stats.incr("filtered_blocks")
+            stats.incr(f"filtered_{name}")
+            if on_result is not None:
+                on_result(i, subs[i])
+        masked = {i: masked[i] for i in pending}
+        done += len(skipped)
+        if skipped and on_progress is not None:
+            on_progress(done, total, 0, results)
+
+    # segmentasi kalimat: unit gabungan memakai index blok pertamanya, anggota lain keluar dari pending
+    merged: Dict[int, List[int]] = {}
+    if segmenter is not None:
+        masked, pending, merged = segmenter.apply(subs, masked, pending)
+        stats.incr("segments", len(merged))
+        stats.incr("segment_blocks", sum(len(g) for g in merged.values()))
+    jobs, units = plan_units({i: m for i, (m, _) in masked.items()}, pending, mode, dedup, token_budget)
+    stats.incr("units", len(units))
+    if dedup:
+        if mode == "pack":
+            naive_units = len(pack_blocks([masked[i][0] for i in pending], int(token_budget)))
+        else:
+            naive_units = sum(len(masked[i][0]) for i in pending) if mode == "line" else len(pending)
+        stats.incr("dedup_unique", len(jobs))
+        stats.incr("dedup_dupes", sum(len(occurrences) - 1 for _, occurrences in jobs))
+        stats.incr("dedup_saved", naive_units - len(units))
+
+    # worker thread tidak boleh menyentuh UI; baris hasil stream dikirim lewat queue
+    chat_kw = {"limiter": limiter, "breaker": breaker if breaker is not None else CircuitBreaker()}
+    if telemetry is not None:
+        chat_kw["telemetry"] = telemetry
+    if governor is not None:
+        chat_kw["governor"] = governor
+    if hedger is not None:
+        chat_kw["hedger"] = hedger
+    live_queue = queue.Queue()
+    if stream:
+        chat_kw.update(stream=True, stall_timeout=stall_timeout, on_line=live_queue.put)
+
+    def _drain_live():
+        while True:
+            try:
+                line = live_queue.get_nowait()
+            except queue.Empty:
+                return
+            if on_line is not None:
+                on_line(line)
+
+    out_lines = {i: [None] * len(masked[i][0]) for i in pending}
+    remaining = {i: len(masked[i][0]) if mode == "line" else 1 for i in pending}
+    failed = set()  # blok fallback ke original tidak dicatat di journal
+    pool = executor or ThreadPoolExecutor(max_workers=int(workers))
+    futures = {}
+    try:
+        for unit in units:
+            fut = pool.submit(
+                translate_units, client, model, [jobs[k][0] for k in unit], mode, src, tgt,
+                max_retries=max_retries, backoff=backoff, repair_rounds=repair_rounds, glossary=glossary, tm=tm, stats=stats,
+                **chat_kw,
+            )
+            futures[fut] = unit
+        translated_now = 0
+        not_done = set(futures)
+        while not_done:
+            if cancel_event is not None and cancel_event.is_set():
+                raise TranslationCancelled(f"dibatalkan setelah {done}/{total} blok")
+            completed, not_done = wait(not_done, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            _drain_live()
+            for fut in completed:
+                unit = futures[fut]
+                try:
+                    outputs = fut.result()
+                except Exception as e:
+                    stats.incr("errors")
+                    if on_error is not None:
+                        on_error(sorted({b for k in unit for i, _ in jobs[k][1] for b in merged.get(i, [i])}), e)
+                    outputs = None
+
+                # fan-out: hasil tiap payload dibagikan ke semua kemunculannya (tag masing-masing)
+                finished = 0
+                for n, k in enumerate(unit):
+                    for i, j in jobs[k][1]:
+                        src_lines = subs[i].content.split("\n")
+                        stores = masked[i][1]
+                        if j is None:
+                            out_lines[i] = (
+                                [unmask_tags(c, *stores[x]) for x, c in enumerate(outputs[n])]
+                                if outputs is not None else src_lines
+                            )
+                        else:
+                            out_lines[i][j] = unmask_tags(outputs[n][0], *stores[j]) if outputs is not None else src_lines[j]
+                        if outputs is None:
+                            failed.update(merged.get(i, [i]))
+                        remaining[i] -= 1
+                        if remaining[i] == 0:
+                            content = "\n".join(out_lines[i])
+                            if i not in merged:
+                                pieces = [(i, content)]
+                            elif i in failed:
+                                pieces = [(b, subs[b].content) for b in merged[i]]
+                            else:
+                                # kalimat utuh → potongan per blok asli; kata tidak cukup = blok tsb original
+                                group = merged[i]
+                                split = segmenter.redistribute(content, [subs[b] for b in group])
+                                failed.update(b for b, p in zip(group, split) if p is None)
+                                pieces = [(b, subs[b].content if p is None else p) for b, p in zip(group, split)]
+                            for b, text in pieces:
+                                sub = subs[b]
+                                results[b] = srt.Subtitle(index=sub.index, start=sub.start, end=sub.end, content=text)
+                                if journal is not None and b not in failed:
+                                    journal.append(keys[b], text)
+                                if on_result is not None:
+                                    on_result(b, results[b])
+                                finished += 1
+                if not finished:
+                    continue
+                done += finished
+                translated_now += finished
+                if on_progress is not None:
+                    on_progress(done, total, translated_now, results)
+    finally:
+        # rerun Streamlit / Ctrl+C: batalkan unit yang belum jalan, jangan tunggu yang sedang jalan
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            for fut in futures:
+                fut.cancel()
+
+    stats.incr("blocks_failed", len(failed))
+    return [results[i] for i in range(total)]
+
+def translate_multi(
+    client,
+    subs: List[srt.Subtitle],
+    model: str,
+    src: str,
+    tgts: List[str],
+    workers: int = 4,
+    executor: ThreadPoolExecutor = None,
+    reuse: Dict[str, Dict[int, srt.Subtitle]] = None,
+    on_progress: Callable = None,
+    on_result: Callable = None,
+    on_error: Callable = None,
+    **kw,
+) -> Dict[str, List[srt.Subtitle]]:
+    """Terjemahkan `subs` ke beberapa bahasa sekaligus; hasil {tgt: subtitle}.
+
+    File di-mask sekali, lalu semua pasangan bahasa × unit dijadwalkan ke SATU pool `workers` thread
+    (limiter, breaker, governor, telemetry, journal juga dibagi). Tiap bahasa tetap request sendiri
+    supaya validasi, TM & journal per bahasa tidak berubah. Callback mendapat `tgt` sebagai argumen
+    pertama dan dipanggil dari thread pengendali bahasa tsb (bukan thread pemanggil).
+    """
+    masked = mask_subtitles(subs)
+    pool = executor or ThreadPoolExecutor(max_workers=int(workers))
+
+    def _run(tgt: str) -> List[srt.Subtitle]:
+        def bind(cb):
+            return (lambda *a: cb(tgt, *a)) if cb is not None else None
+
+        return translate_subtitles(
+            client, subs, model, src, tgt, executor=pool, masked=masked, reuse=(reuse or {}).get(tgt),
+            on_progress=bind(on_progress), on_result=bind(on_result), on_error=bind(on_error), **kw,
+        )
+
+    drivers = ThreadPoolExecutor(max_workers=len(tgts), thread_name_prefix="subtitle-target")
+    try:
+        futures = {tgt: drivers.submit(_run, tgt) for tgt in tgts}
+        wait(futures.values())
+        # error pertama (mis. TranslationCancelled) diteruskan setelah semua bahasa berhenti
+        return {tgt: fut.result() for tgt, fut in futures.items()}
+    finally:
+        drivers.shutdown(wait=False)
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,152 @@
+# subtitle_translator/errors.py
+"""Klasifikasi error API (retry atau tidak, tunggu berapa lama) dan circuit breaker bersama antar worker."""
+import email.utils
+import random
+import threading
+import time
+from typing import NamedTuple, Optional
+
+try:
+    import openai
+except ImportError:  # core tetap bisa dipakai dengan client OpenAI-compatible lain
+    openai = None
+
+RETRYABLE_STATUS = {408, 409, 425, 500, 502, 503, 504, 520, 522, 524, 529}
+
+class StreamStalled(Exception):
+    """Streaming response berhenti mengirim token lebih lama dari stall timeout."""
+
+class TranslationCancelled(Exception):
+    """Run dihentikan lewat `cancel_event`; blok yang sudah selesai tetap tersimpan (journal / on_result)."""
+
+def is_timeout(err: Exception) -> bool:
+    # openai.APITimeoutError, httpx.ReadTimeout, dst. (dicek dari nama agar tidak bergantung versi httpx)
+    return isinstance(err, TimeoutError) or "timeout" in type(err).__name__.lower()
+
+class ErrorInfo(NamedTuple):
+    """Hasil `classify_error`: `kind` ∈ rate_limit / server / timeout / network / stall / fatal."""
+
+    kind: str
+    retryable: bool
+    status: Optional[int] = None
+    retry_after: Optional[float] = None  # detik, dari header server (bila ada)
+
+def _status(err: Exception) -> Optional[int]:
+    status = getattr(err, "status_code", None)
+    if status is None:
+        status = getattr(getattr(err, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def retry_after_seconds(err: Exception) -> Optional[float]:
+    """Baca `retry-after-ms` / `retry-after` (detik atau HTTP-date) dari response error."""
+    headers = getattr(getattr(err, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return max(0.0, float(ms) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def classify_error(err: Exception) -> ErrorInfo:
+    """Tentukan jenis error dari tipe exception OpenAI / status code, dengan fallback pesan teks."""
+    if isinstance(err, StreamStalled):
+        return ErrorInfo("stall", True)
+    status = _status(err)
+    retry_after = retry_after_seconds(err)
+    if (openai is not None and isinstance(err, openai.RateLimitError)) or status == 429:
+        return ErrorInfo("rate_limit", True, 429, retry_after)
+    if status is not None:
+        transient = status in RETRYABLE_STATUS or status >= 500
+        return ErrorInfo("server" if transient else "fatal", transient, status, retry_after)
+    if (openai is not None and isinstance(err, openai.APITimeoutError)) or is_timeout(err):
+        return ErrorInfo("timeout", True)
+    if (openai is not None and isinstance(err, openai.APIConnectionError)) or isinstance(err, ConnectionError):
+        return ErrorInfo("network", True)
+    # client non-OpenAI: pesan error saja yang bisa dibaca
+    s = str(err).lower()
+    if "rate limit" in s or "429" in s:
+        return ErrorInfo("rate_limit", True, 429)
+    return ErrorInfo("fatal", False, status)
+
+def retry_delay(info: ErrorInfo, attempt: int, backoff: float, max_wait: float = 120.0) -> float:
+    """Lama tunggu sebelum attempt berikutnya.
+
+    Retry-After dari server dipakai apa adanya; tanpa header → exponential backoff dengan jitter
+    (0.5–1.5×) supaya worker tidak retry serentak. Stream macet langsung diulang.
+    """
+    if info.kind == "stall":
+        return 0.0
+    if info.retry_after is not None:
+        return min(info.retry_after, max_wait)
+    return min(backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5), max_wait)
+
+class CircuitBreaker:
+    """Jeda SEMUA worker bersama-sama saat provider jelas kewalahan.
+
+    `threshold` error transient berturut-turut (429/5xx/timeout/network, tanpa sukses di antaranya)
+    membuka breaker selama `cooldown` detik (atau Retry-After terbesar yang terlihat). Setelah itu
+    half-open: request berikutnya boleh lewat; gagal lagi → buka ulang dengan cooldown 2× (maks
+    `max_cooldown`), sukses → tertutup kembali.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 10.0, max_cooldown: float = 120.0):
+        self.threshold = max(1, int(threshold))
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.trips = 0
+        self.open_s = 0.0
+        self._cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._half_open = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def wait(self) -> float:
+        """Dipanggil sebelum tiap request; blok selama breaker terbuka. Kembalikan lama jeda."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._open_until - time.monotonic()
+            if remaining <= 0:
+                return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._half_open = False
+            self._cooldown = self.base_cooldown
+
+    def record_failure(self, info: ErrorInfo) -> None:
+        if not info.retryable or info.kind == "stall":
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now < self._open_until:
+                return  # request yang sudah terkirim sebelum breaker terbuka
+            self._failures += 1
+            if self._failures < self.threshold and not self._half_open:
+                return
+            if self._half_open:
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+            duration = max(self._cooldown, info.retry_after or 0.0)
+            self._open_until = now + duration
+            self.open_s += duration
+            self._half_open = True
+            self._failures = 0
+            self.trips += 1
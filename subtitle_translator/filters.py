@@ -0,0 +1,107 @@
+# subtitle_translator/filters.py
+"""Pre-filter: blok yang tidak perlu diterjemahkan (♪, angka/timestamp, tag saja, nama speaker,
+sudah dalam bahasa target) langsung diteruskan apa adanya tanpa request ke model.
+
+Rule = `fn(teks, src, tgt) -> bool` atas 1 baris yang sudah di-mask (placeholder tag dibuang dulu).
+Blok dilewati hanya bila SEMUA barisnya cocok dengan salah satu rule.
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .core import PLACEHOLDER_RE
+
+MUSIC_RE = re.compile(r"^[\s♪♫♬♩#~*.,!?…\-–—]*[♪♫♬♩][\s♪♫♬♩#~*.,!?…\-–—]*$")
+NUMERIC_RE = re.compile(r"^[\s\d.,:;/%+\-–—()\[\]#'\"]*\d[\s\d.,:;/%+\-–—()\[\]#'\"]*$")
+SPEAKER_RE = re.compile(r"^[\s\-–—]*[\[(]?(?:[A-Z][\w'.\-]*\s?){1,3}\d*[\])]?:\s*$")
+
+# rentang Unicode per bahasa target yang memakai aksara non-Latin
+SCRIPTS = {
+    "ja": "぀-ヿ㐀-䶿一-鿿ｦ-ﾟ",
+    "zh": "㐀-䶿一-鿿",
+    "ko": "ᄀ-ᇿ㄰-㆏가-힯",
+    "ru": "Ѐ-ӿ",
+    "uk": "Ѐ-ӿ",
+    "bg": "Ѐ-ӿ",
+    "el": "Ͱ-Ͽ",
+    "he": "֐-׿",
+    "ar": "؀-ۿ",
+    "fa": "؀-ۿ",
+    "hi": "ऀ-ॿ",
+    "th": "฀-๿",
+}
+
+def _script(lang: str) -> Optional[str]:
+    return SCRIPTS.get(lang.lower().replace("_", "-").split("-")[0])
+
+def is_music(text: str, src: str, tgt: str) -> bool:
+    return bool(MUSIC_RE.match(text))
+
+def is_numeric(text: str, src: str, tgt: str) -> bool:
+    return bool(NUMERIC_RE.match(text))
+
+def is_tags_only(text: str, src: str, tgt: str) -> bool:
+    return not text.strip()
+
+def is_speaker(text: str, src: str, tgt: str) -> bool:
+    return bool(SPEAKER_RE.match(text))
+
+def is_target_language(text: str, src: str, tgt: str) -> bool:
+    """Semua huruf sudah beraksara bahasa target (hanya target non-Latin yang aksaranya beda dari sumber).
+
+    Bahasa berhuruf Latin tidak dideteksi: tanpa model bahasa, salah tebak = baris tidak diterjemahkan.
+    """
+    script = _script(tgt)
+    if script is None or script == _script(src):
+        return False
+    letters = [c for c in text if c.isalpha()]
+    return bool(letters) and all(re.match(f"[{script}]", c) for c in letters)
+
+RULES: Dict[str, Callable[[str, str, str], bool]] = {
+    "tags_only": is_tags_only,
+    "music": is_music,
+    "numeric": is_numeric,
+    "speaker": is_speaker,
+    "target_language": is_target_language,
+}
+
+class PassthroughFilter:
+    """Rule pre-filter yang dipakai engine (`translate_subtitles(prefilter=...)`) & `estimate_run`.
+
+    `rules`: nama dari `RULES` dan/atau pasangan `(nama, fn)` sendiri; default semua `RULES`.
+    Tanpa state selain daftar rule → aman dibagi antar thread / bahasa target; counter ada di `RunStats`.
+    """
+
+    def __init__(self, rules: Iterable[Union[str, Tuple[str, Callable]]] = None):
+        self.rules: List[Tuple[str, Callable]] = []
+        for rule in RULES if rules is None else rules:
+            if isinstance(rule, str):
+                self.add(rule, RULES[rule])
+            else:
+                self.add(*rule)
+
+    def add(self, name: str, fn: Callable[[str, str, str], bool]) -> "PassthroughFilter":
+        self.rules.append((name, fn))
+        return self
+
+    def classify(self, masked_lines: List[str], src: str, tgt: str) -> Optional[str]:
+        """Nama rule bila seluruh blok bisa diteruskan tanpa diterjemahkan; None = kirim ke model."""
+        matched = []
+        for line in masked_lines:
+            text = PLACEHOLDER_RE.sub("", line).strip()
+            name = next((n for n, fn in self.rules if fn(text, src, tgt)), None)
+            if name is None:
+                return None
+            matched.append(name)
+        # blok campuran (mis. tag saja + ♪) dihitung atas rule baris pertama yang berisi teks
+        return next((n for n in matched if n != "tags_only"), matched[0] if matched else "tags_only")
+
+    def split(self, masked: Dict[int, List[str]], pending: List[int], src: str, tgt: str):
+        """Pisahkan `pending` → (blok yang tetap dikirim, {blok: nama rule} yang diteruskan)."""
+        keep, skipped = [], {}
+        for i in pending:
+            name = self.classify(masked[i], src, tgt)
+            if name is None:
+                keep.append(i)
+            else:
+                skipped[i] = name
+        return keep, skipped
@@ -0,0 +1,170 @@
+# subtitle_translator/governor.py
+"""Governor rate limit bersama (requests/min + tokens/min) untuk semua job yang memakai API key yang sama.
+
+Di page dipegang `st.cache_resource` per (base URL, API key) sehingga semua sesi berbagi kuota;
+kapasitas dibagi adil (round-robin) antar job aktif, bukan siapa cepat dia dapat.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from .errors import TranslationCancelled
+
+WINDOW_S = 60.0
+
+class GovernorLease:
+    """Jatah satu job di `RateGovernor`; dipakai sebagai `governor=` di `chat_translate`."""
+
+    def __init__(self, governor: "RateGovernor", lease_id: int, name: str):
+        self.governor = governor
+        self.id = lease_id
+        self.name = name
+        self.granted = 0
+        self.last_grant = 0.0
+        self._tickets = deque()
+        self._grants = deque()  # (waktu, token) dalam WINDOW_S terakhir
+
+    def acquire(self, tokens: int = 0) -> float:
+        return self.governor.acquire(self, tokens)
+
+    def settle(self, tokens_delta: int) -> None:
+        self.governor.settle(self, tokens_delta)
+
+    def status(self) -> Dict:
+        return self.governor.status(self)
+
+    def close(self) -> None:
+        self.governor.release(self)
+
+class RateGovernor:
+    """Token bucket ganda (RPM & TPM) dengan antrian adil per lease.
+
+    Tiap request menunggu gilirannya: lease yang punya request menunggu dilayani bergiliran
+    (yang paling lama tidak dilayani lebih dulu), FIFO di dalam satu lease. Burst dibatasi 1/10
+    kuota per menit supaya request tersebar, bukan menumpuk di awal menit. 0 = tanpa batas.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._leases: Dict[int, GovernorLease] = {}
+        self.configure(rpm, tpm)
+
+    def configure(self, rpm: float, tpm: float) -> None:
+        """Ubah kuota (mis. dari konfigurasi); berlaku untuk semua job yang sedang antre."""
+        rpm, tpm = float(rpm or 0), float(tpm or 0)
+        with self._cond:
+            if getattr(self, "rpm", None) == rpm and getattr(self, "tpm", None) == tpm:
+                return
+            self.rpm, self.tpm = rpm, tpm
+            self._req_cap = max(1.0, self.rpm / 10)
+            self._tok_cap = max(1.0, self.tpm / 10)
+            self._req = self._req_cap
+            self._tok = self._tok_cap
+            self._updated = time.monotonic()
+            self._cond.notify_all()
+
+    def register(self, name: str) -> GovernorLease:
+        with self._cond:
+            lease = GovernorLease(self, next(self._ids), name)
+            self._leases[lease.id] = lease
+            return lease
+
+    def release(self, lease: GovernorLease) -> None:
+        with self._cond:
+            self._leases.pop(lease.id, None)
+            self._cond.notify_all()
+
+    # ── internal (dipanggil dengan self._cond terkunci)
+    def _refill(self, now: float) -> None:
+        dt = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._req = min(self._req_cap, self._req + dt * self.rpm / 60)
+        if self.tpm:
+            self._tok = min(self._tok_cap, self._tok + dt * self.tpm / 60)
+
+    def _waiting(self) -> List[GovernorLease]:
+        """Lease yang punya request menunggu, urut giliran."""
+        return sorted((l for l in self._leases.values() if l._tickets), key=lambda l: (l.last_grant, l.id))
+
+    def _wait_s(self, tokens: float) -> float:
+        wait = 0.0
+        if self.rpm and self._req < 1:
+            wait = max(wait, (1 - self._req) * 60 / self.rpm)
+        if self.tpm and self._tok < tokens:
+            wait = max(wait, (tokens - self._tok) * 60 / self.tpm)
+        return wait
+
+    def acquire(self, lease: GovernorLease, tokens: int = 0) -> float:
+        """Blok sampai giliran `lease` dan kuota cukup; kembalikan lama menunggu (detik)."""
+        started = time.monotonic()
+        cost = min(float(tokens), self._tok_cap)  # request > kapasitas burst tetap bisa lewat
+        ticket = object()
+        with self._cond:
+            lease._tickets.append(ticket)
+            try:
+                while True:
+                    if lease.id not in self._leases:
+                        # run sudah selesai / dibatalkan: request yang masih antre tidak perlu dikirim
+                        raise TranslationCancelled(f"lease {lease.name} sudah ditutup")
+                    now = time.monotonic()
+                    self._refill(now)
+                    timeout = 0.5
+                    waiting = self._waiting()
+                    if waiting and waiting[0] is lease and lease._tickets[0] is ticket:
+                        timeout = self._wait_s(cost)
+                        if timeout <= 0:
+                            if self.rpm:
+                                self._req -= 1
+                            if self.tpm:
+                                self._tok -= cost
+                            lease._tickets.popleft()
+                            lease.granted += 1
+                            lease.last_grant = now
+                            lease._grants.append((now, tokens))
+                            self._cond.notify_all()
+                            return now - started
+                    self._cond.wait(timeout=timeout)
+            except BaseException:
+                if ticket in lease._tickets:
+                    lease._tickets.remove(ticket)
+                self._cond.notify_all()
+                raise
+
+    def settle(self, lease: GovernorLease, tokens_delta: int) -> None:
+        """Koreksi TPM setelah usage asli diketahui (`tokens_delta` = aktual − estimasi)."""
+        if not tokens_delta:
+            return
+        with self._cond:
+            if self.tpm:
+                self._tok = min(self._tok_cap, self._tok - tokens_delta)  # boleh minus: utang ke menit berikutnya
+            if lease._grants:
+                ts, tok = lease._grants[-1]
+                lease._grants[-1] = (ts, tok + tokens_delta)
+
+    def status(self, lease: Optional[GovernorLease] = None) -> Dict:
+        """Ringkasan untuk UI: job aktif, posisi antrian & jatah kapasitas `lease` dalam 60 detik terakhir."""
+        with self._cond:
+            now = time.monotonic()
+            for l in self._leases.values():
+                while l._grants and now - l._grants[0][0] > WINDOW_S:
+                    l._grants.popleft()
+            active = [l for l in self._leases.values() if l._tickets or l._grants]
+            total = sum(len(l._grants) for l in active)
+            waiting = self._waiting()
+            out = {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "active_jobs": len(active),
+                "waiting_requests": sum(len(l._tickets) for l in waiting),
+                "requests_last_min": total,
+                "tokens_last_min": int(sum(t for l in active for _, t in l._grants)),
+            }
+            if lease is not None:
+                out["queue_position"] = waiting.index(lease) + 1 if lease in waiting else 0
+                out["share"] = len(lease._grants) / total if total else 0.0
+                out["fair_share"] = 1 / len(active) if active else 1.0
+            return out
@@ -0,0 +1,126 @@
+# subtitle_translator/hedge.py
+"""Hedged request: request yang sudah lebih lama dari persentil latency terbaru dikirim sekali lagi,
+hasil yang datang duluan dipakai. Memangkas ekor latency (blok 30–60 detik) dengan biaya terbatas.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+from .telemetry import percentile
+
+class Hedger:
+    """Dibagi semua worker satu run (seperti `CircuitBreaker`).
+
+    Request pertama selalu dikirim; bila belum selesai setelah persentil `pct` dari `window` latency
+    sukses terakhir (min. `min_delay` detik, baru aktif setelah `min_samples` sampel), duplikat dikirim
+    — lewat `PooledClient` otomatis ke endpoint dengan beban terendah, jadi biasanya endpoint lain.
+    Jumlah duplikat dibatasi `max_ratio` × request. Request yang kalah tidak bisa dibatalkan (client
+    sync) dan tetap ditagih; hasilnya dibuang.
+    """
+
+    def __init__(
+        self,
+        pct: float = 95.0,
+        max_ratio: float = 0.1,
+        min_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        max_threads: int = 32,
+    ):
+        self.pct = pct
+        self.max_ratio = max_ratio
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+        self.skipped = 0  # request lambat yang tidak di-hedge karena batas `max_ratio`
+        self.saved_s = 0.0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="subtitle-hedge")
+
+    def delay(self) -> Optional[float]:
+        """Ambang hedge saat ini (detik); None bila sampel latency belum cukup."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return max(self.min_delay, percentile(list(self._latencies), self.pct))
+
+    def _observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _timed(self, fn: Callable, hedge: bool, ctx):
+        if ctx is not None:
+            ctx[0].adopt(ctx[1], hedge=hedge)
+        started = time.monotonic()
+        result = fn(hedge)
+        self._observe(time.monotonic() - started)
+        return result
+
+    def run(self, fn: Callable, telemetry=None):
+        """Jalankan `fn(hedge: bool)` (1 attempt, tanpa retry) dengan hedging; error dilempar bila semua gagal."""
+        delay = self.delay()
+        with self._lock:
+            self.requests += 1
+        if delay is None:
+            started = time.monotonic()
+            result = fn(False)
+            self._observe(time.monotonic() - started)
+            return result
+
+        ctx = (telemetry, telemetry.context()) if telemetry is not None else None
+        primary = self._pool.submit(self._timed, fn, False, ctx)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        with self._lock:
+            allowed = self.hedges + 1 <= self.max_ratio * self.requests
+            if allowed:
+                self.hedges += 1
+            else:
+                self.skipped += 1
+        if not allowed:
+            return primary.result()
+
+        hedge = self._pool.submit(self._timed, fn, True, ctx)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is not None:
+                    # error request utama yang dilempar bila keduanya gagal (itu yang di-retry)
+                    error = fut.exception() if fut is primary or error is None else error
+                    continue
+                if fut is hedge:
+                    won_at = time.monotonic()
+                    with self._lock:
+                        self.wins += 1
+                    primary.add_done_callback(lambda f: self._credit(f, won_at))
+                return fut.result()
+        raise error
+
+    def _credit(self, primary, won_at: float) -> None:
+        # hemat = kapan request utama akhirnya selesai − kapan hedge menang (request utama yang gagal tidak dihitung)
+        if primary.exception() is None:
+            with self._lock:
+                self.saved_s += time.monotonic() - won_at
+
+    def close(self) -> None:
+        """Lepas thread hedge setelah run selesai (request yang kalah dibiarkan selesai sendiri)."""
+        self._pool.shutdown(wait=False)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.wins,
+                "hedge_skipped": self.skipped,
+                "hedge_rate": round(self.hedges / self.requests, 3) if self.requests else 0.0,
+                "latency_saved_s": round(self.saved_s, 1),
+            }
@@ -0,0 +1,345 @@
+# subtitle_translator/jobs.py
+"""Job runner background: terjemahan berjalan di thread sendiri, lepas dari rerun / navigasi Streamlit.
+
+`JobManager` dipegang `st.cache_resource` (1 per proses) sehingga job tetap jalan walau widget
+berubah, pindah page, atau websocket putus; page cukup polling status `Job`.
+"""
+import csv
+import io
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import srt
+
+from .core import RunStats
+from .engine import translate_multi
+from .errors import CircuitBreaker, TranslationCancelled
+from .governor import GovernorLease, RateGovernor
+from .hedge import Hedger
+from .srtio import SrtWriter
+from .telemetry import Telemetry
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = {QUEUED, RUNNING}
+PAIR_FIELDS = ["No.", "From", "To", "Original Text", "Translated Text"]
+
+class Job:
+    """Satu file .srt yang diterjemahkan di background ke 1+ bahasa target (`targets`).
+
+    Dibaca page dari thread lain → pakai `snapshot()`. Progress dihitung per pasangan bahasa × blok.
+    Payload download (.srt, .zip, tabel/CSV pasangan) dibangun sekali setelah job selesai lalu di-cache,
+    jadi rerun page (slider, pindah halaman tabel) tidak menyusunnya ulang.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        name: str,
+        client,
+        subs: List[srt.Subtitle],
+        run_kw: Dict,
+        breaker_kw: Dict = None,
+        governor: RateGovernor = None,
+        hedge_kw: Dict = None,
+        owner: str = None,
+    ):
+        self.id = job_id
+        self.name = name
+        self.owner = owner
+        self.client = client
+        self.subs = subs
+        self.run_kw = run_kw
+        self.breaker_kw = breaker_kw or {}
+        self.governor = governor
+        self.hedge_kw = hedge_kw
+        self.lease: Optional[GovernorLease] = None
+        self.targets: List[str] = list(run_kw.pop("tgts", None) or [run_kw.pop("tgt", "id")])
+        self.total = len(subs) * len(self.targets)
+        self.status = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.error: Optional[str] = None
+        self.runs = 0
+        self.done = 0
+        self.translated_now = 0
+        self.warnings: List[str] = []
+        self.live = deque(maxlen=8)
+        self.failed = set()  # (tgt, index blok)
+        self._reuse: Dict[str, Dict[int, srt.Subtitle]] = {}
+        self._progress: Dict[str, tuple] = {}
+        self._reset_run()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future = None
+
+    def _reset_run(self) -> None:
+        self.stats = RunStats()
+        self.telemetry = Telemetry()
+        self.breaker = CircuitBreaker(**self.breaker_kw)
+        self.hedger = Hedger(**self.hedge_kw) if self.hedge_kw is not None else None
+        self.writers = {tgt: SrtWriter() for tgt in self.targets}
+        self._exports: Dict[tuple, object] = {}
+
+    # ── callback engine (dipanggil dari thread pengendali tiap bahasa)
+    def _on_progress(self, tgt, done, total, translated_now, results):
+        with self._lock:
+            self._progress[tgt] = (done, translated_now)
+            self.done = sum(d for d, _ in self._progress.values())
+            self.translated_now = sum(t for _, t in self._progress.values())
+
+    def _on_result(self, tgt, i, sub):
+        # writer = satu-satunya penyimpan hasil (buffer spooled, pindah ke disk bila besar)
+        with self._lock:
+            self.writers[tgt].add(i, sub)
+
+    def _on_error(self, tgt, blocks, exc):
+        self.failed.update((tgt, b) for b in blocks)
+        label = f"{blocks[0] + 1}" if len(blocks) == 1 else f"{blocks[0] + 1}-{blocks[-1] + 1}"
+        prefix = f"{tgt} " if len(self.targets) > 1 else ""
+        self.warnings.append(f"[{prefix}{label}] error: {exc} — blok dipertahankan (original).")
+
+    def _on_line(self, line):
+        self.live.append(re.sub(r"^<<[^>]*>>\s?", "", line))
+
+    # ── dibaca dari page
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def eta(self) -> Optional[float]:
+        if self.status != RUNNING or not self.translated_now or not self.started:
+            return None
+        return (time.time() - self.started) / self.translated_now * (self.total - self.done)
+
+    def governor_status(self) -> Optional[Dict]:
+        """Posisi antrian & jatah kapasitas job ini di governor bersama (None bila tidak dipakai)."""
+        lease = self.lease
+        return lease.status() if lease is not None else None
+
+    def snapshot(self) -> Dict:
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        gov = self.governor_status() if self.status == RUNNING else None
+        return {
+            "ID": self.id,
+            "File": self.name,
+            "Target": ", ".join(self.targets),
+            "Status": self.status,
+            "Progress": self.done / self.total if self.total else 1.0,
+            "Blocks": f"{self.done}/{self.total}",
+            "Blok/s": round(self.translated_now / elapsed, 2) if elapsed else 0.0,
+            "ETA (s)": int(self.eta()) if self.eta() is not None else None,
+            "Gagal": len(self.failed),
+            "Baris gagal": self.stats.get("repair_failed"),
+            "Elapsed (s)": int(elapsed),
+            "Antrian": gov["queue_position"] if gov else None,
+            "Jatah": round(gov["share"], 2) if gov else None,
+        }
+
+    def translated(self, tgt: str = None) -> List[srt.Subtitle]:
+        """Hasil per blok sesuai urutan sumber (default bahasa target pertama); blok yang belum selesai = original."""
+        with self._lock:
+            results = dict(self.writers[tgt or self.targets[0]].items())
+        return [results.get(i, sub) for i, sub in enumerate(self.subs)]
+
+    def _cached(self, key: tuple, build: Callable):
+        """Hasil `build()` di-cache per `key` setelah job done (hasil tidak berubah lagi); sebelum itu selalu dibangun ulang."""
+        if self.status != DONE:
+            return build()
+        with self._lock:
+            value = self._exports.get(key)
+        if value is None:
+            value = build()
+            with self._lock:
+                self._exports[key] = value
+        return value
+
+    def output(self, tgt: str = None) -> bytes:
+        """.srt lengkap (status done) atau checkpoint parsial (blok belum selesai = original)."""
+        tgt = tgt or self.targets[0]
+        writer = self.writers[tgt]
+
+        def _build():
+            with self._lock:
+                return writer.getvalue() if self.status == DONE else writer.partial(self.subs)
+
+        return self._cached(("srt", tgt), _build)
+
+    def output_zip(self, stem: str, partial: bool = False) -> bytes:
+        """Semua bahasa dalam 1 .zip: `<stem>.<tgt>.srt` (atau `<stem>.partial.<tgt>.srt`)."""
+
+        def _build():
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+                for tgt in self.targets:
+                    zf.writestr(f"{stem}.partial.{tgt}.srt" if partial else f"{stem}.{tgt}.srt", self.output(tgt))
+            return buf.getvalue()
+
+        return self._cached(("zip", stem, partial), _build)
+
+    def pairs(self, tgt: str = None) -> List[Dict]:
+        """Baris tabel Original vs Translated (kolom `PAIR_FIELDS`), 1 per blok."""
+        tgt = tgt or self.targets[0]
+        return self._cached(("pairs", tgt), lambda: [
+            {
+                "No.": i,
+                "From": srt.timedelta_to_srt_timestamp(src.start),
+                "To": srt.timedelta_to_srt_timestamp(src.end),
+                "Original Text": src.content.replace("\n", " "),
+                "Translated Text": dst.content.replace("\n", " "),
+            }
+            for i, (src, dst) in enumerate(zip(self.subs, self.translated(tgt)), start=1)
+        ])
+
+    def pairs_csv(self, tgt: str = None) -> bytes:
+        """`pairs()` sebagai CSV UTF-8 (payload tombol download)."""
+        tgt = tgt or self.targets[0]
+
+        def _build():
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=PAIR_FIELDS, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(self.pairs(tgt))
+            return buf.getvalue().encode("utf-8")
+
+        return self._cached(("csv", tgt), _build)
+
+class JobManager:
+    """Antrian job: `max_jobs` file diterjemahkan bersamaan, sisanya menunggu (status queued).
+
+    Job milik 1 `owner` (id sesi browser): `list`/`get`/`cancel`/... hanya melihat job owner tsb
+    (`owner=None` = semua job). Job yang sudah selesai (done/failed/cancelled) dibuang setelah
+    `retention_s` detik, dan maks. `max_finished` job selesai per owner yang disimpan.
+    """
+
+    def __init__(self, max_jobs: int = 2, retention_s: float = 3600.0, max_finished: int = 20):
+        self.max_jobs = max_jobs
+        self.retention_s = retention_s
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="subtitle-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        name: str,
+        client,
+        subs: List[srt.Subtitle],
+        breaker_kw: Dict = None,
+        governor: RateGovernor = None,
+        hedge_kw: Dict = None,
+        owner: str = None,
+        **run_kw,
+    ) -> Job:
+        """Antrikan 1 file; `run_kw` diteruskan ke `translate_multi` (model, src, mode, ...).
+
+        Bahasa target: `tgt="id"` atau `tgts=["id", "ms", "en"]` (1 job, file di-mask sekali, 1 pool worker).
+
+        Dengan `governor`, job mendaftar sebagai lease selama berjalan → kuota RPM/TPM dibagi adil.
+        `hedge_kw` (argumen `Hedger`) mengaktifkan hedged request; None = tanpa hedging.
+        """
+        job = Job(uuid.uuid4().hex[:8], name, client, subs, run_kw, breaker_kw, governor, hedge_kw, owner)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job._future = self._pool.submit(self._run, job)
+        return job
+
+    def _prune(self) -> None:
+        # dipanggil dengan _lock: buang job selesai yang lewat retensi / melebihi jatah per owner
+        now = time.time()
+        finished: Dict[Optional[str], List[Job]] = {}
+        for job in self._jobs.values():
+            if not job.active:
+                finished.setdefault(job.owner, []).append(job)
+        for owned in finished.values():
+            expired = [j for j in owned if now - (j.finished or j.created) > self.retention_s]
+            keep = [j for j in owned if j not in expired]
+            for job in expired + keep[:max(0, len(keep) - self.max_finished)]:
+                del self._jobs[job.id]
+
+    def get(self, job_id: str, owner: str = None) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return job if job is not None and (owner is None or job.owner == owner) else None
+
+    def list(self, owner: str = None) -> List[Job]:
+        with self._lock:
+            self._prune()
+            return [j for j in self._jobs.values() if owner is None or j.owner == owner]
+
+    def cancel(self, job_id: str, owner: str = None) -> None:
+        job = self.get(job_id, owner)
+        if job is None or not job.active:
+            return
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.status, job.finished = CANCELLED, time.time()
+
+    def resume(self, job_id: str, owner: str = None) -> Optional[Job]:
+        """Lanjutkan job cancelled/failed: blok yang sudah berhasil dipakai ulang, sisanya dikirim lagi."""
+        job = self.get(job_id, owner)
+        if job is None or job.status not in (CANCELLED, FAILED):
+            return job
+        with job._lock:
+            job._reuse = {
+                tgt: {i: sub for i, sub in writer.items() if (tgt, i) not in job.failed}
+                for tgt, writer in job.writers.items()
+            }
+            job.failed = set()
+            job._progress = {}
+            job._reset_run()
+        job._cancel.clear()
+        job.status, job.error, job.finished = QUEUED, None, None
+        job._future = self._pool.submit(self._run, job)
+        return job
+
+    def remove(self, job_id: str, owner: str = None) -> None:
+        with self._lock:
+            job = self.get(job_id, owner)
+            if job is not None and not job.active:
+                del self._jobs[job_id]
+
+    def clear_finished(self, owner: str = None) -> None:
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if not j.active and (owner is None or j.owner == owner)]:
+                del self._jobs[job_id]
+
+    def _run(self, job: Job) -> None:
+        if job._cancel.is_set():
+            job.status, job.finished = CANCELLED, time.time()
+            return
+        job.status, job.started, job.runs = RUNNING, time.time(), job.runs + 1
+        kw = dict(job.run_kw)
+        # `reuse` dari pemanggil (resume dari file output lama) berlaku untuk bahasa target pertama
+        reuse = {tgt: dict(job._reuse.get(tgt, {})) for tgt in job.targets}
+        reuse[job.targets[0]] = {**(kw.pop("reuse", None) or {}), **reuse[job.targets[0]]}
+        status = FAILED
+        if job.governor is not None:
+            job.lease = job.governor.register(f"{job.id} {job.name}")
+        try:
+            translate_multi(
+                job.client, job.subs, tgts=job.targets, reuse=reuse, stats=job.stats, telemetry=job.telemetry, breaker=job.breaker,
+                governor=job.lease, hedger=job.hedger,
+                on_progress=job._on_progress, on_result=job._on_result, on_error=job._on_error, on_line=job._on_line,
+                cancel_event=job._cancel, **kw,
+            )
+            status = DONE
+        except TranslationCancelled:
+            status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            # finished diisi dulu: page yang melihat status akhir selalu mendapat waktu selesai
+            if job.lease is not None:
+                job.lease.close()
+                job.lease = None
+            if job.hedger is not None:
+                job.hedger.close()
+            job.finished = time.time()
+            job.status = status
@@ -0,0 +1,221 @@
+# subtitle_translator/pool.py
+"""Pool beberapa endpoint / API key OpenAI-compatible dengan dispatcher per request.
+
+`PooledClient` meniru `client.chat.completions.create(...)`, jadi bisa dipakai di mana pun `client`
+biasa dipakai (core, engine, job, CLI). Tiap request diarahkan ke endpoint sehat dengan skor
+terbaik (latency terukur × beban, sisa kuota RPM); 429 / error transient langsung dialihkan ke
+endpoint lain sebelum dikembalikan ke lapisan retry.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from .clients import make_client
+from .errors import classify_error
+
+class Endpoint:
+    """1 base URL + API key (+ model opsional). Statistik diperbarui dari thread worker."""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str = "", rpm: float = 0):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.rpm = float(rpm or 0)
+        self.latency = None  # EWMA detik
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0  # error transient berturut-turut
+        self.down_until = 0.0
+        self.cooldown = 0.0
+        self.disabled: Optional[str] = None
+        self._recent = deque()
+        self._client = None
+
+    @property
+    def fingerprint(self) -> str:
+        return hashlib.sha256(f"{self.base_url}|{self.api_key}".encode("utf-8")).hexdigest()[:12]
+
+    def used_last_min(self, now: float) -> int:
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        return len(self._recent)
+
+    def healthy(self, now: float) -> bool:
+        return self.disabled is None and now >= self.down_until
+
+def parse_endpoints(text: str, secrets: Dict = None) -> List[Endpoint]:
+    """Parse konfigurasi pool, 1 endpoint per baris: `nama | base_url | api_key | model | rpm`.
+
+    `model` & `rpm` opsional. API key boleh berupa referensi `$NAMA` → diambil dari `secrets`
+    (mis. `st.secrets`) lalu environment. Baris kosong / diawali `#` diabaikan.
+    """
+    secrets = secrets or {}
+    endpoints = []
+    for n, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) < 3:
+            raise ValueError(f"baris {n}: format `nama | base_url | api_key | model | rpm`")
+        name, base_url, key = parts[:3]
+        model = parts[3] if len(parts) > 3 else ""
+        rpm = float(parts[4]) if len(parts) > 4 and parts[4] else 0
+        if key.startswith("$"):
+            key = secrets.get(key[1:]) or os.getenv(key[1:], "")
+            if not key:
+                raise ValueError(f"baris {n}: secret {parts[2]} tidak ditemukan")
+        endpoints.append(Endpoint(name or f"ep{n}", base_url, key, model, rpm))
+    return endpoints
+
+class EndpointPool:
+    """Kumpulan `Endpoint` bersama (dipakai banyak job/sesi) + pemilihan endpoint.
+
+    Skor = latency EWMA × (1 + request in-flight); endpoint yang kuota RPM-nya habis dalam 60 detik
+    terakhir dilewati selama masih ada yang lain. `unhealthy_after` error transient berturut-turut →
+    endpoint istirahat `cooldown` detik (berlipat bila gagal lagi); 401/403/404 → dinonaktifkan.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        client_factory: Callable = None,
+        unhealthy_after: int = 3,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0,
+    ):
+        if not endpoints:
+            raise ValueError("pool endpoint kosong")
+        self.endpoints = endpoints
+        self.client_factory = client_factory
+        self.unhealthy_after = unhealthy_after
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+
+    def client_for(self, ep: Endpoint):
+        with self._lock:
+            if ep._client is None:
+                factory = self.client_factory or make_client
+                ep._client = factory(ep.base_url, ep.api_key)
+            return ep._client
+
+    def models(self) -> List[str]:
+        return sorted({ep.model for ep in self.endpoints if ep.model})
+
+    def acquire(self, model: str = None, exclude=()) -> Optional[Endpoint]:
+        """Pilih endpoint terbaik (dan tandai in-flight); `model` = hanya endpoint yang melayani model itu."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                ep for ep in self.endpoints
+                if ep.disabled is None and ep not in exclude and (not model or not ep.model or ep.model == model)
+            ]
+            if not candidates:
+                return None
+            healthy = [ep for ep in candidates if ep.healthy(now)] or [min(candidates, key=lambda ep: ep.down_until)]
+            in_budget = [ep for ep in healthy if not ep.rpm or ep.used_last_min(now) < ep.rpm] or healthy
+            known = [ep.latency for ep in in_budget if ep.latency is not None]
+            default = min(known) if known else 1.0  # endpoint baru dicoba dulu dengan latency terbaik
+            ep = min(in_budget, key=lambda e: (e.latency if e.latency is not None else default) * (1 + e.inflight))
+            ep.inflight += 1
+            ep.requests += 1
+            ep._recent.append(now)
+            return ep
+
+    def report(self, ep: Endpoint, latency: float = None, error: Exception = None) -> None:
+        with self._lock:
+            ep.inflight -= 1
+            if error is None:
+                ep.latency = latency if ep.latency is None else 0.8 * ep.latency + 0.2 * latency
+                ep.failures = 0
+                ep.cooldown = 0.0
+                return
+            ep.errors += 1
+            info = classify_error(error)
+            if info.kind == "fatal":
+                if info.status in (401, 403, 404):
+                    ep.disabled = f"HTTP {info.status}"
+                return
+            if info.kind == "rate_limit":
+                # kuota key ini habis: istirahatkan sesuai Retry-After, jangan dianggap rusak
+                ep.down_until = max(ep.down_until, time.monotonic() + (info.retry_after or 5.0))
+                return
+            ep.failures += 1
+            if ep.failures >= self.unhealthy_after:
+                ep.cooldown = min(max(self.base_cooldown, ep.cooldown * 2), self.max_cooldown)
+                ep.down_until = time.monotonic() + ep.cooldown
+                ep.failures = 0
+
+    def status(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "Endpoint": ep.name,
+                    "Model": ep.model or "-",
+                    "Status": ep.disabled or ("ok" if ep.healthy(now) else f"istirahat {ep.down_until - now:.0f}s"),
+                    "Latency (s)": round(ep.latency, 2) if ep.latency is not None else None,
+                    "In-flight": ep.inflight,
+                    "Req/min": ep.used_last_min(now),
+                    "RPM": int(ep.rpm) or None,
+                    "Requests": ep.requests,
+                    "Errors": ep.errors,
+                }
+                for ep in self.endpoints
+            ]
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, **kw):
+        return self._owner._create(**kw)
+
+class ChatShim:
+    """Atribut `.chat` untuk client tiruan: `chat.completions.create(**kw)` → `owner._create(**kw)`."""
+
+    def __init__(self, owner):
+        self.completions = _Completions(owner)
+
+class PooledClient:
+    """Pengganti `OpenAI` client yang membagi request ke `EndpointPool`.
+
+    `pin_model`: semua request job ini hanya ke endpoint dengan model tsb (konsistensi terjemahan);
+    tanpa pin, endpoint yang punya model sendiri (mis. server lokal) memakai modelnya sendiri.
+    """
+
+    def __init__(self, pool: EndpointPool, pin_model: str = None):
+        self.pool = pool
+        self.pin_model = pin_model
+        self.chat = ChatShim(self)
+
+    def _create(self, **kw):
+        tried, last_error = [], None
+        while True:
+            ep = self.pool.acquire(self.pin_model, exclude=tried)
+            if ep is None:
+                if last_error is not None:
+                    raise last_error
+                raise RuntimeError(f"tidak ada endpoint untuk model {self.pin_model!r}")
+            tried.append(ep)
+            params = dict(kw)
+            if ep.model and not self.pin_model:
+                params["model"] = ep.model
+            started = time.monotonic()
+            try:
+                resp = self.pool.client_for(ep).chat.completions.create(**params)
+            except Exception as e:
+                self.pool.report(ep, error=e)
+                info = classify_error(e)
+                if not info.retryable or info.kind == "stall":
+                    raise
+                last_error = e  # failover: coba endpoint lain dulu sebelum lapisan retry menunggu
+                continue
+            self.pool.report(ep, latency=time.monotonic() - started)
+            return resp
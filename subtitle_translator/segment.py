@@ -0,0 +1,155 @@
+# subtitle_translator/segment.py
+"""Segmentasi kalimat: blok berurutan yang melanjutkan kalimat yang sama digabung jadi 1 unit terjemahan,
+lalu hasilnya dibagi lagi ke blok aslinya (proporsional panjang teks / durasi). Timestamp tidak berubah.
+
+Lebih sedikit request, dan model melihat kalimat utuh (tata bahasa hasil lebih baik daripada potongan).
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+import srt
+
+SENTENCE_END_RE = re.compile(r"[.!?。！？…\"”’»)\]♪]$")
+ELLIPSIS_END_RE = re.compile(r"(?:\.\.\.|…)$")
+ELLIPSIS_START_RE = re.compile(r"^(?:\.\.\.|…)")
+DIALOG_RE = re.compile(r"^\s*[-–—]")
+CLAUSE_END_RE = re.compile(r"[,;:，、]$")
+
+class Segmenter:
+    """Aturan penggabungan blok (dipakai engine: `translate_subtitles(segmenter=...)` & `estimate_run`).
+
+    Blok i digabung dengan i+1 bila: teks i belum diakhiri tanda akhir kalimat (atau diakhiri "..."
+    dan i+1 diawali "..."), jeda waktu ≤ `max_gap` detik, keduanya tanpa tag & bukan dialog ("- ..."),
+    dan unit belum melewati `max_blocks` blok / `max_chars` karakter. `by`: dasar pembagian hasil
+    ke blok asli — "length" (panjang teks sumber) atau "duration".
+    """
+
+    def __init__(self, max_gap: float = 1.0, max_blocks: int = 4, max_chars: int = 300, by: str = "length"):
+        if by not in ("length", "duration"):
+            raise ValueError(f"by harus 'length' atau 'duration', bukan {by!r}")
+        self.max_gap = max_gap
+        self.max_blocks = max_blocks
+        self.max_chars = max_chars
+        self.by = by
+
+    def config(self) -> tuple:
+        """Setting yang menentukan hasil (untuk key journal: `core.settings_key`)."""
+        return (self.max_gap, self.max_blocks, self.max_chars, self.by)
+
+    @staticmethod
+    def _mergeable(lines: List[str], stores) -> bool:
+        text = " ".join(lines).strip()
+        has_tags = any(h or a for h, a in stores)
+        return bool(text) and not has_tags and not any(DIALOG_RE.match(line) for line in lines)
+
+    def _continues(self, prev: srt.Subtitle, prev_text: str, nxt: srt.Subtitle, next_text: str) -> bool:
+        if (nxt.start - prev.end).total_seconds() > self.max_gap:
+            return False
+        if ELLIPSIS_END_RE.search(prev_text):
+            return bool(ELLIPSIS_START_RE.match(next_text))
+        return not SENTENCE_END_RE.search(prev_text)
+
+    def groups(self, subs: List[srt.Subtitle], masked: Dict[int, tuple], pending: List[int]) -> List[List[int]]:
+        """Kelompokkan blok `pending` (urut) → [[i], [j, j+1, ...], ...]; hanya blok bersebelahan yang digabung."""
+        groups: List[List[int]] = []
+        texts = {i: " ".join(masked[i][0]).strip() for i in pending}
+        for i in pending:
+            cur = groups[-1] if groups else None
+            if (
+                cur is not None
+                and cur[-1] == i - 1
+                and len(cur) < self.max_blocks
+                and all(self._mergeable(*masked[k]) for k in (cur[-1], i))
+                and sum(len(texts[k]) for k in cur) + len(texts[i]) <= self.max_chars
+                and self._continues(subs[cur[-1]], texts[cur[-1]], subs[i], texts[i])
+            ):
+                cur.append(i)
+            else:
+                groups.append([i])
+        return groups
+
+    def apply(self, subs: List[srt.Subtitle], masked: Dict[int, tuple], pending: List[int]):
+        """→ (masked baru, pending baru = blok pertama tiap unit, {blok pertama: semua blok unit gabungan})."""
+        merged = {g[0]: g for g in self.groups(subs, masked, pending) if len(g) > 1}
+        members = {i for g in merged.values() for i in g[1:]}
+        pending = [i for i in pending if i not in members]
+        return {i: self.merge(masked, merged[i]) if i in merged else masked[i] for i in pending}, pending, merged
+
+    @staticmethod
+    def join(texts: List[str]) -> str:
+        """Gabung potongan kalimat; elipsis penyambung ("pergi..." + "...ke pasar") dibuang."""
+        out = texts[0]
+        for text in texts[1:]:
+            if ELLIPSIS_END_RE.search(out) and ELLIPSIS_START_RE.match(text):
+                out = ELLIPSIS_END_RE.sub("", out).rstrip()
+                text = ELLIPSIS_START_RE.sub("", text).lstrip()
+            out = f"{out} {text}"
+        return out
+
+    def merge(self, masked: Dict[int, tuple], group: List[int]) -> Tuple[List[str], list]:
+        """Entry `masked` untuk 1 unit gabungan: 1 baris berisi kalimat utuh (blok yang digabung tanpa tag)."""
+        return [self.join([" ".join(masked[i][0]).strip() for i in group])], [([], [])]
+
+    def weights(self, subs: List[srt.Subtitle]) -> List[float]:
+        if self.by == "duration":
+            w = [max(0.0, (s.end - s.start).total_seconds()) for s in subs]
+        else:
+            w = [float(len(s.content.replace("\n", " "))) for s in subs]
+        total = sum(w)
+        return [x / total for x in w] if total else [1 / len(subs)] * len(subs)
+
+    def redistribute(self, text: str, subs: List[srt.Subtitle]) -> List[Optional[str]]:
+        """Bagi terjemahan `text` ke `subs` sesuai bobot, dipotong di batas kata (utamakan setelah tanda baca).
+
+        Jumlah baris tiap potongan mengikuti blok aslinya. None = kata tidak cukup untuk blok tsb
+        (pemanggil mempertahankan teks original blok itu).
+        """
+        words = text.split()
+        n = len(subs)
+        if len(words) < n:
+            return [text] + [None] * (n - 1) if words else [None] * n
+        # posisi karakter akhir tiap kata → potong di kata yang paling dekat dengan target proporsional
+        ends, pos = [], 0
+        for w in words:
+            pos += len(w) + (1 if pos else 0)
+            ends.append(pos)
+        cuts, acc = [], 0.0
+        for k, weight in enumerate(self.weights(subs)[:-1]):
+            acc += weight
+            target = acc * pos
+            lo = cuts[-1] + 1 if cuts else 1
+            hi = len(words) - (n - 1 - k)  # sisakan min. 1 kata untuk tiap blok berikutnya
+            # potongan setelah koma / titik dua lebih disukai (jarak dianggap 40% lebih dekat)
+            cuts.append(min(
+                range(lo, hi + 1),
+                key=lambda c: abs(ends[c - 1] - target) * (0.6 if CLAUSE_END_RE.search(words[c - 1]) else 1.0),
+            ))
+        bounds = [0] + cuts + [len(words)]
+        pieces = [self._wrap(words[a:b], s.content.count("\n") + 1) for (a, b), s in zip(zip(bounds, bounds[1:]), subs)]
+        # elipsis penyambung yang dibuang `join` dipasang lagi di potongan yang sesuai
+        for k, sub in enumerate(subs):
+            end = ELLIPSIS_END_RE.search(sub.content.strip())
+            if end and k + 1 < n and not ELLIPSIS_END_RE.search(pieces[k]):
+                pieces[k] += end.group(0)
+            start = ELLIPSIS_START_RE.match(sub.content.strip())
+            if start and k > 0 and not ELLIPSIS_START_RE.match(pieces[k]):
+                pieces[k] = start.group(0) + pieces[k]
+        return pieces
+
+    @staticmethod
+    def _wrap(words: List[str], lines: int) -> str:
+        """Susun kata jadi `lines` baris seimbang (maks. sebanyak kata)."""
+        lines = max(1, min(lines, len(words)))
+        if lines == 1:
+            return " ".join(words)
+        total = sum(len(w) for w in words) + len(words) - 1
+        out, current, used = [], [], 0
+        for w in words:
+            remaining_lines = lines - len(out)
+            if current and remaining_lines > 1 and used + len(w) / 2 > total / lines:
+                out.append(" ".join(current))
+                current, used = [], 0
+            current.append(w)
+            used += len(w) + 1
+        out.append(" ".join(current))
+        return "\n".join(out)
@@ -0,0 +1,98 @@
+# subtitle_translator/srtio.py
+"""I/O .srt bertahap: parse blok demi blok dari buffer, dan tulis hasil terjemahan sekali (append) per blok."""
+import io
+import tempfile
+from typing import Dict, Iterator, List, Tuple
+
+import srt
+
+def _is_header(lines: List[str]) -> bool:
+    return len(lines) >= 2 and lines[0].strip().isdigit() and "-->" in lines[1]
+
+def _chunks(text) -> Iterator[List[str]]:
+    chunk = []
+    for line in text:
+        if line.strip():
+            chunk.append(line)
+        elif chunk:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_subtitles(fp) -> Iterator[srt.Subtitle]:
+    """Parse .srt dari file/buffer (bytes atau teks) tanpa membaca seluruh isi ke satu string.
+
+    Blok dipisah baris kosong; potongan yang tidak diawali header (index + timestamp) dianggap
+    lanjutan konten blok sebelumnya (baris kosong di dalam teks subtitle).
+    """
+    binary = not isinstance(fp, io.TextIOBase)
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", errors="ignore") if binary else fp
+    try:
+        block = []
+        for chunk in _chunks(text):
+            if block and not _is_header(chunk):
+                block += ["\n"] + chunk
+                continue
+            if block:
+                yield from srt.parse("".join(block))
+            block = chunk
+        if block:
+            yield from srt.parse("".join(block))
+    finally:
+        if binary:
+            text.detach()  # jangan ikut menutup buffer milik pemanggil
+
+class SrtWriter:
+    """Tulis blok terjemahan ke buffer sekali saja, berurutan sesuai posisi blok.
+
+    Blok yang selesai tidak berurutan (dari worker concurrent) ditahan sampai prefix-nya lengkap.
+    Default buffer = SpooledTemporaryFile (pindah ke disk bila besar); bisa juga file output langsung.
+    Urutan & index sama dengan `srt.compose` selama sumber sudah lewat `srt.sort_and_reindex`.
+    """
+
+    def __init__(self, fp=None, max_memory: int = 8 * 1024 * 1024):
+        self._fp = fp if fp is not None else tempfile.SpooledTemporaryFile(max_size=max_memory, mode="w+b")
+        self._held: Dict[int, srt.Subtitle] = {}
+        self.written = 0
+
+    def add(self, i: int, sub: srt.Subtitle) -> None:
+        self._held[i] = sub
+        while self.written in self._held:
+            self._fp.write(self._held.pop(self.written).to_srt().encode("utf-8"))
+            self.written += 1
+
+    def getvalue(self) -> bytes:
+        """Isi buffer (blok berurutan yang sudah ditulis)."""
+        self._fp.flush()
+        pos = self._fp.tell()
+        self._fp.seek(0)
+        data = self._fp.read()
+        self._fp.seek(pos)
+        return data
+
+    def items(self) -> List[Tuple[int, srt.Subtitle]]:
+        """Semua blok selesai [(posisi, blok)]: yang sudah ditulis di-parse ulang dari buffer + yang tertahan.
+
+        Buffer adalah satu-satunya salinan hasil (pemanggil tidak perlu menyimpan dict hasil sendiri).
+        """
+        self._fp.flush()
+        pos = self._fp.tell()
+        self._fp.seek(0)
+        try:
+            done = list(enumerate(iter_subtitles(self._fp)))
+        finally:
+            self._fp.seek(pos)
+        return done + sorted(self._held.items())
+
+    def partial(self, src_subs: List[srt.Subtitle]) -> bytes:
+        """Checkpoint: bagian yang sudah ditulis + sisa blok (hasil tertahan atau original).
+
+        Hanya ekor yang belum ditulis yang disusun dari blok; dibangun saat diminta (tombol download),
+        bukan per blok selesai.
+        """
+        tail = "".join(self._held.get(i, src_subs[i]).to_srt() for i in range(self.written, len(src_subs)))
+        return self.getvalue() + tail.encode("utf-8")
+
+    def close(self) -> None:
+        self._fp.close()
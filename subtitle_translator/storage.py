@@ -0,0 +1,175 @@
+# subtitle_translator/storage.py
+"""Penyimpanan on-disk: translation memory (SQLite) dan job journal (JSONL)."""
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+from nuna_common.config import CACHE_DIR
+TM_DEFAULT_PATH = os.path.join(CACHE_DIR, "translation_memory.sqlite3")
+JOURNAL_DIR = os.path.join(CACHE_DIR, "journals")
+
+class TranslationMemory:
+    """Cache terjemahan on-disk (SQLite), key = (src, tgt, model, setting, teks ter-mask); LRU eviction berdasarkan ukuran.
+
+    `settings` = `core.settings_key(...)` (prompt + glosarium): hasil dari setting lain tidak terpakai.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tm ("
+                " key TEXT PRIMARY KEY, src_lang TEXT, tgt_lang TEXT, model TEXT,"
+                " source TEXT, target TEXT, size INTEGER, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tm_last_used ON tm (last_used)")
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tm").fetchone()[0]
+
+    @staticmethod
+    def _key(src: str, tgt: str, model: str, text: str, settings: str = "") -> str:
+        return hashlib.sha256("\x1f".join((src, tgt, model, settings, text)).encode("utf-8")).hexdigest()
+
+    def get_many(self, src: str, tgt: str, model: str, texts: List[str], settings: str = "") -> Dict[str, str]:
+        keys = {self._key(src, tgt, model, t, settings): t for t in set(texts)}
+        if not keys:
+            return {}
+        found = {}
+        with self._lock, self._conn:
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, target FROM tm WHERE key IN ({marks})", chunk).fetchall()
+                for key, target in rows:
+                    found[keys[key]] = target
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE tm SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [key for key, _ in rows],
+                    )
+        return found
+
+    def put_many(self, src: str, tgt: str, model: str, pairs: Dict[str, str], settings: str = "") -> None:
+        if not pairs:
+            return
+        now = time.time()
+        rows = [
+            (self._key(src, tgt, model, s, settings), src, tgt, model, s, t, len(s.encode("utf-8")) + len(t.encode("utf-8")), now)
+            for s, t in pairs.items()
+        ]
+        with self._lock, self._conn:
+            # baris yang diganti (INSERT OR REPLACE) tidak boleh dihitung dua kali
+            replaced = 0
+            keys = [r[0] for r in rows]
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM tm WHERE key IN ({','.join('?' * len(chunk))})", chunk,
+                ).fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO tm VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._size += sum(r[6] for r in rows) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Hapus entri paling lama tidak dipakai sampai ukuran turun ke ±90% batas
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tm").fetchone()[0]
+        while self._size > self.max_bytes * 0.9:
+            self._conn.execute("DELETE FROM tm WHERE key IN (SELECT key FROM tm ORDER BY last_used LIMIT 500)")
+            self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tm").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tm")
+            self._size = 0
+
+    def info(self) -> Tuple[int, int]:
+        """(jumlah entri, ukuran byte)."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM tm").fetchone()[0]
+            return count, self._size
+
+# 1 lock per file journal untuk seluruh proses: page membuat instance baru tiap rerun sementara job
+# background masih menulis ke file yang sama
+_JOURNAL_LOCKS: Dict[str, threading.Lock] = {}
+_JOURNAL_LOCKS_GUARD = threading.Lock()
+
+def _journal_lock(path: str) -> threading.Lock:
+    with _JOURNAL_LOCKS_GUARD:
+        return _JOURNAL_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+class JobJournal:
+    """Journal append-only (JSONL): 1 entri per blok selesai, key = hash(teks sumber + setting terjemahan).
+
+    `settings` = `core.settings_key(glossary, segmenter)`: ganti glosarium / prompt / segmentasi →
+    blok diterjemahkan ulang, bukan diambil dari journal lama. `load()` memadatkan file (entri
+    duplikat / baris rusak dibuang) supaya journal yang sering di-resume tidak tumbuh tanpa batas.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = _journal_lock(path)
+
+    @staticmethod
+    def key(text: str, src: str, tgt: str, model: str, mode: str, settings: str = "") -> str:
+        return hashlib.sha256("\x1f".join((src, tgt, model, mode, settings, text)).encode("utf-8")).hexdigest()
+
+    def load(self) -> Dict[str, str]:
+        """{key: konten terjemahan}; baris terakhir yang terpotong (crash saat menulis) dilewati.
+
+        Bila ada entri duplikat / baris rusak, file ditulis ulang berisi entri terakhir tiap key saja.
+        """
+        entries, lines = {}, {}
+        with self._lock:
+            if not os.path.exists(self.path):
+                return entries
+            count = 0
+            with open(self.path, encoding="utf-8") as f:
+                for raw in f:
+                    count += 1
+                    try:
+                        rec = json.loads(raw)
+                        entries[rec["key"]] = rec["content"]
+                    except (ValueError, KeyError):
+                        continue
+                    lines.pop(rec["key"], None)  # urutan file = urutan entri terakhir
+                    lines[rec["key"]] = raw if raw.endswith("\n") else raw + "\n"
+            if count > len(lines):
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.writelines(lines.values())
+                os.replace(tmp, self.path)
+        return entries
+
+    def append(self, key: str, content: str) -> None:
+        rec = json.dumps({"key": key, "content": content, "ts": time.time()}, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(rec + "\n")
+
+    def delete(self) -> None:
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+def file_digest(path: str) -> str:
+    """sha256 isi file (sama dengan digest upload di page): dipakai `journal_for`."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def journal_for(filename: str, journal_dir: str = JOURNAL_DIR, digest: str = "") -> JobJournal:
+    """Journal per file sumber: nama file + `digest` isinya (2 file `ep1.srt` berbeda tidak berbagi journal)."""
+    stem = re.sub(r"[^\w.-]+", "_", os.path.splitext(os.path.basename(filename))[0]) or "upload"
+    return JobJournal(os.path.join(journal_dir, f"{stem}.{digest[:12]}.jsonl" if digest else f"{stem}.jsonl"))
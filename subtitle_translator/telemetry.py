@@ -0,0 +1,138 @@
+# subtitle_translator/telemetry.py
+"""Telemetry per request: latency, token usage, retry/backoff, dan kelas error."""
+import csv
+import io
+import json
+import math
+import threading
+import time
+from typing import Dict, List, NamedTuple
+
+FIELDS = [
+    "ts", "latency_s", "ttft_s", "prompt_tokens", "cached_tokens", "completion_tokens",
+    "attempt", "backoff_s", "error", "stream", "hedge",
+]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 bila kosong."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def cached_prompt_tokens(usage) -> int:
+    """Token prompt yang dilayani dari prompt cache provider (OpenAI `prompt_tokens_details`, DeepSeek `prompt_cache_hit_tokens`)."""
+    if usage is None:
+        return 0
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    if cached is None:
+        cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    return cached or 0
+
+class Pricing(NamedTuple):
+    """Harga USD per 1 juta token: input cache miss, input cache hit, output."""
+
+    input: float = 0.28
+    cached_input: float = 0.028
+    output: float = 0.42
+
+    def cost(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+        uncached = max(0, prompt_tokens - cached_tokens)
+        return (uncached * self.input + cached_tokens * self.cached_input + completion_tokens * self.output) / 1e6
+
+class Telemetry:
+    """Kumpulan record per request (1 baris per attempt), thread-safe.
+
+    `call_with_retry` memanggil `begin()` / `note_retry()` dan `chat_translate` memanggil `record()`
+    dari worker thread yang sama; nomor attempt & backoff dibawa lewat thread-local.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def begin(self) -> None:
+        self._local.attempt = 1
+        self._local.backoff = 0.0
+
+    def note_retry(self, sleep_s: float) -> None:
+        self._local.attempt = getattr(self._local, "attempt", 1) + 1
+        self._local.backoff = sleep_s
+
+    def context(self) -> Dict:
+        """State thread-local attempt ini, untuk dibawa ke thread lain (request hedge)."""
+        return {"attempt": getattr(self._local, "attempt", 1), "backoff": getattr(self._local, "backoff", 0.0)}
+
+    def adopt(self, ctx: Dict, hedge: bool = False) -> None:
+        self._local.attempt = ctx["attempt"]
+        self._local.backoff = 0.0 if hedge else ctx["backoff"]
+        self._local.hedge = hedge
+
+    def record(self, latency_s: float, usage=None, error: Exception = None, ttft_s: float = None, stream: bool = False) -> None:
+        rec = {
+            "ts": round(time.time(), 3),
+            "latency_s": round(latency_s, 4),
+            "ttft_s": round(ttft_s, 4) if ttft_s is not None else None,
+            "prompt_tokens": getattr(usage, "prompt_tokens", None) or 0,
+            "cached_tokens": cached_prompt_tokens(usage),
+            "completion_tokens": getattr(usage, "completion_tokens", None) or 0,
+            "attempt": getattr(self._local, "attempt", 1),
+            "backoff_s": round(getattr(self._local, "backoff", 0.0), 3),
+            "error": type(error).__name__ if error is not None else "",
+            "stream": stream,
+            "hedge": getattr(self._local, "hedge", False),
+        }
+        with self._lock:
+            self.records.append(rec)
+
+    def summary(self, blocks_done: int = None, pricing: Pricing = None) -> Dict:
+        with self._lock:
+            records = list(self.records)
+        ok = [r["latency_s"] for r in records if not r["error"]]
+        elapsed = max(time.time() - self.started, 1e-6)
+        tokens = sum(r["prompt_tokens"] + r["completion_tokens"] for r in records)
+        prompt = sum(r["prompt_tokens"] for r in records)
+        cached = sum(r.get("cached_tokens", 0) for r in records)
+        errors: Dict[str, int] = {}
+        for r in records:
+            if r["error"]:
+                errors[r["error"]] = errors.get(r["error"], 0) + 1
+        out = {
+            "requests": len(records),
+            "ok": len(ok),
+            "retries": sum(1 for r in records if r["attempt"] > 1),
+            "hedges": sum(1 for r in records if r.get("hedge")),
+            "backoff_s": round(sum(r["backoff_s"] for r in records), 2),
+            "errors": errors,
+            "latency_p50": percentile(ok, 50),
+            "latency_p90": percentile(ok, 90),
+            "latency_p99": percentile(ok, 99),
+            "prompt_tokens": prompt,
+            "cached_prompt_tokens": cached,
+            "uncached_prompt_tokens": prompt - cached,
+            "cache_hit_rate": round(cached / prompt, 3) if prompt else 0.0,
+            "completion_tokens": sum(r["completion_tokens"] for r in records),
+            "tokens_per_s": round(tokens / elapsed, 1),
+            "elapsed_s": round(elapsed, 1),
+        }
+        if blocks_done is not None:
+            out["blocks_per_s"] = round(blocks_done / elapsed, 2)
+        if pricing is not None:
+            out["cost_usd"] = round(pricing.cost(prompt, cached, out["completion_tokens"]), 4)
+        return out
+
+    def to_csv(self) -> str:
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=FIELDS)
+        writer.writeheader()
+        with self._lock:
+            writer.writerows(self.records)
+        return buf.getvalue()
+
+    def to_json(self, blocks_done: int = None) -> str:
+        with self._lock:
+            records = list(self.records)
+        return json.dumps({"summary": self.summary(blocks_done), "requests": records}, indent=2)